@@ -0,0 +1,86 @@
+"""Startup and per-request cost of building a message bus.
+
+    python -m benchmarks.bench_bootstrap --iterations 5000
+
+Compares ``core.bootstrap.bootstrap`` (precompiled handler registry) with the
+previous approach of inspecting every handler signature and wrapping it in a
+lambda on each call, and measures a cold ``import core.bootstrap``.
+"""
+
+import argparse
+import inspect
+import statistics
+import subprocess
+import sys
+import time
+
+from core import bootstrap
+from core.service_layer import handlers, messagebus
+
+
+class NullUnitOfWork:
+    def collect_new_events(self):
+        return []
+
+
+def legacy_bootstrap(uow, document_analysis_connector, canonical_connector):
+    dependencies = {
+        "uow": uow,
+        "document_analysis_connector": document_analysis_connector,
+        "canonical_entity_consolidation_connector": canonical_connector,
+    }
+
+    def inject(handler):
+        params = inspect.signature(handler).parameters
+        deps = {name: dep for name, dep in dependencies.items() if name in params}
+        return lambda message: handler(message, **deps)
+
+    return messagebus.MessageBus(
+        uow=uow,
+        event_handlers={
+            event_type: [(name, inject(handler)) for name, handler in type_handlers]
+            for event_type, type_handlers in handlers.EVENT_HANDLERS.items()
+        },
+        command_handlers={
+            command_type: (name, inject(handler))
+            for command_type, (name, handler) in handlers.COMMAND_HANDLERS.items()
+        },
+    )
+
+
+def time_per_call(build, iterations):
+    uow = NullUnitOfWork()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        build(uow, None, None)
+    return (time.perf_counter() - start) / iterations
+
+
+def cold_import_seconds(repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import core.bootstrap"], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--import-repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy = time_per_call(legacy_bootstrap, args.iterations)
+    compiled = time_per_call(bootstrap.bootstrap, args.iterations)
+    print(f"legacy bootstrap():   {legacy * 1e6:8.1f} us/call")
+    print(f"compiled bootstrap(): {compiled * 1e6:8.1f} us/call")
+    print(f"speed-up:             {legacy / compiled:8.2f}x")
+    print(
+        f"cold import core.bootstrap (median of {args.import_repeats}): "
+        f"{cold_import_seconds(args.import_repeats) * 1e3:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
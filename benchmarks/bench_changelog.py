@@ -0,0 +1,78 @@
+"""Changelog size and update time: full snapshots versus changed fields.
+
+    python -m benchmarks.bench_changelog --documents 200 --updates 5
+
+Updates the summary of documents with about 50 KB of text several times, then
+compares the bytes stored by the diff entries with what the previous full
+previous/revised snapshots would have taken for the same updates.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from core import database
+from core.adapters import changelog, orm
+from core.domain import commands
+from core.service_layer import unit_of_work
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_sqlite_engine(os.path.join(tmp, "bench.sqlite"))
+        database.migrate(engine)
+        uow = unit_of_work.SqlAlchemyUnitOfWork(sessionmaker(bind=engine))
+        with uow:
+            ids = [
+                uow.documents.add(
+                    commands.CreateDocument(
+                        filepath=f"{i}.docx",
+                        filename=f"{i}.docx",
+                        text=f"Paragraph {i} of the spending review. " * 1300,
+                    )
+                ).id
+                for i in range(args.documents)
+            ]
+            uow.commit()
+
+        snapshot_bytes = 0
+        start = time.perf_counter()
+        for round_ in range(args.updates):
+            with uow:
+                for id_ in ids:
+                    document = uow.documents.get(reference=id_)
+                    previous = document.model_dump()
+                    document.summary = f"Summary {round_} " * 40
+                    revised = uow.documents.update(document, ["summary"]).model_dump()
+                    snapshot_bytes += len(
+                        json.dumps(previous, cls=changelog.DatetimeJSONEncoder)
+                    ) + len(json.dumps(revised, cls=changelog.DatetimeJSONEncoder))
+                uow.commit()
+        elapsed = time.perf_counter() - start
+
+        with uow:
+            diff_bytes = uow.session.scalar(
+                select(func.sum(func.length(orm.ChangelogORM.changes_json)))
+            )
+            entries = uow.session.scalar(select(func.count(orm.ChangelogORM.id)))
+
+        print(
+            f"{entries:,} entries: {diff_bytes / entries:8.0f} B/entry as changes, "
+            f"{snapshot_bytes / entries:8.0f} B/entry as full snapshots "
+            f"({snapshot_bytes / diff_bytes:.0f}x)"
+        )
+        print(f"updates took {elapsed / entries * 1e3:.2f} ms each")
+
+
+if __name__ == "__main__":
+    main()
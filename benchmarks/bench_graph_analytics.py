@@ -0,0 +1,93 @@
+"""Times each graph analytic over a synthetic corpus, and an incremental
+co-occurrence update against a full recount.
+
+    python -m benchmarks.bench_graph_analytics --documents 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from core.graphs import analytics
+from core.graphs.index import GraphIndex
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"  {label:36s} {(time.perf_counter() - start) * 1e3:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--links-per-document", type=int, default=8)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    documents, entities, topics = args.documents, args.documents // 2, 500
+    links = documents * args.links_per_document
+    entity_links = np.unique(
+        np.stack(
+            [
+                rng.integers(1, documents + 1, links),
+                np.minimum(rng.zipf(1.6, links), entities),
+            ],
+            axis=1,
+        ),
+        axis=0,
+    )
+    topic_links = np.stack(
+        [
+            rng.integers(1, documents + 1, documents * 2),
+            rng.integers(1, topics + 1, documents * 2),
+        ],
+        axis=1,
+    )
+    graph = timed(
+        "build link graph",
+        lambda: GraphIndex(
+            {
+                "document": range(1, documents + 1),
+                "entity": range(1, entities + 1),
+                "topic": range(1, topics + 1),
+            },
+            {},
+            {
+                "document_entity": (entity_links[:, 0], entity_links[:, 1]),
+                "document_topic": (topic_links[:, 0], topic_links[:, 1]),
+            },
+        ),
+    )
+    print(f"{len(graph)} nodes, {graph.edge_count} links")
+
+    timed("weighted degree", lambda: analytics.weighted_degrees(graph))
+    ranks, iterations = timed("pagerank", lambda: analytics.pagerank(graph))
+    print(f"  ({iterations} iterations)")
+    _, warm = timed("pagerank, warm start", lambda: analytics.pagerank(graph, ranks))
+    print(f"  ({warm} iterations)")
+    components = timed(
+        "connected components", lambda: analytics.connected_components(graph)
+    )
+    print(f"  ({components.max() + 1} components)")
+    pairs = timed(
+        "co-occurrence, full",
+        lambda: analytics.cooccurrence_counts(entity_links[:, 0], entity_links[:, 1]),
+    )
+    print(f"  ({len(pairs[0])} pairs)")
+
+    # The last 1% of documents have just been linked
+    new = entity_links[:, 0] > documents * 0.99
+    affected = np.isin(entity_links[:, 0], entity_links[new, 0])
+    timed(
+        "co-occurrence, 1% new links",
+        lambda: analytics.cooccurrence_counts(
+            entity_links[affected, 0], entity_links[affected, 1], new[affected]
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
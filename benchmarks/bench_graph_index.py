@@ -0,0 +1,104 @@
+"""Builds the graph adjacency index over a synthetic knowledge base and times
+filtered subgraph queries.
+
+    python -m benchmarks.bench_graph_index --documents 100000
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from core.graphs.index import GraphIndex
+
+
+def synthetic_graph(documents: int, rng) -> GraphIndex:
+    entities, topics = documents // 2, documents // 50
+    raw_topics, raw_entities = documents * 5, documents * 10
+    ids = {
+        "document": np.arange(1, documents + 1),
+        "entity": np.arange(1, entities + 1),
+        "topic": np.arange(1, topics + 1),
+        "raw_topic": np.arange(1, raw_topics + 1),
+        "raw_entity": np.arange(1, raw_entities + 1),
+    }
+    labels = {
+        group: [f"{group} {i}" for i in group_ids] for group, group_ids in ids.items()
+    }
+    # Zipf-distributed targets give a few very well connected hubs
+    links = {
+        "document_entity": (
+            rng.integers(1, documents + 1, documents * 8),
+            np.minimum(rng.zipf(1.5, documents * 8), entities),
+        ),
+        "document_topic": (
+            rng.integers(1, documents + 1, documents * 3),
+            np.minimum(rng.zipf(1.5, documents * 3), topics),
+        ),
+        "topic_raw_topic": (
+            rng.integers(1, topics + 1, raw_topics),
+            ids["raw_topic"],
+        ),
+        "raw_topic_document": (
+            ids["raw_topic"],
+            rng.integers(1, documents + 1, raw_topics),
+        ),
+        "entity_raw_entity": (
+            rng.integers(1, entities + 1, raw_entities),
+            ids["raw_entity"],
+        ),
+        "raw_entity_document": (
+            ids["raw_entity"],
+            rng.integers(1, documents + 1, raw_entities),
+        ),
+        "previous_version": (
+            ids["document"][1::10],
+            ids["document"][0::10][: len(ids["document"][1::10])],
+        ),
+    }
+    return GraphIndex(ids, labels, links)
+
+
+def timed(label, function, repeats=20):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    print(
+        f"  {label:40s} median {statistics.median(timings) * 1e3:8.2f} ms  "
+        f"({len(result['nodes'])} nodes, {len(result['edges'])} edges)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=100_000)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    start = time.perf_counter()
+    graph = synthetic_graph(args.documents, rng)
+    print(
+        f"built index of {len(graph)} nodes and {graph.edge_count} edges "
+        f"in {time.perf_counter() - start:.1f} s"
+    )
+
+    timed("top 500 by degree", lambda: graph.query(limit=500))
+    timed("page 20 of 500", lambda: graph.query(offset=10_000, limit=500))
+    timed("top 200 entities", lambda: graph.query(groups=["entity"], top=200))
+    timed("1-hop of document-1", lambda: graph.query(node="document-1"))
+    timed(
+        "2-hop of document-1, entities/topics",
+        lambda: graph.query(
+            node="document-1",
+            hops=2,
+            relations=["document_entity", "document_topic"],
+        ),
+    )
+    timed("2-hop of the biggest hub", lambda: graph.query(node="entity-1", hops=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Import-time profile of the entry points, based on ``python -X importtime``.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --module web.main --budget-ms 900
+
+Prints the cumulative import time of each entry point (median of several runs)
+and its heaviest imports. With ``--budget-ms`` it exits non-zero when an entry
+point is slower than the budget, so it can guard against regressions in CI.
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = (
+    "core.bootstrap",
+    "core.entrypoints.headless_cli",
+    "core.entrypoints.worker",
+    "web.main",
+)
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def profile_import(module):
+    """Returns {imported module: cumulative microseconds} for one cold import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", action="append", dest="modules")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules or ENTRY_POINTS:
+        profiles = [profile_import(module) for _ in range(args.repeats)]
+        total_ms = statistics.median(p[module] for p in profiles) / 1000
+        print(f"{module}: {total_ms:.0f} ms")
+
+        heaviest = sorted(profiles[-1].items(), key=lambda item: -item[1])
+        for name, micros in heaviest[1 : args.top + 1]:
+            print(f"    {micros / 1000:8.1f} ms  {name}")
+
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"Over the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Memory held by link collections: dict dataclasses, slotted ones and columns.
+
+    python -m benchmarks.bench_link_memory --links 1000000
+
+Builds the same DocumentEntity links as plain dataclasses with an instance
+``__dict__`` (what the domain model used before), as the slotted dataclasses in
+core.domain.model and as a model.LinkColumns, and reports the tracemalloc
+peak and build time of each.
+"""
+
+import argparse
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from core.domain import model
+
+
+@dataclass
+class DictDocumentEntity:
+    document_id: int
+    entity_id: int
+    link_description: str
+
+
+def rows(count):
+    # Ids spread like real tables: many documents, fewer entities
+    return ((i // 7, i % 50_000, "") for i in range(count))
+
+
+def measure(label, build, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    links = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {label:24s} {current / 2**20:8.1f} MiB  "
+        f"{current / count:6.1f} B/link  built in {elapsed:5.2f} s"
+    )
+    del links
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--links", type=int, default=1_000_000)
+    args = parser.parse_args()
+    count = args.links
+
+    print(f"{count:,} DocumentEntity links held in memory:")
+    baseline = measure(
+        "dataclass with __dict__",
+        lambda: [DictDocumentEntity(*row) for row in rows(count)],
+        count,
+    )
+    slotted = measure(
+        "slotted dataclass",
+        lambda: [model.DocumentEntity(*row) for row in rows(count)],
+        count,
+    )
+    columns = measure(
+        "LinkColumns",
+        lambda: model.LinkColumns.from_rows(model.DocumentEntity, rows(count)),
+        count,
+    )
+    print(
+        f"  slotted saves {1 - slotted / baseline:.0%}, "
+        f"columns save {1 - columns / baseline:.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
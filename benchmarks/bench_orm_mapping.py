@@ -0,0 +1,135 @@
+"""ORM-to-domain conversion: validated ORM objects versus trusted column rows.
+
+    python -m benchmarks.bench_orm_mapping --rows 100000
+
+Loads the same documents and topics the way the repositories used to (ORM
+query, ``to_dict`` over ``__table__.columns``, ``model_validate``) and the way
+they do now (column rows through ``repository.trusted_model``), then times the
+conversion alone on rows already in memory. Topics are validated from column
+dicts here; the repository used to validate them from ORM objects, which also
+lazy-loaded their links one topic at a time.
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from core import database
+from core.adapters import orm, repository
+from core.domain import model
+
+
+def validated(session, orm_class, model_class):
+    return [
+        model_class.model_validate(
+            {column.name: getattr(row, column.name) for column in row.__table__.columns}
+        )
+        for row in session.query(orm_class).all()
+    ]
+
+
+def timed(label, rows, load):
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {label:26s} {elapsed:7.2f} s  {rows / elapsed:10,.0f} rows/s  "
+        f"({elapsed / rows * 1e6:5.1f} us/row)"
+    )
+    return result
+
+
+def seed(engine, rows):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    audit = dict(
+        created_at=now,
+        last_modified_at=now,
+        created_by="bench",
+        last_modified_by="bench",
+    )
+    with engine.begin() as conn:
+        for offset in range(0, rows, 10_000):
+            batch = range(offset, min(offset + 10_000, rows))
+            conn.execute(
+                insert(orm.DocumentORM.__table__),
+                [
+                    dict(
+                        filepath=f"docs/{i}.docx",
+                        filename=f"{i}.docx",
+                        filetype="docx",
+                        text=f"document {i} " * 40,
+                        processed_at=now,
+                        summary=f"summary {i}",
+                        revision=1,
+                        version=1,
+                        **audit,
+                    )
+                    for i in batch
+                ],
+            )
+            conn.execute(
+                insert(orm.TopicORM.__table__),
+                [
+                    dict(topic_name=f"topic {i}", topic_description="d", **audit)
+                    for i in batch
+                ],
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_sqlite_engine(os.path.join(tmp, "bench.sqlite"))
+        database.migrate(engine)
+        seed(engine, args.rows)
+        session_factory = sessionmaker(bind=engine)
+
+        for orm_class, model_class in (
+            (orm.DocumentORM, model.Document),
+            (orm.TopicORM, model.Topic),
+        ):
+            print(f"{model_class.__name__} ({args.rows:,} rows), database to models:")
+            with session_factory() as session:
+                old = timed(
+                    "ORM + model_validate",
+                    args.rows,
+                    lambda: validated(session, orm_class, model_class),
+                )
+            with session_factory() as session:
+                new = timed(
+                    "rows + trusted_model",
+                    args.rows,
+                    lambda: repository.load_models(session, orm_class, model_class),
+                )
+            assert [m.model_dump() for m in old[:100]] == [
+                m.model_dump() for m in new[:100]
+            ]
+
+            with session_factory() as session:
+                rows = repository.load_rows(session, orm_class)
+            print("  conversion only:")
+            timed(
+                "model_validate",
+                args.rows,
+                lambda: [model_class.model_validate(values) for values in rows],
+            )
+            timed(
+                "trusted_model",
+                args.rows,
+                lambda: [
+                    repository.trusted_model(model_class, dict(values))
+                    for values in rows
+                ],
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""PDF text extraction: page-by-page concatenation versus the page-parallel pool.
+
+    python -m benchmarks.bench_pdf_extraction --pages 500 --files 3
+
+Writes PDFs of ``--pages`` pages of text, then times extracting them the way
+the upload endpoint used to (``text += page.extract_text()`` on one thread)
+against ``extraction.extract`` on the shared process pool.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from core.adapters import extraction
+
+
+def write_text_pdf(path: str, pages: int, lines_per_page: int = 40):
+    """A minimal PDF with ``lines_per_page`` lines of Helvetica text per page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = b" ".join(
+            b"(Page %d line %d of the spending review appendix.) Tj T*"
+            % (page + 1, line + 1)
+            for line in range(lines_per_page)
+        )
+        content = b"BT /F1 10 Tf 12 TL 50 760 Td " + lines + b" ET"
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    body, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    with open(path, "wb") as file:
+        file.write(body)
+
+
+def concatenate_pages(path: str) -> str:
+    import pypdf
+
+    text = ""
+    for page in pypdf.PdfReader(path).pages:
+        text += page.extract_text()
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--files", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"{i}.pdf") for i in range(args.files)]
+        for path in paths:
+            write_text_pdf(path, args.pages)
+
+        start = time.perf_counter()
+        expected = [concatenate_pages(path) for path in paths]
+        sequential = time.perf_counter() - start
+
+        pool = extraction.get_extraction_pool()
+        # Starts the worker processes, so the timing below leaves out spawning
+        list(pool.map(abs, range(extraction.extraction_workers())))
+        start = time.perf_counter()
+        texts = [extraction.extract(path).text for path in paths]
+        parallel = time.perf_counter() - start
+        extraction.shutdown_extraction_pool()
+
+    assert texts == expected
+    workers = extraction.extraction_workers()
+    print(f"{args.files} PDFs of {args.pages} pages, {workers} extraction processes")
+    print(f"  page by page, text +=: {sequential / args.files:8.2f} s/file")
+    print(f"  page-parallel pool:    {parallel / args.files:8.2f} s/file")
+    print(f"  speed-up:              {sequential / parallel:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Full-text search latency over a large synthetic paragraph index.
+
+    python -m benchmarks.bench_search --paragraphs 1000000
+
+Fills ``search_paragraphs`` (and through its triggers the FTS5 index) with
+random prose, then times ranked first-page queries for common, rare and
+prefix terms.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from core import database
+from core.adapters import search
+
+COMMON = ["policy", "budget", "review", "department", "report", "housing"]
+
+
+def random_paragraph(rng, vocabulary):
+    return " ".join(rng.choice(vocabulary) for _ in range(rng.randint(20, 60)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = COMMON * 50 + [f"term{i}" for i in range(50_000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_sqlite_engine(os.path.join(tmp, "bench.sqlite"))
+        database.migrate(engine)
+
+        start = time.perf_counter()
+        batch = 10_000
+        with engine.begin() as conn:
+            for offset in range(0, args.paragraphs, batch):
+                rows = [
+                    dict(
+                        kind="document",
+                        ref_id=(offset + i) // 100,
+                        document_id=(offset + i) // 100,
+                        field="text",
+                        position=(offset + i) % 100,
+                        title=f"doc {(offset + i) // 100}",
+                        body=random_paragraph(rng, vocabulary),
+                    )
+                    for i in range(min(batch, args.paragraphs - offset))
+                ]
+                conn.execute(insert(search.paragraphs_table), rows)
+        print(
+            f"indexed {args.paragraphs} paragraphs in {time.perf_counter() - start:.1f} s"
+        )
+
+        session = sessionmaker(bind=engine)()
+        for query in ["budget", "term123", "policy review", "hous*", "term12*"]:
+            timings = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                results = search.search(session, query, limit=20)
+                timings.append(time.perf_counter() - start)
+            print(
+                f"  {query!r:18} {len(results):3d} results  "
+                f"median {statistics.median(timings) * 1e3:8.2f} ms  "
+                f"max {max(timings) * 1e3:8.2f} ms"
+            )
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Mixed reader/writer load against SQLite with each pragma profile.
+
+    python -m benchmarks.bench_sqlite_concurrency --readers 8 --writers 4 --seconds 5
+
+Each thread uses its own pooled connection from one engine, like bus handler
+threads and web requests sharing ``core.database.get_engine()``. Writers insert
+and update rows in short transactions, readers run the aggregate queries the
+list views issue. Reports throughput, p99 latency and "database is locked"
+errors per profile.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from core.database import create_sqlite_engine
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def run_profile(profile, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(os.path.join(tmp, "bench.sqlite"), profile)
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, "
+                    "description TEXT, version INTEGER)"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO items (name, description, version) "
+                    "VALUES (:n, :d, 1)"
+                ),
+                [{"n": f"item {i}", "d": "x" * 200} for i in range(5000)],
+            )
+
+        stop = threading.Event()
+        results = {"read": [], "write": [], "locked": 0}
+        lock = threading.Lock()
+
+        def reader():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(
+                            text("SELECT count(*), max(version) FROM items")
+                        ).all()
+                        conn.execute(
+                            text("SELECT * FROM items ORDER BY id DESC LIMIT 200")
+                        ).all()
+                except OperationalError:
+                    with lock:
+                        results["locked"] += 1
+                    continue
+                with lock:
+                    results["read"].append(time.perf_counter() - start)
+
+        def writer():
+            n = 0
+            while not stop.is_set():
+                n += 1
+                start = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text(
+                                "INSERT INTO items (name, description, version) "
+                                "VALUES (:n, :d, 1)"
+                            ),
+                            {"n": f"new {n}", "d": "y" * 200},
+                        )
+                        conn.execute(
+                            text(
+                                "UPDATE items SET version = version + 1 "
+                                "WHERE id = :id"
+                            ),
+                            {"id": n % 5000 + 1},
+                        )
+                except OperationalError:
+                    with lock:
+                        results["locked"] += 1
+                    continue
+                with lock:
+                    results["write"].append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    print(f"profile={profile}")
+    for kind in ("read", "write"):
+        timings = results[kind]
+        print(
+            f"  {kind:5s} {len(timings) / seconds:9.0f} ops/s  "
+            f"median {statistics.median(timings) * 1e3 if timings else float('nan'):7.2f} ms  "
+            f"p99 {percentile(timings, 0.99) * 1e3:8.2f} ms"
+        )
+    print(f"  database is locked errors: {results['locked']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument(
+        "--profile", action="append", dest="profiles", choices=["default", "production"]
+    )
+    args = parser.parse_args()
+
+    for profile in args.profiles or ["default", "production"]:
+        run_profile(profile, args.readers, args.writers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Peak memory of listing every row at once versus streaming it.
+
+    python -m benchmarks.bench_streaming --rows 20000
+
+Compares building the topic list (what the HTML views do) and encoding it as
+one JSON document with streaming the same rows through the JSON array encoder,
+reporting time to the first chunk, total time and the tracemalloc peak.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from core import database, views
+from core.adapters import orm
+from core.service_layer import unit_of_work
+from web import streaming
+
+
+def measure(label, produce_chunks):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in produce_chunks():
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {label:10s} first chunk {first * 1e3:8.1f} ms  total {total:6.2f} s  "
+        f"peak {peak / 2**20:7.1f} MiB  ({size / 2**20:.1f} MiB sent)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.create_sqlite_engine(os.path.join(tmp, "bench.sqlite"))
+        database.migrate(engine)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with engine.begin() as conn:
+            for offset in range(0, args.rows, 10_000):
+                conn.execute(
+                    insert(orm.TopicORM.__table__),
+                    [
+                        dict(
+                            topic_name=f"topic {i}",
+                            topic_description="A description of the topic " * 8,
+                            created_at=now,
+                            last_modified_at=now,
+                            created_by="bench",
+                            last_modified_by="bench",
+                            version=1,
+                        )
+                        for i in range(offset, min(offset + 10_000, args.rows))
+                    ],
+                )
+        uow = unit_of_work.SqlAlchemyUnitOfWork(sessionmaker(bind=engine))
+
+        def listed():
+            topics = views.get_all_topics(uow)
+            body = json.dumps(
+                [topic.model_dump(mode="json") for topic in topics]
+            ).encode()
+            yield body
+
+        def streamed():
+            return streaming.chunked(
+                streaming.json_array_pieces(views.stream_topics(uow))
+            )
+
+        print(f"{args.rows} topics")
+        measure("list", listed)
+        measure("streamed", streamed)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Exact versus IVF similarity search over a synthetic embedding store.
+
+    python -m benchmarks.bench_vector_search --rows 200000 --dimensions 256
+
+Reports query latency for each mode and the recall@k of IVF against the exact
+results.
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from core.adapters.vector_store import VectorStore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(1000, args.dimensions)).astype(np.float32)
+    vectors = centres[rng.integers(0, 1000, args.rows)]
+    vectors += 0.3 * rng.normal(size=vectors.shape).astype(np.float32)
+    queries = vectors[rng.choice(args.rows, args.queries, replace=False)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(f"{tmp}/bench", args.dimensions)
+        start = time.perf_counter()
+        for offset in range(0, args.rows, 50_000):
+            batch = vectors[offset : offset + 50_000]
+            store.upsert(list(range(offset, offset + len(batch))), batch)
+        print(f"stored {args.rows} vectors in {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        store.build_ann_index()
+        print(f"built IVF index in {time.perf_counter() - start:.1f} s")
+
+        results = {}
+        for mode in ("exact", "ivf"):
+            timings, results[mode] = [], []
+            for query in queries:
+                start = time.perf_counter()
+                results[mode].append(
+                    store.search(query, k=args.k, mode=mode, n_probe=args.n_probe)
+                )
+                timings.append(time.perf_counter() - start)
+            print(
+                f"  {mode:5s} median {statistics.median(timings) * 1e3:7.2f} ms  "
+                f"max {max(timings) * 1e3:7.2f} ms"
+            )
+
+        start = time.perf_counter()
+        store.search(queries, k=args.k, mode="exact")
+        batched = (time.perf_counter() - start) / args.queries
+        print(f"  exact, batched {batched * 1e3:7.2f} ms per query")
+
+        recall = np.mean(
+            [
+                len({i for i, _ in a} & {i for i, _ in e}) / args.k
+                for a, e in zip(results["ivf"], results["exact"])
+            ]
+        )
+        print(f"  IVF recall@{args.k}: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Changelog entries that record only the fields an update changed.
+
+Each entry stores ``{field: [old, new]}`` for one update as JSON. Strings of at
+least ``CHANGELOG_COMPRESS_MIN_CHARS`` characters are stored zlib-compressed as
+``{"$zlib": "<base64>"}``. Entries are queued on the session and inserted in
+one batch when the unit of work commits. Entries written before diffs were
+introduced hold full previous/revised snapshots and are diffed when read.
+
+Every ``CHANGELOG_SNAPSHOT_INTERVAL``-th entry for an object also stores the
+object's full state after the change in ``revised_object_json``. ``as_of``
+starts from the nearest snapshot (or the current state) and replays or undoes
+the entries between it and the requested time, so it reads fewer than
+``CHANGELOG_SNAPSHOT_INTERVAL`` diffs plus the snapshot entry. Entries logged
+before snapshots were introduced have none until the object changes again.
+"""
+
+import base64
+import datetime
+import json
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, tuple_
+
+import core.adapters.orm as orm
+import core.config as config
+
+PENDING_KEY = "pending_changelog"
+COMPRESSED = "$zlib"
+# Pending entries carry the revised state until write_pending decides whether
+# the entry is a snapshot
+STATE_KEY = "_state"
+# Objects counted per query when numbering pending entries
+COUNT_BATCH_SIZE = 500
+# Set when an object is added; entries logged by updates that passed whole
+# command objects showed them changing, see migration 0008
+CREATION_FIELDS = ("created_at", "created_by")
+
+
+class DatetimeJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (datetime.datetime, datetime.date)):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+@dataclass
+class Change:
+    id: int
+    modified_datetime: Optional[datetime.datetime]
+    changes: Dict[str, list]  # field: [old value, new value]
+
+
+def diff(previous: dict, revised: dict) -> Dict[str, list]:
+    """Changed fields, leaving out list fields (loaded relations and events),
+    which are not stored on the row, and the creation fields, which updates
+    never write."""
+    changes = {}
+    for field in sorted(previous.keys() | revised.keys()):
+        old, new = previous.get(field), revised.get(field)
+        if isinstance(old, list) or isinstance(new, list):
+            continue
+        if field in CREATION_FIELDS:
+            continue
+        if old != new:
+            changes[field] = [old, new]
+    return changes
+
+
+def encode_value(value):
+    min_chars = config.CHANGELOG_COMPRESS_MIN_CHARS
+    if isinstance(value, str) and min_chars and len(value) >= min_chars:
+        compressed = zlib.compress(value.encode())
+        return {COMPRESSED: base64.b64encode(compressed).decode("ascii")}
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, dict) and COMPRESSED in value:
+        return zlib.decompress(base64.b64decode(value[COMPRESSED])).decode()
+    return value
+
+
+def record(session, entity_name: str, entity_id: int, previous: dict, revised: dict):
+    """Queues an entry for the fields that differ; see ``write_pending``."""
+    changes = {
+        field: [encode_value(old), encode_value(new)]
+        for field, (old, new) in diff(previous, revised).items()
+    }
+    session.info.setdefault(PENDING_KEY, []).append(
+        {
+            "modified_datetime": datetime.datetime.now(datetime.timezone.utc),
+            "entity_name": entity_name,
+            "entity_id": entity_id,
+            "changes_json": json.dumps(changes, cls=DatetimeJSONEncoder),
+            "revised_object_json": None,
+            STATE_KEY: revised,
+        }
+    )
+
+
+def encode_state(state: dict) -> str:
+    return json.dumps(
+        {
+            field: encode_value(value)
+            for field, value in state.items()
+            if not isinstance(value, list)
+        },
+        cls=DatetimeJSONEncoder,
+    )
+
+
+def decode_state(state_json: str) -> dict:
+    return {
+        field: decode_value(value)
+        for field, value in json.loads(state_json).items()
+        if not isinstance(value, list)
+    }
+
+
+def logged_counts(session, objects: Iterable[Tuple[str, int]]) -> Counter:
+    """Entries already written per ``(entity_name, entity_id)``."""
+    objects = set(objects)
+    counts = Counter()
+    ids = sorted({entity_id for _, entity_id in objects})
+    for start in range(0, len(ids), COUNT_BATCH_SIZE):
+        rows = session.execute(
+            select(
+                orm.ChangelogORM.entity_name,
+                orm.ChangelogORM.entity_id,
+                func.count(orm.ChangelogORM.id),
+            )
+            .where(
+                orm.ChangelogORM.entity_id.in_(ids[start : start + COUNT_BATCH_SIZE])
+            )
+            .group_by(orm.ChangelogORM.entity_name, orm.ChangelogORM.entity_id)
+        )
+        for entity_name, entity_id, count in rows:
+            if (entity_name, entity_id) in objects:
+                counts[entity_name, entity_id] = count
+    return counts
+
+
+def write_pending(session) -> int:
+    rows = session.info.pop(PENDING_KEY, None)
+    if not rows:
+        return 0
+    interval = config.CHANGELOG_SNAPSHOT_INTERVAL
+    if interval > 0:
+        positions = logged_counts(
+            session, ((row["entity_name"], row["entity_id"]) for row in rows)
+        )
+    for row in rows:
+        state = row.pop(STATE_KEY)
+        if interval > 0:
+            key = row["entity_name"], row["entity_id"]
+            positions[key] += 1
+            if positions[key] % interval == 0:
+                row["revised_object_json"] = encode_state(state)
+    session.execute(insert(orm.ChangelogORM), rows)
+    return len(rows)
+
+
+def discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def decode_changes(row: orm.ChangelogORM) -> Dict[str, list]:
+    if row.changes_json is None:
+        return diff(
+            json.loads(row.previous_object_json or "{}"),
+            json.loads(row.revised_object_json or "{}"),
+        )
+    return {
+        field: [decode_value(old), decode_value(new)]
+        for field, (old, new) in json.loads(row.changes_json).items()
+    }
+
+
+def history(session, entity_name: str, entity_id: int) -> List[Change]:
+    """Every logged change to one object, oldest first."""
+    rows = session.scalars(
+        select(orm.ChangelogORM)
+        .filter_by(entity_name=entity_name, entity_id=entity_id)
+        .order_by(orm.ChangelogORM.id)
+    )
+    return [Change(row.id, row.modified_datetime, decode_changes(row)) for row in rows]
+
+
+def rebuild(current: dict, changes: List[Change], revision: int) -> dict:
+    """The object as it was after the first ``revision`` of ``changes`` (0 is
+    before any), found by undoing the later ones from its current state."""
+    if not 0 <= revision <= len(changes):
+        raise IndexError(f"revision {revision} outside 0..{len(changes)}")
+    state = dict(current)
+    for change in reversed(changes[revision:]):
+        for field, (old, _) in change.changes.items():
+            state[field] = old
+    return state
+
+
+def utc_naive(when) -> datetime.datetime:
+    """``when`` as a naive UTC datetime, as changelog times are stored."""
+    if isinstance(when, str):
+        when = datetime.datetime.fromisoformat(when)
+    if when.tzinfo is not None:
+        when = when.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return when
+
+
+def as_of(
+    session,
+    entity_name: str,
+    entity_id: int,
+    when: datetime.datetime,
+    current: Callable[[], Optional[dict]],
+) -> Optional[dict]:
+    """The object's state at ``when``, or None if it did not exist then.
+
+    ``current`` returns the object's present state, or None if it has been
+    deleted; it is only called when no snapshot was logged after ``when``.
+    Naive times are taken to be UTC. List fields (links, events) are not logged,
+    so states rebuilt from a snapshot leave them out.
+    """
+    when = utc_naive(when)
+    table = orm.ChangelogORM
+    entries = select(table).filter_by(entity_name=entity_name, entity_id=entity_id)
+    position = tuple_(table.modified_datetime, table.id)
+    is_snapshot = table.revised_object_json.is_not(None)
+
+    base = session.scalars(
+        entries.where(is_snapshot, table.modified_datetime <= when)
+        .order_by(table.modified_datetime.desc(), table.id.desc())
+        .limit(1)
+    ).first()
+    if base is not None:
+        # Replay the entries after the snapshot, up to ``when``
+        state = decode_state(base.revised_object_json)
+        later = session.scalars(
+            entries.where(
+                position > (base.modified_datetime, base.id),
+                table.modified_datetime <= when,
+            ).order_by(table.modified_datetime, table.id)
+        )
+        for row in later:
+            for field, (_, new) in decode_changes(row).items():
+                state[field] = new
+    else:
+        # Undo the entries after ``when`` from the next snapshot, or from the
+        # current state if there is none yet
+        base = session.scalars(
+            entries.where(is_snapshot, table.modified_datetime > when)
+            .order_by(table.modified_datetime, table.id)
+            .limit(1)
+        ).first()
+        undo = entries.where(table.modified_datetime > when)
+        if base is not None:
+            state = decode_state(base.revised_object_json)
+            undo = undo.where(position <= (base.modified_datetime, base.id))
+        else:
+            state = current()
+            if state is None:
+                return None
+            state = dict(state)
+        rows = session.scalars(
+            undo.order_by(table.modified_datetime.desc(), table.id.desc())
+        )
+        for row in rows:
+            for field, (old, _) in decode_changes(row).items():
+                state[field] = old
+
+    created_at = state.get("created_at")
+    if created_at is not None and utc_naive(created_at) > when:
+        return None
+    return state
@@ -0,0 +1,362 @@
+"""Text extraction from uploaded and ingested files.
+
+Each supported file type has an ``Extractor`` in ``EXTRACTORS``, looked up by
+file extension; ``register`` adds more. Extraction is CPU-bound, so it runs in
+a shared pool of worker processes, each task limited to its format's entry in
+``EXTRACTION_TIMEOUT_SECONDS``. PDFs are opened by a pool task; those of at
+least ``PDF_PARALLEL_MIN_PAGES`` pages are then split into runs of at least
+``PDF_PAGES_PER_TASK`` pages that are extracted in parallel, and the page
+texts are joined once at the end.
+
+``extract`` handles one file; ``extract_many`` keeps the pool busy with several
+files at once, as the headless CLI does for a whole share.
+"""
+
+import atexit
+import datetime
+import html.parser
+import multiprocessing
+import os
+import signal
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import core.config as config
+import core.domain.commands as commands
+from core import tracing
+from core.domain.error_messages import ExtractionTimeoutError, UnsupportedFileTypeError
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Files submitted to the pool per worker before extract_many waits for results
+FILES_IN_FLIGHT_PER_WORKER = 4
+
+
+@dataclass
+class Extracted:
+    text: str
+    html_text: Optional[str] = None
+    # Core properties of Office documents, e.g. "created", "creator"
+    properties: Dict[str, str] = field(default_factory=dict)
+    comments: Optional[List[tuple]] = None
+
+
+def extraction_workers() -> int:
+    return config.EXTRACTION_PROCESSES or os.cpu_count() or 1
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """The process pool shared by all extractions, started on first use."""
+    global _pool
+    with _pool_lock:
+        # A worker that died (e.g. killed for memory) leaves the pool unusable
+        if _pool is not None and getattr(_pool, "_broken", False):
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            # Spawned rather than forked, as the web app runs threads
+            _pool = ProcessPoolExecutor(
+                max_workers=extraction_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(shutdown_extraction_pool)
+        return _pool
+
+
+def shutdown_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def run_with_timeout(timeout: float, function: Callable, *args):
+    """Calls ``function``, raising ExtractionTimeoutError after ``timeout``
+    seconds. Without SIGALRM (on Windows, or off the main thread as with a
+    thread pool) the call is not limited."""
+    if (
+        not timeout
+        or not hasattr(signal, "setitimer")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        return function(*args)
+
+    def expire(signum, frame):
+        raise ExtractionTimeoutError(
+            f"{function.__name__}{args} took longer than {timeout}s"
+        )
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# The extractors run in the worker processes, so are module-level functions.
+
+
+def extract_docx(path: str) -> Extracted:
+    from docx2python import docx2python  # Slow to import, so only on first use
+
+    document = docx2python(path)
+    return Extracted(
+        text=document.text,
+        html_text=docx2python(path, html=True).text,
+        properties={k: v for k, v in document.properties.items() if v is not None},
+        comments=document.comments,
+    )
+
+
+def extract_pdf_pages(path: str, start: int, stop: int) -> List[str]:
+    """Text of pages ``start`` to ``stop - 1``."""
+    import pypdf  # Only needed for PDFs, so imported on first use
+
+    pages = pypdf.PdfReader(path).pages
+    return [pages[number].extract_text() for number in range(start, stop)]
+
+
+def read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        return file.read()
+
+
+def extract_text(path: str) -> Extracted:
+    return Extracted(text=read_text(path))
+
+
+class HTMLTextParser(html.parser.HTMLParser):
+    SKIPPED = {"script", "style", "head", "template"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+    def __init__(self):
+        super().__init__()
+        self.pieces: List[str] = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self.skipping += 1
+        elif tag in self.BLOCKS:
+            self.pieces.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in self.BLOCKS:
+            self.pieces.append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.pieces.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.pieces).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def extract_html(path: str) -> Extracted:
+    source = read_text(path)
+    parser = HTMLTextParser()
+    parser.feed(source)
+    parser.close()
+    return Extracted(text=parser.text(), html_text=source)
+
+
+class PendingExtraction:
+    """The pool tasks extracting one file."""
+
+    def __init__(self, futures: List[Future], combine: Callable[[list], Extracted]):
+        self.futures = futures
+        self.combine = combine
+
+    def result(self) -> Extracted:
+        return self.combine([future.result() for future in self.futures])
+
+
+@dataclass(frozen=True)
+class Extractor:
+    name: str  # Its key in EXTRACTION_TIMEOUT_SECONDS
+    extensions: Tuple[str, ...]
+    media_types: Tuple[str, ...]
+    function: Optional[Callable[[str], Extracted]] = None
+    # Submits a file's tasks itself, instead of one call to ``function``
+    submit: Optional[Callable[..., PendingExtraction]] = None
+
+    @property
+    def timeout(self) -> float:
+        return config.EXTRACTION_TIMEOUT_SECONDS.get(self.name, 0)
+
+    def start(self, path: str, executor: Executor) -> PendingExtraction:
+        if self.submit is not None:
+            return self.submit(self, path, executor)
+        future = executor.submit(run_with_timeout, self.timeout, self.function, path)
+        return PendingExtraction([future], lambda results: results[0])
+
+
+def open_pdf(path: str, split_from: Optional[int]) -> Union[List[str], int]:
+    """The text of each page, or just the page count if the PDF has at least
+    ``split_from`` pages, for the caller to split it into runs."""
+    import pypdf
+
+    pages = pypdf.PdfReader(path).pages
+    if split_from is not None and len(pages) >= split_from:
+        return len(pages)
+    return [page.extract_text() for page in pages]
+
+
+class PendingPdf(PendingExtraction):
+    """A PDF being opened by a pool task; a large one is then extracted in
+    runs of pages on the pool."""
+
+    def __init__(self, extractor: "Extractor", path: str, executor: Executor):
+        workers = extraction_workers()
+        split_from = config.PDF_PARALLEL_MIN_PAGES if workers > 1 else None
+        # Even counting pages parses the file, so it runs in the pool too,
+        # limited by the timeout
+        opening = executor.submit(
+            run_with_timeout, extractor.timeout, open_pdf, path, split_from
+        )
+        super().__init__([opening], self.combine_runs)
+        self.extractor = extractor
+        self.path = path
+        self.executor = executor
+        self.workers = workers
+
+    def result(self) -> Extracted:
+        opened = self.futures[0].result()
+        if isinstance(opened, list):
+            return Extracted(text="".join(opened))
+        page_count = opened
+        # Each run opens the file again, so runs are no shorter than needed to
+        # give every worker one
+        step = max(config.PDF_PAGES_PER_TASK, -(-page_count // self.workers))
+        runs = [
+            self.executor.submit(
+                run_with_timeout,
+                self.extractor.timeout,
+                extract_pdf_pages,
+                self.path,
+                start,
+                min(start + step, page_count),
+            )
+            for start in range(0, page_count, step)
+        ]
+        return self.combine_runs([run.result() for run in runs])
+
+    @staticmethod
+    def combine_runs(runs: List[List[str]]) -> Extracted:
+        return Extracted(text="".join(text for run in runs for text in run))
+
+
+# File extension: extractor
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register(extractor: Extractor):
+    for extension in extractor.extensions:
+        EXTRACTORS[extension] = extractor
+
+
+for _extractor in (
+    Extractor(
+        "docx",
+        (".docx",),
+        ("application/vnd.openxmlformats-officedocument" ".wordprocessingml.document",),
+        function=extract_docx,
+    ),
+    Extractor("pdf", (".pdf",), ("application/pdf",), submit=PendingPdf),
+    Extractor("txt", (".txt",), ("text/plain",), function=extract_text),
+    Extractor("html", (".html", ".htm"), ("text/html",), function=extract_html),
+    Extractor("md", (".md", ".markdown"), ("text/markdown",), function=extract_text),
+):
+    register(_extractor)
+
+
+def extractor_for(path: str) -> Extractor:
+    extension = os.path.splitext(path)[1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise UnsupportedFileTypeError(f"No extractor for {extension or path!r}.")
+    return extractor
+
+
+def is_supported(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in EXTRACTORS
+
+
+def extract(path: str, executor: Optional[Executor] = None) -> Extracted:
+    """Extracts one file on ``executor``, by default the shared pool."""
+    extractor = extractor_for(path)
+    with tracing.span("extract", path=path, extractor=extractor.name):
+        return extractor.start(path, executor or get_extraction_pool()).result()
+
+
+def result_of(path: str, started: Union[PendingExtraction, Exception]):
+    if isinstance(started, Exception):
+        return path, started
+    try:
+        return path, started.result()
+    except Exception as e:
+        return path, e
+
+
+def extract_many(
+    paths: Iterable[str], executor: Optional[Executor] = None
+) -> Iterator[Tuple[str, Union[Extracted, Exception]]]:
+    """Extracts ``paths``, yielding each in order with its result or the error
+    it raised. Later files are submitted while earlier ones are waited on, so
+    every worker has work."""
+    executor = executor or get_extraction_pool()
+    in_flight = FILES_IN_FLIGHT_PER_WORKER * extraction_workers()
+    pending: deque = deque()
+    for path in paths:
+        try:
+            pending.append((path, extractor_for(path).start(path, executor)))
+        except Exception as e:
+            pending.append((path, e))
+        if len(pending) > in_flight:
+            yield result_of(*pending.popleft())
+    while pending:
+        yield result_of(*pending.popleft())
+
+
+def parse_property_time(value: Optional[str]) -> Optional[datetime.datetime]:
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    except (TypeError, ValueError):
+        return None
+
+
+def document_command(
+    path: str, extracted: Extracted, filepath: Optional[str] = None, **fields
+) -> commands.CreateDocument:
+    """The command that stores an extracted file. Authors and times come from
+    the file's properties where it has them; ``fields`` override both."""
+    filepath = filepath or path
+    properties = extracted.properties
+    values = dict(
+        filepath=filepath,
+        filename=os.path.basename(filepath),
+        filetype=os.path.splitext(path)[1].lower(),
+        text=extracted.text,
+        html_text=extracted.html_text,
+        processed_at=datetime.datetime.now(),
+        created_by=properties.get("creator", "CKEMPLEN"),
+        last_modified_by=properties.get("lastModifiedBy", "CKEMPLEN"),
+        revision=properties.get("revision", 0),
+        doc_comments=extracted.comments,
+    )
+    for name, key in (("last_modified_at", "modified"), ("created_at", "created")):
+        parsed = parse_property_time(properties.get(key))
+        if parsed is not None:
+            values[name] = parsed
+    values.update(fields)
+    return commands.CreateDocument(**values)
@@ -0,0 +1,189 @@
+"""Finds new and changed files under watched directories and ingests them.
+
+Every file the watcher has read is recorded in the ``file_state`` table with
+its size, modification time and SHA-256. A scan only stats the supported files
+under each directory; a file is read when its size or time differ from its
+record, and ingested when its hash does too, so files that were only touched
+or copied over unchanged are not ingested again. Files modified within the
+debounce period are left for a later scan, as they may still be being written.
+
+A file that cannot be extracted is recorded with the error and retried once it
+changes; one whose ingestion fails is not recorded, so the next scan retries it.
+"""
+
+import abc
+import datetime
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import core.adapters.orm as orm
+import core.config as config
+import core.domain.commands as commands
+from core.adapters import extraction
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class FileState:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: Optional[str] = None
+    ingested_at: Optional[datetime.datetime] = None
+    last_error: Optional[str] = None
+
+
+def scan(directories: Iterable[str]) -> Iterator[FileState]:
+    """The supported files under ``directories`` with their size and time."""
+    for directory in directories:
+        for root, dirs, files in os.walk(os.path.abspath(directory)):
+            dirs.sort()
+            for name in sorted(files):
+                # Office writes "~$name.docx" lock files next to open documents
+                if name.startswith("~$") or not extraction.is_supported(name):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed since it was listed
+                yield FileState(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AbstractFileStateStore(abc.ABC):
+    @abc.abstractmethod
+    def get_all(self) -> Dict[str, FileState]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save(self, states: List[FileState]):
+        raise NotImplementedError
+
+
+class SqlAlchemyFileStateStore(AbstractFileStateStore):
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def get_all(self) -> Dict[str, FileState]:
+        with self.session_factory() as session:
+            return {
+                row.path: FileState(**row.to_dict())
+                for row in session.query(orm.FileStateORM)
+            }
+
+    def save(self, states: List[FileState]):
+        if not states:
+            return
+        with self.session_factory() as session:
+            for state in states:
+                session.merge(orm.FileStateORM(**vars(state)))
+            session.commit()
+
+
+class DirectoryWatcher:
+    def __init__(
+        self,
+        directories: Iterable[str],
+        store: AbstractFileStateStore,
+        ingest: Callable[[commands.CreateDocument], object],
+        debounce: float = config.WATCH_DEBOUNCE_SECONDS,
+        executor: Optional[Executor] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.directories = list(directories)
+        self.store = store
+        self.ingest = ingest
+        self.debounce = debounce
+        self.executor = executor
+        self.clock = clock
+        self._known: Optional[Dict[str, FileState]] = None
+
+    @property
+    def known(self) -> Dict[str, FileState]:
+        # Loaded once; afterwards the watcher is the only writer it relies on
+        if self._known is None:
+            self._known = self.store.get_all()
+        return self._known
+
+    def record(self, states: List[FileState]):
+        self.store.save(states)
+        self.known.update((state.path, state) for state in states)
+
+    def changed_files(self) -> Dict[str, FileState]:
+        """New and changed files that have settled, by path. Files whose
+        content is unchanged are recorded with their new size and time."""
+        settled_before_ns = int((self.clock() - self.debounce) * 1e9)
+        changed, unchanged = {}, []
+        for state in scan(self.directories):
+            known = self.known.get(state.path)
+            if known and known.size == state.size and known.mtime_ns == state.mtime_ns:
+                continue
+            if state.mtime_ns > settled_before_ns:
+                continue
+            try:
+                state.sha256 = file_hash(state.path)
+            except OSError:
+                continue
+            if known is not None and known.sha256 == state.sha256:
+                state.ingested_at = known.ingested_at
+                state.last_error = known.last_error
+                unchanged.append(state)
+            else:
+                changed[state.path] = state
+        self.record(unchanged)
+        return changed
+
+    def scan_once(self) -> List[str]:
+        """Ingests the new and changed files, returning their paths."""
+        changed = self.changed_files()
+        ingested = []
+        for path, extracted in extraction.extract_many(changed, self.executor):
+            state = changed[path]
+            if isinstance(extracted, Exception):
+                logger.warning("Could not extract %s: %r", path, extracted)
+                state.last_error = repr(extracted)
+            else:
+                try:
+                    self.ingest(extraction.document_command(path, extracted))
+                except Exception:
+                    logger.exception("Could not ingest %s", path)
+                    continue
+                state.ingested_at = datetime.datetime.now()
+                ingested.append(path)
+            # Recorded one at a time, so a stopped watcher does not ingest the
+            # files it had finished again
+            self.record([state])
+        return ingested
+
+    def watch(
+        self,
+        interval: float = config.WATCH_INTERVAL_SECONDS,
+        stop_event=None,
+    ):
+        """Scans every ``interval`` seconds until ``stop_event`` is set."""
+        while stop_event is None or not stop_event.is_set():
+            started = self.clock()
+            ingested = self.scan_once()
+            if ingested:
+                logger.info("Ingested %s changed files", len(ingested))
+            wait = max(interval - (self.clock() - started), 0)
+            if stop_event is None:
+                time.sleep(wait)
+            else:
+                stop_event.wait(wait)
@@ -1,12 +1,14 @@
-import requests
 import abc
 import json
-import tiktoken
 import datetime
+import functools
 import logging
+import re
+import zlib
 import core.config as config
+from core import tracing
 
-from typing import TypedDict, List, Dict, NotRequired
+from typing import TypedDict, List, Dict, NotRequired, Optional
 
 logging.basicConfig(level=logging.INFO)
 
@@ -50,6 +52,13 @@ class CanonicalEntityResponseItem(TypedDict):
 CanonicalEntityResponse = List[CanonicalEntityResponseItem]
 
 
+@functools.lru_cache(maxsize=None)
+def get_token_encoding(model: str = "gpt-4o-2024-05-13"):
+    import tiktoken  # Slow to import and load, so only done on first use
+
+    return tiktoken.encoding_for_model(model)
+
+
 class AbstractConnector(abc.ABC):
     token_count = {
         "total": {"input": 0, "output": 0},
@@ -59,14 +68,16 @@ class AbstractConnector(abc.ABC):
         pass
 
     def generate(self, **kwargs):
-        result = self._generate(**kwargs)
+        with tracing.span(f"{self.__class__.__name__}.generate"):
+            result = self._generate(**kwargs)
 
         try:
             # Generate a unique key using the concrete class's name and a datetime stamp
             generation_uuid = f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}-{self.__class__.__name__}"
 
-            new_input_tokens = self.calculate_tokens(**kwargs)
-            new_output_tokens = self.calculate_tokens(result=result)
+            with tracing.span(f"{self.__class__.__name__}.calculate_tokens"):
+                new_input_tokens = self.calculate_tokens(**kwargs)
+                new_output_tokens = self.calculate_tokens(result=result)
 
             # Update class token count
             AbstractConnector.token_count["total"]["input"] += new_input_tokens
@@ -97,8 +108,7 @@ class AbstractConnector(abc.ABC):
 
     def calculate_tokens(self, **kwargs) -> int:
         input_str = json.dumps(kwargs)
-        encoding = tiktoken.encoding_for_model("gpt-4o-2024-05-13")
-        num_tokens = len(encoding.encode(input_str))
+        num_tokens = len(get_token_encoding().encode(input_str))
         return num_tokens
 
     @abc.abstractmethod
@@ -150,6 +160,8 @@ class DocumentAnalysisConnector(AbstractConnector):
         return self.process_document(**kwargs)
 
     def process_document(self, document_text) -> DocumentAnalysisResponse:
+        import requests
+
         data = {
             "document_text": document_text,
         }
@@ -182,6 +194,8 @@ class CanonicalEntityConsolidationConnector(AbstractConnector):
     def consolidate(
         self, raw_entities: List[Dict], existing_canonical_entities: List[Dict] = []
     ) -> List[CanonicalEntityResponseItem]:
+        import requests
+
         data = {
             "raw_entities": raw_entities,
             "existing_canonical_entities": existing_canonical_entities,
@@ -200,3 +214,80 @@ class CanonicalEntityConsolidationConnector(AbstractConnector):
         except Exception as e:
             print("Exception...")
             print(e)
+
+
+class AbstractEmbeddingConnector(AbstractConnector):
+    def calculate_tokens(self, **kwargs) -> int:
+        if "result" in kwargs:
+            return 0  # Embeddings are vectors, not generated tokens
+        return super().calculate_tokens(**kwargs)
+
+
+class FakeEmbeddingConnector(AbstractEmbeddingConnector):
+    """Deterministic local embeddings by feature hashing, for tests.
+
+    Texts that share words get similar vectors, which is enough to exercise
+    similarity search without a model.
+    """
+
+    def __init__(self, dimensions: int = None):
+        super().__init__()
+        self.dimensions = dimensions or config.EMBEDDING_DIMENSIONS
+
+    def _generate(self, **kwargs):
+        return self.embed(**kwargs)
+
+    def calculate_tokens(self, **kwargs) -> int:
+        return 0
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                digest = zlib.crc32(word.encode())
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dimensions] += sign
+        return vectors.tolist()
+
+
+class EmbeddingConnector(AbstractEmbeddingConnector):
+    def __init__(self):
+        super().__init__()
+        self.FLOW_ENDPOINT = config.EMBEDDING_ENDPOINT
+        self.FLOW_HOST = self.FLOW_ENDPOINT.split(":443")[0]
+
+    def _generate(self, **kwargs):
+        return self.embed(**kwargs)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        import requests
+
+        headers = {"Content-Type": "application/json"}
+        response = requests.post(
+            self.FLOW_ENDPOINT, data=json.dumps({"texts": texts}), headers=headers
+        )
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+
+def embeddings_enabled() -> bool:
+    return bool(config.EMBEDDING_ENDPOINT)
+
+
+@functools.lru_cache(maxsize=None)
+def warn_embeddings_disabled():
+    logging.getLogger(__name__).warning(
+        "EMBEDDING_ENDPOINT is not set: nothing is embedded and similarity "
+        "search is disabled."
+    )
+
+
+def get_embedding_connector() -> Optional[AbstractEmbeddingConnector]:
+    """The configured embedding service, or None without one; embedding
+    handlers then do nothing. FakeEmbeddingConnector is only for tests."""
+    if embeddings_enabled():
+        return EmbeddingConnector()
+    warn_embeddings_disabled()
+    return None
@@ -0,0 +1,257 @@
+import abc
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Iterable, List, Optional, Union
+
+from sqlalchemy import and_, or_, update, delete
+
+import core.adapters.orm as orm
+import core.config
+import core.domain.commands as commands
+import core.domain.events as events
+
+Message = Union[commands.Command, events.Event]
+
+PENDING = "pending"
+LEASED = "leased"
+FAILED = "failed"
+
+
+class TaggedJSONEncoder(json.JSONEncoder):
+    """Encodes datetimes with a tag so they can be restored when decoded."""
+
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return {"__datetime__": obj.isoformat()}
+        return super().default(obj)
+
+
+def _decode_tagged(obj):
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def serialise_message(message: Message) -> dict:
+    if isinstance(message, commands.Command):
+        kind = "command"
+    elif isinstance(message, events.Event):
+        kind = "event"
+    else:
+        raise TypeError(f"{message.__class__.__name__} was not an Event or Command")
+
+    return {
+        "message_kind": kind,
+        "message_type": message.__class__.__name__,
+        "payload_json": json.dumps(asdict(message), cls=TaggedJSONEncoder),
+    }
+
+
+def deserialise_message(message_kind: str, message_type: str, payload_json: str):
+    module = commands if message_kind == "command" else events
+    message_class = getattr(module, message_type, None)
+    if message_class is None:
+        raise ValueError(f"Unknown {message_kind} type: {message_type}")
+    return message_class(**json.loads(payload_json, object_hook=_decode_tagged))
+
+
+@dataclass
+class QueuedMessage:
+    id: int
+    message: Message
+    attempts: int
+    # Event handlers that finished on an earlier attempt
+    handled_by: List[str] = field(default_factory=list)
+
+
+class AbstractMessageQueue(abc.ABC):
+    """A persistent queue of commands and events shared between worker processes.
+
+    Messages are claimed with a lease. A message whose lease runs out before it
+    is acknowledged becomes visible again and can be claimed by another worker.
+    """
+
+    def __init__(
+        self,
+        lease_seconds: float = core.config.WORKER_LEASE_SECONDS,
+        max_attempts: int = core.config.WORKER_MAX_ATTEMPTS,
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def put(self, message: Message, delay: float = 0) -> int:
+        return self._put(serialise_message(message), delay)
+
+    @abc.abstractmethod
+    def _put(self, serialised_message: dict, delay: float) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def claim(self, worker_id: str) -> Optional[QueuedMessage]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def extend_lease(self, message_id: int, worker_id: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def ack(self, message_id: int, worker_id: str) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fail(
+        self,
+        message_id: int,
+        worker_id: str,
+        error: str,
+        handled_by: Iterable[str] = (),
+    ) -> bool:
+        """Releases the message for a retry, or dead-letters it after the last
+        attempt. ``handled_by`` names the event handlers that have finished, so
+        the retry does not run them again."""
+        raise NotImplementedError
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(2**attempts, 60)
+
+
+class SqlAlchemyMessageQueue(AbstractMessageQueue):
+    CLAIM_ATTEMPTS = 5
+
+    def __init__(self, session_factory, **kwargs):
+        super().__init__(**kwargs)
+        self.session_factory = session_factory
+        with self.session_factory() as session:
+            orm.MessageQueueORM.__table__.create(
+                bind=session.get_bind(), checkfirst=True
+            )
+
+    def _put(self, serialised_message: dict, delay: float) -> int:
+        now = time.time()
+        with self.session_factory() as session:
+            queued = orm.MessageQueueORM(
+                **serialised_message,
+                status=PENDING,
+                attempts=0,
+                enqueued_at=now,
+                available_at=now + delay,
+            )
+            session.add(queued)
+            session.commit()
+            return queued.id
+
+    @staticmethod
+    def _claimable(now: float):
+        queue = orm.MessageQueueORM
+        return or_(
+            and_(queue.status == PENDING, queue.available_at <= now),
+            and_(queue.status == LEASED, queue.leased_until < now),
+        )
+
+    def claim(self, worker_id: str) -> Optional[QueuedMessage]:
+        queue = orm.MessageQueueORM
+        with self.session_factory() as session:
+            for _ in range(self.CLAIM_ATTEMPTS):
+                now = time.time()
+                candidate = (
+                    session.query(queue)
+                    .filter(self._claimable(now))
+                    .order_by(queue.available_at, queue.id)
+                    .first()
+                )
+                if candidate is None:
+                    return None
+
+                # Compare-and-swap: only one worker can move the row into its lease.
+                result = session.execute(
+                    update(queue)
+                    .where(queue.id == candidate.id, self._claimable(now))
+                    .values(
+                        status=LEASED,
+                        leased_by=worker_id,
+                        leased_until=now + self.lease_seconds,
+                        attempts=queue.attempts + 1,
+                    )
+                )
+                session.commit()
+                if result.rowcount != 1:
+                    continue
+
+                session.refresh(candidate)
+                return QueuedMessage(
+                    id=candidate.id,
+                    message=deserialise_message(
+                        candidate.message_kind,
+                        candidate.message_type,
+                        candidate.payload_json,
+                    ),
+                    attempts=candidate.attempts,
+                    handled_by=json.loads(candidate.handled_by or "[]"),
+                )
+        return None
+
+    def extend_lease(self, message_id: int, worker_id: str) -> bool:
+        queue = orm.MessageQueueORM
+        with self.session_factory() as session:
+            result = session.execute(
+                update(queue)
+                .where(
+                    queue.id == message_id,
+                    queue.status == LEASED,
+                    queue.leased_by == worker_id,
+                )
+                .values(leased_until=time.time() + self.lease_seconds)
+            )
+            session.commit()
+            return result.rowcount == 1
+
+    def ack(self, message_id: int, worker_id: str) -> bool:
+        queue = orm.MessageQueueORM
+        with self.session_factory() as session:
+            result = session.execute(
+                delete(queue).where(
+                    queue.id == message_id,
+                    queue.status == LEASED,
+                    queue.leased_by == worker_id,
+                )
+            )
+            session.commit()
+            return result.rowcount == 1
+
+    def fail(
+        self,
+        message_id: int,
+        worker_id: str,
+        error: str,
+        handled_by: Iterable[str] = (),
+    ) -> bool:
+        queue = orm.MessageQueueORM
+        with self.session_factory() as session:
+            queued = session.get(queue, message_id)
+            if (
+                queued is None
+                or queued.status != LEASED
+                or queued.leased_by != worker_id
+            ):
+                return False
+            queued.last_error = error
+            queued.handled_by = json.dumps(sorted(set(handled_by)))
+            queued.leased_by = None
+            queued.leased_until = None
+            if queued.attempts >= self.max_attempts:
+                queued.status = FAILED
+            else:
+                queued.status = PENDING
+                queued.available_at = time.time() + self.retry_delay(queued.attempts)
+            session.commit()
+            return True
+
+    def list_failed(self) -> List[orm.MessageQueueORM]:
+        with self.session_factory() as session:
+            return (
+                session.query(orm.MessageQueueORM)
+                .filter(orm.MessageQueueORM.status == FAILED)
+                .all()
+            )
@@ -1,39 +1,44 @@
 from sqlalchemy import (
-    create_engine,
+    BigInteger,
     Column,
     Integer,
     String,
     DateTime,
+    Float,
     ForeignKey,
-    MetaData,
+    Index,
 )
-from sqlalchemy.orm import relationship, sessionmaker, declarative_base
+from sqlalchemy.orm import relationship, declarative_base
 import datetime
-import core.config
-
-metadata = MetaData()
+import functools
+from typing import Tuple
 
 Base = declarative_base()
 
 
+@functools.lru_cache(maxsize=None)
+def column_names(orm_class) -> Tuple[str, ...]:
+    return tuple(column.name for column in orm_class.__table__.columns)
+
+
+def utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
 class BaseWithToDict(Base):
     __abstract__ = True
 
     # Adds to_dict method
     def to_dict(self):
-        return {
-            column.name: getattr(self, column.name) for column in self.__table__.columns
-        }
+        return {name: getattr(self, name) for name in column_names(type(self))}
 
 
 class BaseAudit(BaseWithToDict):
     __abstract__ = True
 
     # Adds audit fields to all inheriting models
-    created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc))
-    last_modified_at = Column(
-        DateTime, onupdate=datetime.datetime.now(datetime.timezone.utc)
-    )
+    created_at = Column(DateTime, default=utc_now)
+    last_modified_at = Column(DateTime, onupdate=utc_now)
     created_by = Column(String)
     last_modified_by = Column(String)
     version = Column(Integer, nullable=False, default=1)
@@ -48,7 +53,10 @@ class DocumentORM(BaseAudit):
     text = Column(String)
     html_text = Column(String)
     previous_version_id = Column(Integer, ForeignKey("Documents.id"))
+    # First version of the file; with version it indexes the whole chain
+    root_document_id = Column(Integer)
     last_modified_by = Column(String)
+    processed_at = Column(DateTime)
     summary = Column(String)
     version_comment = Column(String)
     revision = Column(Integer, default=1)
@@ -58,6 +66,13 @@ class DocumentORM(BaseAudit):
     )
     next_versions = relationship("DocumentORM", back_populates="previous_version")
 
+    __table_args__ = (
+        Index("uq_documents_filepath_version", "filepath", "version", unique=True),
+        Index("ix_documents_filename", "filename"),
+        Index("ix_documents_previous_version_id", "previous_version_id"),
+        Index("ix_documents_root_version", "root_document_id", "version"),
+    )
+
 
 class RawTopicORM(BaseAudit):
     __tablename__ = "RawTopics"
@@ -69,6 +84,8 @@ class RawTopicORM(BaseAudit):
     document = relationship("DocumentORM", back_populates="raw_topics")
     topics = relationship("TopicRawTopicORM", back_populates="raw_topic")
 
+    __table_args__ = (Index("ix_rawtopics_document_id", "document_id"),)
+
 
 class TopicORM(BaseAudit):
     __tablename__ = "Topics"
@@ -89,6 +106,8 @@ class RawEntityORM(BaseAudit):
     document = relationship("DocumentORM", back_populates="raw_entities")
     entities = relationship("EntityRawEntityORM", back_populates="raw_entity")
 
+    __table_args__ = (Index("ix_rawentities_document_id", "document_id"),)
+
 
 class EntityORM(BaseAudit):
     __tablename__ = "Entities"
@@ -98,6 +117,8 @@ class EntityORM(BaseAudit):
     document_entities = relationship("DocumentEntityORM", back_populates="entity")
     raw_entities = relationship("EntityRawEntityORM", back_populates="entity")
 
+    __table_args__ = (Index("uq_entities_entity_name", "entity_name", unique=True),)
+
 
 class StakeholderORM(BaseAudit):
     __tablename__ = "Stakeholders"
@@ -106,6 +127,10 @@ class StakeholderORM(BaseAudit):
     stakeholder_type = Column(String)
     stakeholder_description = Column(String)
 
+    __table_args__ = (
+        Index("uq_stakeholders_stakeholder_name", "stakeholder_name", unique=True),
+    )
+
 
 class DocumentTopicORM(BaseAudit):
     __tablename__ = "DocumentTopics"
@@ -115,6 +140,9 @@ class DocumentTopicORM(BaseAudit):
     document = relationship("DocumentORM", back_populates="document_topics")
     topic = relationship("TopicORM", back_populates="document_topics")
 
+    # The primary key covers lookups by document_id, this covers topic_id.
+    __table_args__ = (Index("ix_documenttopics_topic_id", "topic_id"),)
+
 
 class TopicRawTopicORM(BaseAudit):
     __tablename__ = "TopicsRawTopics"
@@ -124,6 +152,8 @@ class TopicRawTopicORM(BaseAudit):
     topic = relationship("TopicORM", back_populates="raw_topics")
     raw_topic = relationship("RawTopicORM", back_populates="topics")
 
+    __table_args__ = (Index("ix_topicsrawtopics_raw_topic_id", "raw_topic_id"),)
+
 
 class CommentORM(BaseAudit):
     __tablename__ = "Comments"
@@ -135,6 +165,8 @@ class CommentORM(BaseAudit):
     comment_date = Column(DateTime)
     document = relationship("DocumentORM", back_populates="comments")
 
+    __table_args__ = (Index("ix_comments_document_id", "document_id"),)
+
 
 class DocumentEntityORM(BaseAudit):
     __tablename__ = "DocumentEntities"
@@ -144,6 +176,8 @@ class DocumentEntityORM(BaseAudit):
     document = relationship("DocumentORM", back_populates="document_entities")
     entity = relationship("EntityORM", back_populates="document_entities")
 
+    __table_args__ = (Index("ix_documententities_entity_id", "entity_id"),)
+
 
 class EntityRawEntityORM(BaseAudit):
     __tablename__ = "EntitiesRawEntities"
@@ -153,19 +187,102 @@ class EntityRawEntityORM(BaseAudit):
     entity = relationship("EntityORM", back_populates="raw_entities")
     raw_entity = relationship("RawEntityORM", back_populates="entities")
 
+    __table_args__ = (Index("ix_entitiesrawentities_raw_entity_id", "raw_entity_id"),)
+
 
 class ChangelogORM(
     BaseWithToDict
 ):  # Not inheriting BaseORM because audit fields not needed
     __tablename__ = "changelogs"
     id = Column(Integer, primary_key=True, autoincrement=True)
-    modified_datetime = Column(
-        DateTime, default=datetime.datetime.now(datetime.timezone.utc)
-    )
+    modified_datetime = Column(DateTime, default=utc_now)
+    # Full snapshots: both in entries written before changes_json existed, the
+    # revised state in every CHANGELOG_SNAPSHOT_INTERVAL-th entry since
     previous_object_json = Column(String)
     revised_object_json = Column(String)
     entity_name = Column(String)
     entity_id = Column(Integer)
+    changes_json = Column(String)  # {field: [old, new]}, see core.adapters.changelog
+
+    __table_args__ = (
+        Index(
+            "ix_changelogs_entity_time", "entity_name", "entity_id", "modified_datetime"
+        ),
+    )
+
+
+class MessageQueueORM(BaseWithToDict):  # Infrastructure table, no audit fields
+    __tablename__ = "message_queue"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    message_kind = Column(String, nullable=False)  # "command" or "event"
+    message_type = Column(String, nullable=False)
+    payload_json = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    enqueued_at = Column(Float, nullable=False)
+    available_at = Column(Float, nullable=False)
+    leased_by = Column(String)
+    leased_until = Column(Float)
+    last_error = Column(String)
+    handled_by = Column(String)  # JSON list of the event handlers that finished
+
+    __table_args__ = (
+        Index("ix_message_queue_status_available", "status", "available_at"),
+    )
+
+
+class SearchParagraphORM(BaseWithToDict):  # Content of the search_index FTS table
+    __tablename__ = "search_paragraphs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # document, comment, topic or entity
+    ref_id = Column(Integer, nullable=False)
+    document_id = Column(Integer)
+    field = Column(String, nullable=False)
+    position = Column(Integer, nullable=False, default=0)
+    title = Column(String)
+    body = Column(String, nullable=False)
+
+    __table_args__ = (Index("ix_search_paragraphs_ref", "kind", "ref_id"),)
+
+
+class GraphNodeMetricsORM(BaseWithToDict):  # Written by core.graphs.analytics
+    __tablename__ = "graph_node_metrics"
+    node_type = Column(String, primary_key=True)  # document, entity or topic
+    node_id = Column(Integer, primary_key=True)
+    degree = Column(Integer, nullable=False)
+    weighted_degree = Column(Float, nullable=False)
+    pagerank = Column(Float, nullable=False)
+    component = Column(Integer, nullable=False)
+    computed_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_graph_node_metrics_pagerank", "node_type", "pagerank"),)
+
+
+class EntityCooccurrenceORM(BaseWithToDict):  # Stored once per pair, entity_id < other
+    __tablename__ = "entity_cooccurrences"
+    entity_id = Column(Integer, ForeignKey("Entities.id"), primary_key=True)
+    other_entity_id = Column(Integer, ForeignKey("Entities.id"), primary_key=True)
+    document_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_entity_cooccurrences_other_entity_id", "other_entity_id"),
+    )
+
+
+class GraphAnalyticsLinkORM(BaseWithToDict):  # DocumentEntities already counted
+    __tablename__ = "graph_analytics_links"
+    document_id = Column(Integer, primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+
+
+class FileStateORM(BaseWithToDict):  # Written by core.adapters.file_watcher
+    __tablename__ = "file_state"
+    path = Column(String, primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    sha256 = Column(String, nullable=False)
+    ingested_at = Column(DateTime)
+    last_error = Column(String)  # Extraction failed; retried once the file changes
 
 
 DocumentORM.raw_topics = relationship("RawTopicORM", back_populates="document")
@@ -176,10 +293,3 @@ DocumentORM.raw_entities = relationship("RawEntityORM", back_populates="document
 DocumentORM.document_entities = relationship(
     "DocumentEntityORM", back_populates="document"
 )
-
-
-engine = create_engine(f"sqlite:///{core.config.DATABASE_PATH}")
-
-metadata.create_all(engine)
-
-Session = sessionmaker(bind=engine)
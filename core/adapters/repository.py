@@ -1,33 +1,144 @@
 import abc
+import copy
+import functools
+from collections import defaultdict
 import core.domain.model as model
 import core.domain.commands as commands
 import core.adapters.orm as orm
-from typing import List, Dict, Union
-from datetime import datetime
-import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import NoResultFound
 
-from dataclasses import asdict
+from core import tracing
+from core.adapters import changelog, search
 
-
-class DatetimeJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+from dataclasses import asdict, fields as dataclass_fields
 
 
 def log_change(session, entity_name, entity_id, previous_object, revised_object):
-    changelog = orm.ChangelogORM(
-        previous_object_json=json.dumps(previous_object, cls=DatetimeJSONEncoder),
-        revised_object_json=json.dumps(revised_object, cls=DatetimeJSONEncoder),
-        entity_name=entity_name,
-        entity_id=entity_id,
-    )
-    session.add(changelog)
-    session.flush()
+    """Queues a changelog entry with the changed fields; it is written when the
+    unit of work commits."""
+    with tracing.span("log_change", entity_name=entity_name, entity_id=entity_id):
+        changelog.record(
+            session, entity_name, entity_id, previous_object, revised_object
+        )
     return None
 
 
+def traced(method):
+    """Runs a repository method in a span named after the repository."""
+
+    @functools.wraps(method)
+    def traced_method(self, *args, **kwargs):
+        with tracing.span(f"{self.__class__.__name__}.{method.__name__}"):
+            return method(self, *args, **kwargs)
+
+    return traced_method
+
+
+# Rows fetched per round trip when streaming, e.g. for list endpoints
+STREAM_BATCH_SIZE = 500
+
+
+def stream_rows(
+    session, orm_class, batch_size: int, columns: Optional[List[str]] = None
+) -> Iterator[dict]:
+    """Yields a table's rows as dicts, ``batch_size`` at a time.
+
+    Plain column rows are fetched with ``yield_per`` (a server-side cursor where
+    the driver supports one), so neither the result nor ORM objects for it are
+    ever held in memory at once.
+    """
+    table = orm_class.__table__
+    selected = [table.c[name] for name in columns] if columns else list(table.c)
+    statement = (
+        select(*selected)
+        .order_by(*table.primary_key.columns)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in session.execute(statement).mappings().partitions():
+        for row in partition:
+            yield dict(row)
+
+
+def constant(value):
+    return lambda: value
+
+
+@functools.lru_cache(maxsize=None)
+def model_defaults(model_class) -> Tuple[Tuple[str, Callable], ...]:
+    """(field name, factory) for every field of ``model_class`` with a default;
+    mutable defaults are copied so instances never share them."""
+    defaults = []
+    for name, field in model_class.model_fields.items():
+        if field.default_factory is not None:
+            defaults.append((name, field.default_factory))
+        elif isinstance(field.default, (list, dict, set)):
+            factory = (
+                type(field.default)
+                if not field.default
+                else functools.partial(copy.deepcopy, field.default)
+            )
+            defaults.append((name, factory))
+        elif field.default is not PydanticUndefined:
+            defaults.append((name, constant(field.default)))
+    return tuple(defaults)
+
+
+def trusted_model(model_class, values: dict) -> BaseModel:
+    """Builds ``model_class`` from column values read from our own database.
+
+    Like ``model_construct`` nothing is validated, but defaults come from
+    ``model_defaults`` (pydantic inspects each default factory's signature on
+    every ``model_construct`` call). ``values`` becomes the instance's dict.
+    """
+    fields_set = set(values)
+    for name, factory in model_defaults(model_class):
+        if name not in values:
+            values[name] = factory()
+    instance = model_class.__new__(model_class)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def load_rows(session, orm_class, *criteria) -> List[dict]:
+    """Column values of the matching rows, without building ORM objects."""
+    table = orm_class.__table__
+    names = orm.column_names(orm_class)
+    statement = select(*table.c).where(*criteria).order_by(*table.primary_key.columns)
+    return [dict(zip(names, row)) for row in session.execute(statement)]
+
+
+def load_models(session, orm_class, model_class, *criteria) -> List[BaseModel]:
+    return [
+        trusted_model(model_class, values)
+        for values in load_rows(session, orm_class, *criteria)
+    ]
+
+
+# Link dataclass: the table its rows are stored in
+LINK_TABLES = {
+    model.DocumentTopic: orm.DocumentTopicORM,
+    model.TopicRawTopic: orm.TopicRawTopicORM,
+    model.DocumentEntity: orm.DocumentEntityORM,
+    model.EntityRawEntity: orm.EntityRawEntityORM,
+}
+
+
+def load_links(session, link_class, *criteria) -> model.LinkColumns:
+    """The matching links of one kind, read straight into columns."""
+    orm_class = LINK_TABLES[link_class]
+    columns = [getattr(orm_class, f.name) for f in dataclass_fields(link_class)]
+    return model.LinkColumns.from_rows(
+        link_class, session.execute(select(*columns).where(*criteria))
+    )
+
+
 ORM_OBJECT = Union[
     None,
     orm.DocumentEntityORM,
@@ -52,42 +163,140 @@ DOMAIN_DATACLASS = Union[
 
 
 class AbstractRepository(abc.ABC):
+    # Domain model of the aggregates, named in their changelog entries
+    model_class: Optional[type] = None
+
     def __init__(self):
         self.seen = set()
+        # Aggregates added or loaded in this unit of work, by id, and the state
+        # they were stored with. Repositories are created per unit of work, so
+        # each aggregate is fetched and converted once per transaction.
+        self.identity_map: Dict[int, PYDANTIC_OBJECT] = {}
+        self.stored_state: Dict[int, dict] = {}
+
+    def remember(self, obj: PYDANTIC_OBJECT, state: Optional[dict] = None):
+        self.identity_map[obj.id] = obj
+        # Callers change the objects they get before passing them to update(),
+        # so the stored state is copied now for the changelog.
+        self.stored_state[obj.id] = obj.model_dump() if state is None else state
+
+    def forget(self, id: int):
+        self.identity_map.pop(id, None)
+        self.stored_state.pop(id, None)
+
+    def clear_identity_map(self):
+        self.identity_map.clear()
+        self.stored_state.clear()
 
     def add(self, cmd) -> PYDANTIC_OBJECT:
-        return_obj: ORM_OBJECT = self._add(cmd)
+        with tracing.span(f"{self.__class__.__name__}.add"):
+            return_obj: ORM_OBJECT = self._add(cmd)
         self.seen.add(return_obj)
+        if return_obj is not None:
+            self.remember(return_obj)
         return return_obj
 
     def update(
         self, updated_obj: PYDANTIC_OBJECT, fields: List[str]
     ) -> PYDANTIC_OBJECT:
-        original_object: PYDANTIC_OBJECT = self._get(reference=updated_obj.id)
-        updated_obj.version = original_object.version + 1
-        return_obj: PYDANTIC_OBJECT = self._update(updated_obj, fields)
-        self.seen.add(
-            return_obj
-        )  # Still use this to get any events added to the revised entity object.
-        # Log the change
-        log_change(
-            self.session,
-            entity_name=updated_obj.__class__.__name__,
-            entity_id=updated_obj.id,
-            previous_object=original_object.model_dump(),
-            revised_object=return_obj.model_dump(),
-        )
+        with tracing.span(f"{self.__class__.__name__}.update", fields=fields):
+            previous_state = self.stored_state.get(updated_obj.id)
+            if previous_state is None:
+                previous_state = self._get(reference=updated_obj.id).model_dump()
+            updated_obj.version = previous_state["version"] + 1
+            return_obj: PYDANTIC_OBJECT = self._update(updated_obj, fields)
+            self.seen.add(
+                return_obj
+            )  # Still use this to get any events added to the revised entity object.
+            # Only ``fields`` are written, so the other values the caller's
+            # object carries (e.g. command audit defaults) are not the row's
+            revised_state = {
+                **previous_state,
+                **updated_obj.model_dump(include=set(fields)),
+                "version": updated_obj.version,
+            }
+            # Later gets return what was stored, not the caller's object
+            stored_obj = return_obj.model_copy(
+                update={
+                    field: value
+                    for field, value in revised_state.items()
+                    if not isinstance(value, list)
+                }
+            )
+            if "events" in type(stored_obj).model_fields:
+                stored_obj.events = []  # Collected from return_obj
+            self.remember(stored_obj, revised_state)
+            # Log the change
+            log_change(
+                self.session,
+                entity_name=updated_obj.__class__.__name__,
+                entity_id=updated_obj.id,
+                previous_object=previous_state,
+                revised_object=revised_state,
+            )
 
         return return_obj
 
+    @traced
+    def history(self, reference) -> List[changelog.Change]:
+        """Logged changes to one object, oldest first."""
+        current = self.get(reference)
+        changelog.write_pending(self.session)
+        return changelog.history(self.session, type(current).__name__, reference)
+
+    @traced
+    def get_revision(self, reference, revision: int) -> PYDANTIC_OBJECT:
+        """The object after the first ``revision`` of its logged changes, 0
+        being the object before any of them."""
+        current = self.get(reference)
+        state = changelog.rebuild(
+            current.model_dump(), self.history(reference), revision
+        )
+        return type(current).model_validate(state)
+
+    @traced
+    def get_as_of(self, reference, when) -> Optional[PYDANTIC_OBJECT]:
+        """The object as it was at ``when``, or None if it did not exist yet or
+        has since been deleted without a snapshot to rebuild it from."""
+        changelog.write_pending(self.session)
+
+        def current():
+            try:
+                entity = self.get(reference)
+            except NoResultFound:
+                return None
+            return entity.model_dump() if entity is not None else None
+
+        state = changelog.as_of(
+            self.session, self.model_class.__name__, reference, when, current
+        )
+        return None if state is None else self.model_class.model_validate(state)
+
     def get(self, reference) -> PYDANTIC_OBJECT:
-        entity = self._get(reference)
+        entity = self.identity_map.get(reference)
+        if entity is not None:
+            return entity
+        with tracing.span(f"{self.__class__.__name__}.get", reference=reference):
+            entity = self._get(reference)
         if entity:
             self.seen.add(entity)
+            self.remember(entity)
         return entity
 
+    @traced
+    def stream(
+        self, batch_size: int = STREAM_BATCH_SIZE, columns: Optional[List[str]] = None
+    ) -> Iterator[dict]:
+        """Column values of every row, for read-only listings. Nothing is added
+        to ``seen``, so this cannot carry events. Rows are fetched as the caller
+        iterates, after its span has ended."""
+        return self._stream(batch_size, columns)
+
     def list(self) -> List[PYDANTIC_OBJECT]:
-        objects_list: List[PYDANTIC_OBJECT] = self._list()
+        with tracing.span(f"{self.__class__.__name__}.list") as list_span:
+            objects_list: List[PYDANTIC_OBJECT] = self._list()
+            if list_span is not None:
+                list_span.set_attribute("count", len(objects_list))
         for object in objects_list:
             self.seen.add(object)
         return objects_list
@@ -104,10 +313,15 @@ class AbstractRepository(abc.ABC):
     def _list(self):
         raise NotImplementedError
 
+    def _stream(self, batch_size, columns):
+        raise NotImplementedError
+
 
 class SqlAlchemyDocumentRepository(AbstractRepository):
+    model_class = model.Document
+
     def __init__(self, session):
-        self.seen = set()
+        super().__init__()
         self.session = session
 
     def _add(self, cmd: commands.CreateDocument) -> model.Document:
@@ -117,85 +331,111 @@ class SqlAlchemyDocumentRepository(AbstractRepository):
         orm_document = orm.DocumentORM(**document)
         self.session.add(orm_document)
         self.session.flush()
+        if orm_document.root_document_id is None:
+            orm_document.root_document_id = orm_document.id
+        search.index(self.session, "document", orm_document)
         pydantic_document = model.Document(**orm_document.to_dict())
         pydantic_document.compose_DocumentCreated_event(doc_comments)
         return pydantic_document
 
     def _update(self, updated_obj: model.Document, fields: List[str]):
-        document_obj: ORM_OBJECT = (
-            self.session.query(orm.DocumentORM).filter_by(id=updated_obj.id).one()
-        )
+        document_obj: ORM_OBJECT = self.session.get(orm.DocumentORM, updated_obj.id)
 
         for key, value in dict(updated_obj).items():
             if key not in fields:
                 continue
             setattr(document_obj, key, value)
 
+        search.index(self.session, "document", document_obj, fields)
         self.session.commit()
 
         return updated_obj
 
     def _get(self, reference) -> model.Document:
         document_obj = self.session.query(orm.DocumentORM).filter_by(id=reference).one()
-        document_dict = document_obj.to_dict()
-        document_dict.pop("next_versions", None)
-        document_dict.pop("previous_versions", None)
-        return model.Document.model_validate(document_dict)
+        return trusted_model(model.Document, document_obj.to_dict())
+
+    def _stream(self, batch_size, columns):
+        return stream_rows(self.session, orm.DocumentORM, batch_size, columns)
+
+    @traced
+    def versions(self, reference) -> List[model.Document]:
+        """Every version of the document's file, oldest first."""
+        root_id = (
+            select(orm.DocumentORM.root_document_id)
+            .where(orm.DocumentORM.id == reference)
+            .scalar_subquery()
+        )
+        documents = load_models(
+            self.session,
+            orm.DocumentORM,
+            model.Document,
+            orm.DocumentORM.root_document_id == root_id,
+        )
+        return sorted(documents, key=lambda d: d.version)
+
+    @traced
+    def latest_versions(
+        self, filepaths: Optional[Iterable[str]] = None
+    ) -> Dict[str, model.Document]:
+        """The newest version of each file by filepath, of every file if
+        ``filepaths`` is None."""
+        latest = select(
+            orm.DocumentORM.filepath, func.max(orm.DocumentORM.version)
+        ).group_by(orm.DocumentORM.filepath)
+        if filepaths is not None:
+            latest = latest.where(orm.DocumentORM.filepath.in_(list(filepaths)))
+        documents = load_models(
+            self.session,
+            orm.DocumentORM,
+            model.Document,
+            tuple_(orm.DocumentORM.filepath, orm.DocumentORM.version).in_(latest),
+        )
+        return {document.filepath: document for document in documents}
 
     def _list(self) -> List[model.Document]:
-        document_objs = self.session.query(orm.DocumentORM).all()
-        entity_objs = self.session.query(orm.EntityORM).all()
-        links = self.session.query(orm.DocumentEntityORM).all()
-
-        # Create a dictionary to map entity IDs to their Pydantic models
-        entity_dict = {
-            e.id: model.Entity.model_validate(e.to_dict()) for e in entity_objs
-        }
-
-        documents = []
-        for d in document_objs:
-            document_dict = d.to_dict()
-            document_dict.pop("next_versions", None)
-            document_dict.pop("previous_versions", None)
-            pydantic_document = model.Document.model_validate(document_dict)
-            # pydantic_document.entities = []
-
-            # Add entities to the document's entities property
-            for link in links:
-                if link.document_id == d.id:
-                    entity = entity_dict.get(link.entity_id)
-                    if entity:
-                        pydantic_document.entities.append(entity)
-
-            documents.append(pydantic_document)
+        documents = load_models(self.session, orm.DocumentORM, model.Document)
+        entities = load_models(self.session, orm.EntityORM, model.Entity)
+
+        # Add entities to each document's entities property
+        entity_dict = {e.id: e for e in entities}
+        document_entities = defaultdict(list)
+        for document_id, entity_id in self.session.execute(
+            select(orm.DocumentEntityORM.document_id, orm.DocumentEntityORM.entity_id)
+        ):
+            entity = entity_dict.get(entity_id)
+            if entity:
+                document_entities[document_id].append(entity)
+        for document in documents:
+            document.entities.extend(document_entities.get(document.id, ()))
 
         return documents
 
 
 class SqlAlchemyCommentRepository(AbstractRepository):
     def __init__(self, session):
-        self.seen = set()
+        super().__init__()
         self.session = session
 
     def _add(self, comment: Dict):
         orm_comment = orm.CommentORM(**comment)
         self.session.add(orm_comment)
         self.session.flush()
+        search.index(self.session, "comment", orm_comment)
         pydantic_comment = model.Comment(**orm_comment.to_dict())
         return pydantic_comment
 
     def _get(self, reference):
         comment_obj = self.session.query(orm.CommentORM).filter_by(id=reference).one()
-        return model.Comment.model_validate(comment_obj)
+        return trusted_model(model.Comment, comment_obj.to_dict())
 
     def _list(self):
-        comment_objs = self.session.query(orm.CommentORM).all()
-        return [model.Comment.model_validate(c) for c in comment_objs]
+        return load_models(self.session, orm.CommentORM, model.Comment)
 
 
 class SqlAlchemyRawTopicsRepository(AbstractRepository):
     def __init__(self, session):
-        self.seen = set()
+        super().__init__()
         self.session = session
 
     def _add(self, raw_topic: Dict):
@@ -209,161 +449,205 @@ class SqlAlchemyRawTopicsRepository(AbstractRepository):
         raw_topic_obj = (
             self.session.query(orm.RawTopicORM).filter_by(id=reference).one()
         )
-        return model.RawTopic.model_validate(raw_topic_obj)
+        return trusted_model(model.RawTopic, raw_topic_obj.to_dict())
 
     def _list(self):
-        raw_topic_objs = self.session.query(orm.RawTopicORM).all()
-        return [model.RawTopic.model_validate(r_t) for r_t in raw_topic_objs]
+        return load_models(self.session, orm.RawTopicORM, model.RawTopic)
+
+    @traced
+    def for_document(self, document_id: int) -> List[model.RawTopic]:
+        return load_models(
+            self.session,
+            orm.RawTopicORM,
+            model.RawTopic,
+            orm.RawTopicORM.document_id == document_id,
+        )
 
 
 class SqlAlchemyRawEntitiesRepository(AbstractRepository):
     def __init__(self, session):
-        self.seen = set()
+        super().__init__()
         self.session = session
 
     def _add(self, raw_entity: Dict):
         orm_raw_entity = orm.RawEntityORM(**raw_entity)
         self.session.add(orm_raw_entity)
         self.session.flush()
-        pydantic_raw_entity = model.RawEntity.model_validate(**orm_raw_entity.to_dict())
+        pydantic_raw_entity = model.RawEntity(**orm_raw_entity.to_dict())
         return pydantic_raw_entity
 
     def _get(self, reference):
         raw_entity_obj = (
             self.session.query(orm.RawEntityORM).filter_by(id=reference).one()
         )
-        return model.RawEntity.model_validate(raw_entity_obj.to_dict())
+        return trusted_model(model.RawEntity, raw_entity_obj.to_dict())
 
     def _list(self):
-        raw_entity_objs = self.session.query(orm.RawEntityORM).all()
-        return [
-            model.RawEntity.model_validate(r_e.to_dict()) for r_e in raw_entity_objs
-        ]
+        return load_models(self.session, orm.RawEntityORM, model.RawEntity)
+
+    @traced
+    def for_document(self, document_id: int) -> List[model.RawEntity]:
+        return load_models(
+            self.session,
+            orm.RawEntityORM,
+            model.RawEntity,
+            orm.RawEntityORM.document_id == document_id,
+        )
 
 
 class SqlAlchemyTopicsRepository(AbstractRepository):
+    model_class = model.Topic
+
     def __init__(self, session):
-        self.seen = set()
+        super().__init__()
         self.session = session
 
     def _add(self, _topic: Dict):
         orm_topic = orm.TopicORM(**_topic)
         self.session.add(orm_topic)
         self.session.flush()
+        search.index(self.session, "topic", orm_topic)
         pydantic_topic = model.Topic(**orm_topic.to_dict())
         return pydantic_topic
 
     def _get(self, reference):
         _topic_obj = self.session.query(orm.TopicORM).filter_by(id=reference).one()
-        return model.Topic.model_validate(_topic_obj)
+        topic = trusted_model(model.Topic, _topic_obj.to_dict())
+        self._add_links([topic], only_ids=[topic.id])
+        return topic
+
+    def _stream(self, batch_size, columns):
+        return stream_rows(self.session, orm.TopicORM, batch_size, columns)
 
     def _list(self):
-        _topic_objs = self.session.query(orm.TopicORM).all()
-        return [model.Topic.model_validate(r_t) for r_t in _topic_objs]
+        topics = load_models(self.session, orm.TopicORM, model.Topic)
+        self._add_links(topics)
+        return topics
+
+    def _add_links(self, topics: List[model.Topic], only_ids=None):
+        """Fills in document_topics and raw_topics with one query each, rather
+        than one lazy load per topic."""
+        by_id = {topic.id: topic for topic in topics}
+        for link_class, attribute in (
+            (model.DocumentTopic, "document_topics"),
+            (model.TopicRawTopic, "raw_topics"),
+        ):
+            topic_id = LINK_TABLES[link_class].topic_id
+            criteria = [] if only_ids is None else [topic_id.in_(only_ids)]
+            for link in load_links(self.session, link_class, *criteria):
+                topic = by_id.get(link.topic_id)
+                if topic is not None:
+                    getattr(topic, attribute).append(link)
 
     def _update(self, updated_obj: model.Topic, fields: List[str]):
-        topic_obj = self.session.query(orm.TopicORM).filter_by(id=updated_obj.id).one()
+        topic_obj = self.session.get(orm.TopicORM, updated_obj.id)
 
         for key, value in dict(updated_obj).items():
             if key not in fields:
                 continue
             setattr(topic_obj, key, value)
 
+        search.index(self.session, "topic", topic_obj, fields)
         self.session.commit()
         return updated_obj
 
+    @traced
     def delete(self, id: int):
         topic_obj = self.session.query(orm.TopicORM).filter_by(id=id).one()
         self.session.delete(topic_obj)
+        search.remove(self.session, "topic", id)
         self.session.commit()
+        self.forget(id)
 
 
 class SqlAlchemyEntitiesRepository(AbstractRepository):
+    model_class = model.Entity
+
     def __init__(self, session):
-        self.seen = set()
+        super().__init__()
         self.session = session
 
     def _add(self, _entity: Dict):
         orm_entity = orm.EntityORM(**_entity)
         self.session.add(orm_entity)
         self.session.flush()
+        search.index(self.session, "entity", orm_entity)
         pydantic_entity = model.Entity(**orm_entity.to_dict())
         return pydantic_entity
 
     def _get(self, reference) -> Union[model.Entity, None]:
         entity_obj = self.session.query(orm.EntityORM).filter_by(id=reference).first()
         return (
-            model.Entity.model_validate(entity_obj.to_dict())
+            trusted_model(model.Entity, entity_obj.to_dict())
             if entity_obj is not None
             else None
         )
 
+    @traced
     def get_entity_by_name(self, name):
         entity_obj = self.session.query(orm.EntityORM).filter_by(entity_name=name).one()
-        return model.Entity.model_validate(entity_obj)
+        return trusted_model(model.Entity, entity_obj.to_dict())
 
+    @traced
     def get_raw_entities(self, reference) -> Union[List[orm.RawEntityORM], None]:
-        entity_obj = self.session.query(orm.EntityORM).filter_by(id=reference).first()
+        entity_obj = self.session.get(orm.EntityORM, reference)
         if entity_obj is not None:
             raw_entities: List[orm.RawEntityORM] = entity_obj.raw_entities
             return raw_entities
         else:
             return None
 
+    @traced
     def add_raw_entity(self, new_raw_entity: model.EntityRawEntity):
         new_link = orm.EntityRawEntityORM(**asdict(new_raw_entity))
         self.session.add(new_link)
         self.session.flush()
 
+    @traced
     def add_document_entity(self, new_document_entity: model.DocumentEntity):
         new_link = orm.DocumentEntityORM(**asdict(new_document_entity))
         self.session.add(new_link)
         self.session.flush()
 
-    def _list(self):
-        entity_objs = self.session.query(orm.EntityORM).all()
-        document_objs = self.session.query(orm.DocumentORM).all()
-        links = self.session.query(orm.DocumentEntityORM).all()
-
-        pydantic_entities = [
-            model.Entity.model_validate(e.to_dict()) for e in entity_objs
-        ]
-
-        document_dict = {}
-        for d in document_objs:
-            doc = d.to_dict()
-            doc.pop("next_versions", None)
-            doc.pop("previous_versions", None)
-            document_dict[d.id] = model.Document.model_validate(doc)
+    def _stream(self, batch_size, columns):
+        return stream_rows(self.session, orm.EntityORM, batch_size, columns)
 
+    def _list(self):
+        pydantic_entities = load_models(self.session, orm.EntityORM, model.Entity)
+        document_dict = {
+            d.id: d for d in load_models(self.session, orm.DocumentORM, model.Document)
+        }
         entity_dict = {e.id: e for e in pydantic_entities}
 
-        for link in links:
-            entity = entity_dict.get(link.entity_id)
-            document = document_dict.get(link.document_id)
+        for document_id, entity_id in self.session.execute(
+            select(orm.DocumentEntityORM.document_id, orm.DocumentEntityORM.entity_id)
+        ):
+            entity = entity_dict.get(entity_id)
+            document = document_dict.get(document_id)
             if entity and document:
                 entity.documents.append(document)
 
         return pydantic_entities
 
     def _update(self, updated_obj: model.Entity, fields: List[str]):
-        entity_obj: ORM_OBJECT = (
-            self.session.query(orm.EntityORM).filter_by(id=updated_obj.id).one()
-        )
+        entity_obj: ORM_OBJECT = self.session.get(orm.EntityORM, updated_obj.id)
 
         for key, value in dict(updated_obj).items():
             if key not in fields:
                 continue
             setattr(entity_obj, key, value)
 
+        search.index(self.session, "entity", entity_obj, fields)
         self.session.commit()
 
         return updated_obj
 
 
 class SqlAlchemyStakeholderRepository(AbstractRepository):
+    model_class = model.Stakeholder
+
     def __init__(self, session):
-        self.seen = set()
+        super().__init__()
         self.session = session
 
     def _add(self, cmd: commands.AddStakeholder):
@@ -377,23 +661,26 @@ class SqlAlchemyStakeholderRepository(AbstractRepository):
         stakeholder_obj = (
             self.session.query(orm.StakeholderORM).filter_by(id=reference).one()
         )
-        return model.Stakeholder.model_validate(stakeholder_obj)
+        return trusted_model(model.Stakeholder, stakeholder_obj.to_dict())
 
+    @traced
     def get_stakeholder_by_name(self, name):
         stakeholder_obj = (
             self.session.query(orm.StakeholderORM)
             .filter_by(stakeholder_name=name)
             .one()
         )
-        return model.Stakeholder.model_validate(stakeholder_obj)
+        return trusted_model(model.Stakeholder, stakeholder_obj.to_dict())
+
+    def _stream(self, batch_size, columns):
+        return stream_rows(self.session, orm.StakeholderORM, batch_size, columns)
 
     def _list(self):
-        stakeholder_objs = self.session.query(orm.StakeholderORM).all()
-        return [model.Stakeholder.model_validate(s) for s in stakeholder_objs]
+        return load_models(self.session, orm.StakeholderORM, model.Stakeholder)
 
     def _update(self, updated_obj: model.Stakeholder, fields: List[str]):
-        stakeholder_obj: ORM_OBJECT = (
-            self.session.query(orm.StakeholderORM).filter_by(id=updated_obj.id).one()
+        stakeholder_obj: ORM_OBJECT = self.session.get(
+            orm.StakeholderORM, updated_obj.id
         )
         for key, value in dict(updated_obj).items():
             if key not in fields:
@@ -404,7 +691,9 @@ class SqlAlchemyStakeholderRepository(AbstractRepository):
 
         return updated_obj
 
+    @traced
     def delete(self, id: int):
         stakeholder_obj = self.session.query(orm.StakeholderORM).filter_by(id=id).one()
         self.session.delete(stakeholder_obj)
         self.session.commit()
+        self.forget(id)
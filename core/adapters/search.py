@@ -0,0 +1,319 @@
+"""Full-text search over documents, comments, topics and entities.
+
+Searchable text is split into paragraphs and stored in ``search_paragraphs``,
+one row per paragraph, which the repositories keep in step with the tables they
+write. On SQLite an external-content FTS5 table, ``search_index``, indexes those
+rows through triggers, so a query only touches the inverted index and the
+matching paragraphs, never the documents themselves. Results are ranked by
+BM25 and carry a highlighted snippet of the matching paragraph.
+"""
+
+import html
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, insert, select, text
+
+import core.adapters.orm as orm
+
+FTS_TABLE = "search_index"
+KINDS = ("document", "comment", "topic", "entity")
+
+# Control characters that never occur in extracted text, replaced with <mark>
+# tags after the snippet has been HTML-escaped.
+HIGHLIGHT_OPEN = "\x02"
+HIGHLIGHT_CLOSE = "\x03"
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        body,
+        content='search_paragraphs',
+        content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_paragraphs_ai
+        AFTER INSERT ON search_paragraphs BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_paragraphs_ad
+        AFTER DELETE ON search_paragraphs BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body)
+        VALUES ('delete', old.id, old.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_paragraphs_au
+        AFTER UPDATE ON search_paragraphs BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body)
+        VALUES ('delete', old.id, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.id, new.body);
+    END""",
+]
+
+paragraphs_table = orm.SearchParagraphORM.__table__
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    ref_id: int
+    document_id: Optional[int]
+    field: str
+    title: Optional[str]
+    snippet_html: str
+    rank: float
+
+
+def is_fts_table(name: str) -> bool:
+    """True for the FTS table and the shadow tables SQLite creates for it."""
+    return name == FTS_TABLE or name.startswith(f"{FTS_TABLE}_")
+
+
+def uses_fts(session) -> bool:
+    return session.get_bind().dialect.name == "sqlite"
+
+
+def split_paragraphs(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def fts_query(query: str) -> str:
+    """Turns free text into an FTS5 query that matches all of its words.
+
+    Each word becomes a quoted string, so FTS5 operators and punctuation in
+    user input cannot produce a syntax error. A trailing ``*`` on a word is kept
+    as a prefix search.
+    """
+    terms = []
+    for word in re.findall(r"[^\s\"]+", query):
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def highlight(snippet: str) -> str:
+    return (
+        html.escape(snippet)
+        .replace(HIGHLIGHT_OPEN, "<mark>")
+        .replace(HIGHLIGHT_CLOSE, "</mark>")
+    )
+
+
+def _rows(kind, ref_id, document_id, title, fields):
+    rows = []
+    for field, value in fields:
+        for position, paragraph in enumerate(split_paragraphs(value)):
+            rows.append(
+                dict(
+                    kind=kind,
+                    ref_id=ref_id,
+                    document_id=document_id,
+                    field=field,
+                    position=position,
+                    title=title,
+                    body=paragraph,
+                )
+            )
+    return rows
+
+
+def document_rows(document) -> List[dict]:
+    return _rows(
+        "document",
+        document.id,
+        document.id,
+        document.filename,
+        [("text", document.text), ("summary", document.summary)],
+    )
+
+
+def comment_rows(comment) -> List[dict]:
+    return _rows(
+        "comment",
+        comment.id,
+        comment.document_id,
+        comment.author,
+        [("comment_text", comment.comment_text)],
+    )
+
+
+def topic_rows(topic) -> List[dict]:
+    return _rows(
+        "topic",
+        topic.id,
+        None,
+        topic.topic_name,
+        [
+            ("topic_name", topic.topic_name),
+            ("topic_description", topic.topic_description),
+        ],
+    )
+
+
+def entity_rows(entity) -> List[dict]:
+    return _rows(
+        "entity",
+        entity.id,
+        None,
+        entity.entity_name,
+        [
+            ("entity_name", entity.entity_name),
+            ("entity_description", entity.entity_description),
+        ],
+    )
+
+
+ROW_BUILDERS = {
+    "document": document_rows,
+    "comment": comment_rows,
+    "topic": topic_rows,
+    "entity": entity_rows,
+}
+
+# The field every row of a kind takes its title from, and the fields its rows
+# are built from
+INDEXED_FIELDS = {
+    "document": ("filename", {"text", "summary"}),
+    "comment": ("author", {"comment_text"}),
+    "topic": ("topic_name", {"topic_name", "topic_description"}),
+    "entity": ("entity_name", {"entity_name", "entity_description"}),
+}
+
+
+def remove(session, kind: str, ref_id: int, fields: Optional[Iterable[str]] = None):
+    conditions = [paragraphs_table.c.kind == kind, paragraphs_table.c.ref_id == ref_id]
+    if fields is not None:
+        conditions.append(paragraphs_table.c.field.in_(fields))
+    session.execute(delete(paragraphs_table).where(*conditions))
+
+
+def index(session, kind: str, obj, fields: Optional[Iterable[str]] = None):
+    """(Re)indexes one document, comment, topic or entity in the session's transaction.
+
+    With ``fields``, the fields an update wrote, only the rows built from them
+    are replaced, and nothing is when none of them is indexed."""
+    rows = ROW_BUILDERS[kind](obj)
+    title_field, indexed = INDEXED_FIELDS[kind]
+    if fields is None or title_field in fields:
+        remove(session, kind, obj.id)
+    else:
+        changed = indexed & set(fields)
+        if not changed:
+            return
+        remove(session, kind, obj.id, changed)
+        rows = [row for row in rows if row["field"] in changed]
+    if rows:
+        session.execute(insert(paragraphs_table), rows)
+
+
+def rebuild(connection):
+    """Reindexes everything, e.g. to backfill a database that pre-dates search."""
+    connection.execute(delete(paragraphs_table))
+    # Only the indexed columns are selected, so this also runs from migrations
+    # against a schema that later revisions extend.
+    sources = [
+        ("document", orm.DocumentORM, ["id", "filename", "text", "summary"]),
+        (
+            "comment",
+            orm.CommentORM,
+            ["id", "document_id", "author", "comment_text"],
+        ),
+        ("topic", orm.TopicORM, ["id", "topic_name", "topic_description"]),
+        ("entity", orm.EntityORM, ["id", "entity_name", "entity_description"]),
+    ]
+    for kind, orm_class, columns in sources:
+        table = orm_class.__table__
+        statement = select(*[table.c[name] for name in columns])
+        for obj in connection.execute(statement):
+            rows = ROW_BUILDERS[kind](obj)
+            if rows:
+                connection.execute(insert(paragraphs_table), rows)
+
+
+def search(
+    session,
+    query: str,
+    kinds: Optional[Iterable[str]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[SearchResult]:
+    match = fts_query(query)
+    if not match:
+        return []
+    kinds = [k for k in kinds or () if k in KINDS]
+    if not uses_fts(session):
+        return _search_like(session, query, kinds, limit, offset)
+
+    kind_filter = ""
+    params = dict(
+        match=match,
+        open=HIGHLIGHT_OPEN,
+        close=HIGHLIGHT_CLOSE,
+        limit=limit,
+        offset=offset,
+    )
+    if kinds:
+        kind_filter = "AND p.kind IN ({})".format(
+            ", ".join(f":kind_{i}" for i in range(len(kinds)))
+        )
+        params.update({f"kind_{i}": kind for i, kind in enumerate(kinds)})
+
+    # CROSS JOIN keeps the FTS table as the outer loop, so SQLite walks the
+    # inverted index in rank order and stops after the requested page.
+    statement = text(f"""
+        SELECT p.kind, p.ref_id, p.document_id, p.field, p.title,
+               snippet({FTS_TABLE}, 0, :open, :close, '…', 16) AS snippet,
+               {FTS_TABLE}.rank AS rank
+        FROM {FTS_TABLE} CROSS JOIN search_paragraphs AS p
+            ON p.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match {kind_filter}
+        ORDER BY {FTS_TABLE}.rank
+        LIMIT :limit OFFSET :offset
+        """)
+    return [
+        SearchResult(
+            kind=row.kind,
+            ref_id=row.ref_id,
+            document_id=row.document_id,
+            field=row.field,
+            title=row.title,
+            snippet_html=highlight(row.snippet),
+            rank=row.rank,
+        )
+        for row in session.execute(statement, params)
+    ]
+
+
+def escape_like(word: str) -> str:
+    """``word`` with LIKE's wildcards matched literally, escaped by a backslash."""
+    return word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_like(session, query, kinds, limit, offset):
+    # Unranked substring search for backends without FTS5
+    words = [w.rstrip("*") for w in query.split() if w.rstrip("*")]
+    statement = select(paragraphs_table).where(
+        *[
+            paragraphs_table.c.body.ilike(f"%{escape_like(w)}%", escape="\\")
+            for w in words
+        ]
+    )
+    if kinds:
+        statement = statement.where(paragraphs_table.c.kind.in_(kinds))
+    statement = statement.order_by(paragraphs_table.c.id).limit(limit).offset(offset)
+    return [
+        SearchResult(
+            kind=row.kind,
+            ref_id=row.ref_id,
+            document_id=row.document_id,
+            field=row.field,
+            title=row.title,
+            snippet_html=html.escape(row.body[:200]),
+            rank=0.0,
+        )
+        for row in session.execute(statement)
+    ]
@@ -0,0 +1,378 @@
+"""Embedding storage and similarity search for documents and entities.
+
+Each namespace keeps its vectors as unit-length float32 rows in a memory-mapped
+file, ``<name>.vectors.f32``, with the owning ids in ``<name>.ids.npy`` (-1
+marks a free row). Because the vectors are normalised, cosine similarity is a
+dot product.
+
+Exact search scans the matrix in blocks, scoring every query against each
+block with one matrix product. Approximate search uses an inverted file (IVF)
+index: k-means centroids partition the rows and a query only scores the rows
+in its ``n_probe`` nearest partitions. Rows appended after the index was built
+are always scored exactly, so the index only needs rebuilding as it drifts.
+
+Writers in every process (web app, CLI, workers) hold an exclusive lock on
+``<name>.lock`` while they reload, allocate rows and save the ids, so they
+never hand out the same free row twice. The lock is ``fcntl.flock``, which
+does not exist on Windows; there only one process may write.
+"""
+
+import contextlib
+import functools
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import core.config as config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SEARCH_BLOCK_ROWS = 65536
+# Below this many rows an exact scan is as fast as probing an IVF index.
+ANN_MIN_ROWS = 20000
+
+Match = Tuple[int, float]
+
+
+def normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores in each row, best first."""
+    k = min(k, scores.shape[-1])
+    if k == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, n_clusters: int, iterations: int, seed: int
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        empty = counts == 0
+        # Re-seed empty clusters rather than letting them go unused
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalise(sums)
+    return centroids
+
+
+class VectorStore:
+    def __init__(self, path_prefix: str, dimensions: int):
+        self.path_prefix = path_prefix
+        self.dimensions = dimensions
+        self.vectors_path = f"{path_prefix}.vectors.f32"
+        self.ids_path = f"{path_prefix}.ids.npy"
+        self.ivf_path = f"{path_prefix}.ivf.npz"
+        self.lock_path = f"{path_prefix}.lock"
+        self.lock = threading.RLock()
+        self._loaded_stamp = None
+        self.refresh()
+
+    # -- persistence -------------------------------------------------------
+
+    def _stamp(self):
+        stamp = []
+        for path in (self.ids_path, self.ivf_path):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stamp.append(None)
+                continue
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+
+    def refresh(self, force: bool = False):
+        """Reloads the store if another process has written to it. File times
+        can miss a write made in the same tick, so writers ``force`` it."""
+        with self.lock:
+            stamp = self._stamp()
+            if stamp == self._loaded_stamp and not force:
+                return
+            if stamp[0] is None:
+                self.ids = np.empty(0, dtype=np.int64)
+                self.vectors = np.empty((0, self.dimensions), dtype=np.float32)
+            else:
+                self.ids = np.load(self.ids_path)
+                self.vectors = np.memmap(
+                    self.vectors_path,
+                    dtype=np.float32,
+                    mode="r+",
+                    shape=(len(self.ids), self.dimensions),
+                )
+            self.rows: Dict[int, int] = {
+                int(id_): row for row, id_ in enumerate(self.ids) if id_ >= 0
+            }
+            self._load_ivf()
+            self._loaded_stamp = stamp
+
+    @contextlib.contextmanager
+    def write_lock(self):
+        """Held from reloading the store to saving it, in this process and
+        across processes; the store is reloaded on entry."""
+        with self.lock:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self.refresh(force=True)
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _grow(self, rows_needed: int):
+        capacity = max(1024, len(self.ids))
+        while capacity < rows_needed:
+            capacity *= 2
+        if capacity == len(self.ids):
+            return
+        os.makedirs(os.path.dirname(self.vectors_path) or ".", exist_ok=True)
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * self.dimensions * 4)
+        self.ids = np.concatenate(
+            [self.ids, np.full(capacity - len(self.ids), -1, dtype=np.int64)]
+        )
+        self.vectors = np.memmap(
+            self.vectors_path,
+            dtype=np.float32,
+            mode="r+",
+            shape=(capacity, self.dimensions),
+        )
+
+    def _save_ids(self):
+        if isinstance(self.vectors, np.memmap):
+            self.vectors.flush()
+        tmp_path = f"{self.ids_path}.tmp.npy"
+        np.save(tmp_path, self.ids)
+        os.replace(tmp_path, self.ids_path)
+        self._loaded_stamp = self._stamp()
+
+    # -- writes ------------------------------------------------------------
+
+    def upsert(self, ids: Sequence[int], vectors):
+        ids = [int(id_) for id_ in ids]
+        vectors = normalise(np.atleast_2d(vectors))
+        if vectors.shape != (len(ids), self.dimensions):
+            raise ValueError(
+                f"Expected {len(ids)} vectors of {self.dimensions} dimensions, "
+                f"got {vectors.shape}."
+            )
+        # An id given more than once keeps its last vector
+        last = {id_: position for position, id_ in enumerate(ids)}
+        if len(last) < len(ids):
+            ids, vectors = list(last), vectors[list(last.values())]
+        with self.write_lock():
+            new_ids = [id_ for id_ in ids if id_ not in self.rows]
+            free_rows = np.flatnonzero(self.ids[self.appendable_from :] < 0)
+            if len(new_ids) > len(free_rows):
+                self._grow(len(self.ids) + len(new_ids) - len(free_rows))
+                free_rows = np.flatnonzero(self.ids[self.appendable_from :] < 0)
+            new_rows = free_rows[: len(new_ids)] + self.appendable_from
+            self.ids[new_rows] = new_ids
+            self.rows.update(zip(new_ids, new_rows.tolist()))
+            rows = np.array([self.rows[id_] for id_ in ids], dtype=np.int64)
+            self.vectors[rows] = vectors
+            if self.ivf is not None:
+                # Vectors that changed in place keep their old partition in
+                # other processes until the index is rebuilt.
+                self.unindexed.update(rows.tolist())
+            self._save_ids()
+
+    def remove(self, ids: Iterable[int]):
+        with self.write_lock():
+            for id_ in ids:
+                row = self.rows.pop(id_, None)
+                if row is not None:
+                    self.ids[row] = -1
+            self._save_ids()
+
+    def get(self, id_: int) -> Optional[np.ndarray]:
+        self.refresh()
+        row = self.rows.get(id_)
+        return None if row is None else np.array(self.vectors[row])
+
+    def __len__(self):
+        return len(self.rows)
+
+    # -- approximate index -------------------------------------------------
+
+    def _load_ivf(self):
+        self.ivf = None
+        self.unindexed = set()
+        # Once an index exists new ids are only written past the indexed rows,
+        # so every process can tell which rows it has to scan exactly.
+        self.appendable_from = 0
+        if not os.path.exists(self.ivf_path):
+            return
+        with np.load(self.ivf_path) as data:
+            self.appendable_from = int(data["built_rows"])
+            self.ivf = (data["centroids"], data["offsets"], data["list_rows"])
+        appended = np.flatnonzero(self.ids[self.appendable_from :] >= 0)
+        self.unindexed = set((appended + self.appendable_from).tolist())
+
+    def build_ann_index(
+        self,
+        n_lists: Optional[int] = None,
+        sample_size: int = 100_000,
+        iterations: int = 10,
+        seed: int = 0,
+    ):
+        with self.write_lock():
+            live_rows = np.flatnonzero(self.ids >= 0)
+            if len(live_rows) == 0:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(len(live_rows))))
+            n_lists = min(n_lists, len(live_rows))
+            rng = np.random.default_rng(seed)
+            sample = rng.choice(
+                live_rows, min(sample_size, len(live_rows)), replace=False
+            )
+            centroids = spherical_kmeans(
+                np.asarray(self.vectors[np.sort(sample)]), n_lists, iterations, seed
+            )
+
+            assignment = np.empty(len(live_rows), dtype=np.int64)
+            for start in range(0, len(live_rows), SEARCH_BLOCK_ROWS):
+                block = live_rows[start : start + SEARCH_BLOCK_ROWS]
+                assignment[start : start + len(block)] = np.argmax(
+                    self.vectors[block] @ centroids.T, axis=1
+                )
+            built_rows = int(live_rows[-1]) + 1
+            order = np.argsort(assignment, kind="stable")
+            list_rows = live_rows[order]
+            offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+
+            np.savez(
+                f"{self.ivf_path}.tmp.npz",
+                centroids=centroids,
+                offsets=offsets,
+                list_rows=list_rows,
+                built_rows=built_rows,
+            )
+            os.replace(f"{self.ivf_path}.tmp.npz", self.ivf_path)
+            self.ivf = (centroids, offsets, list_rows)
+            self.unindexed = set()
+            self.appendable_from = built_rows
+            self._loaded_stamp = self._stamp()
+
+    # -- queries -----------------------------------------------------------
+
+    def search(
+        self,
+        queries,
+        k: int = 10,
+        mode: str = "auto",
+        n_probe: int = 8,
+        exclude_ids: Iterable[int] = (),
+    ):
+        """Returns the k most similar (id, cosine similarity) pairs per query.
+
+        ``queries`` is one vector or a 2D batch; the result is one list of
+        matches or a list per query accordingly. ``mode`` is "exact", "ivf"
+        or "auto" (IVF when an index has been built for a large store).
+        """
+        self.refresh()
+        single = np.ndim(queries) == 1
+        queries = normalise(np.atleast_2d(queries))
+        exclude_ids = set(exclude_ids)
+        if mode == "auto":
+            mode = (
+                "ivf" if self.ivf is not None and len(self) >= ANN_MIN_ROWS else "exact"
+            )
+        if mode == "ivf" and self.ivf is None:
+            raise ValueError("No IVF index; call build_ann_index() first.")
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        # Over-fetch so excluded ids do not leave the results short
+        fetch = k + len(exclude_ids)
+        if mode == "exact":
+            results = self._search_exact(queries, fetch)
+        else:
+            results = [self._search_ivf(q, fetch, n_probe) for q in queries]
+        results = [
+            [(id_, score) for id_, score in matches if id_ not in exclude_ids][:k]
+            for matches in results
+        ]
+        return results[0] if single else results
+
+    def _matches(self, rows, scores) -> List[Match]:
+        return [
+            (int(self.ids[row]), float(score))
+            for row, score in zip(rows, scores)
+            if self.ids[row] >= 0 and np.isfinite(score)
+        ]
+
+    def _search_exact(self, queries: np.ndarray, k: int) -> List[List[Match]]:
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, len(self.ids))
+            scores = queries @ np.asarray(self.vectors[start:stop]).T
+            scores[:, self.ids[start:stop] < 0] = -np.inf
+            candidates = top_k(scores, k)
+            best_scores = np.concatenate(
+                [best_scores, np.take_along_axis(scores, candidates, axis=1)], axis=1
+            )
+            best_rows = np.concatenate([best_rows, candidates + start], axis=1)
+            keep = top_k(best_scores, k)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        return [
+            self._matches(rows, scores) for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    def _search_ivf(self, query: np.ndarray, k: int, n_probe: int) -> List[Match]:
+        centroids, offsets, list_rows = self.ivf
+        probes = top_k(centroids @ query, n_probe)
+        candidates = [list_rows[offsets[p] : offsets[p + 1]] for p in probes]
+        candidates.append(np.fromiter(self.unindexed, dtype=np.int64))
+        rows = np.unique(np.concatenate(candidates))
+        if len(rows) == 0:
+            return []
+        scores = np.asarray(self.vectors[rows]) @ query
+        best = top_k(scores, k)
+        return self._matches(rows[best], scores[best])
+
+
+class EmbeddingStore:
+    """The vector stores for each kind of embedded object, like a unit of work's repositories."""
+
+    def __init__(self, directory: str, dimensions: int):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.documents = VectorStore(os.path.join(directory, "documents"), dimensions)
+        self.entities = VectorStore(os.path.join(directory, "entities"), dimensions)
+
+
+@functools.lru_cache(maxsize=None)
+def get_embedding_store() -> EmbeddingStore:
+    return EmbeddingStore(config.EMBEDDING_DIR, config.EMBEDDING_DIMENSIONS)
+
+
+if __name__ == "__main__":
+    # Rebuilds the approximate indexes, e.g. nightly or after a bulk import:
+    #   python -m core.adapters.vector_store
+    store = get_embedding_store()
+    for name, vectors in (("documents", store.documents), ("entities", store.entities)):
+        vectors.build_ann_index()
+        print(f"Indexed {len(vectors)} {name} embeddings.")
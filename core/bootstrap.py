@@ -1,43 +1,105 @@
+import functools
 import inspect
+from typing import Callable, Dict, List, Tuple, Type
+
 from core.adapters import llm_connectors
+from core.graphs import cache as graph_cache
+
+from core.service_layer import handlers, messagebus, read_cache, unit_of_work
+
+# (handler_name, handler, names of the dependencies the handler accepts)
+CompiledHandler = Tuple[str, Callable, Tuple[str, ...]]
+
+
+@functools.lru_cache(maxsize=None)
+def handler_parameters(handler: Callable) -> Tuple[str, ...]:
+    return tuple(inspect.signature(handler).parameters)
+
+
+def compile_event_handlers(
+    event_handlers: Dict[Type, List[Tuple[str, Callable]]],
+) -> Dict[Type, List[CompiledHandler]]:
+    return {
+        event_type: [
+            (handler_name, handler, handler_parameters(handler))
+            for handler_name, handler in type_handlers
+        ]
+        for event_type, type_handlers in event_handlers.items()
+    }
+
+
+def compile_command_handlers(
+    command_handlers: Dict[Type, Tuple[str, Callable]],
+) -> Dict[Type, CompiledHandler]:
+    return {
+        command_type: (handler_name, handler, handler_parameters(handler))
+        for command_type, (handler_name, handler) in command_handlers.items()
+    }
+
 
-from core.service_layer import handlers, messagebus, unit_of_work
+# Process-wide caches that drop what a handled message has changed
+DEFAULT_OBSERVERS = (
+    graph_cache.GRAPH_CACHE.observe,
+    read_cache.READ_MODEL_CACHE.observe,
+)
+
+# Signatures are inspected once at import; bootstrap() only binds dependencies.
+COMPILED_EVENT_HANDLERS = compile_event_handlers(handlers.EVENT_HANDLERS)
+COMPILED_COMMAND_HANDLERS = compile_command_handlers(handlers.COMMAND_HANDLERS)
 
 
 def bootstrap(
     uow: unit_of_work.AbstractUnitOfWork,
     document_analysis_connector: llm_connectors.DocumentAnalysisConnector,
     canonical_entity_consolidation_connector: llm_connectors.CanonicalEntityConsolidationConnector,
+    embedding_connector: llm_connectors.AbstractEmbeddingConnector = None,
+    embedding_store=None,
+    observers=DEFAULT_OBSERVERS,
+    dispatch=None,
 ) -> messagebus.MessageBus:
     dependencies = {
         "uow": uow,
         "document_analysis_connector": document_analysis_connector,
         "canonical_entity_consolidation_connector": canonical_entity_consolidation_connector,
+        "embedding_connector": embedding_connector,
+        "embedding_store": embedding_store,
     }
 
     injected_event_handlers = {
         event_type: [
-            (handler_name, inject_dependencies(handler, dependencies))
-            for handler_name, handler in event_handlers
+            (handler_name, bind_dependencies(handler, parameters, dependencies))
+            for handler_name, handler, parameters in event_handlers
         ]
-        for event_type, event_handlers in handlers.EVENT_HANDLERS.items()
+        for event_type, event_handlers in COMPILED_EVENT_HANDLERS.items()
     }
 
     injected_command_handlers = {
-        command_type: (handler_name, inject_dependencies(handler, dependencies))
-        for command_type, (handler_name, handler) in handlers.COMMAND_HANDLERS.items()
+        command_type: (
+            handler_name,
+            bind_dependencies(handler, parameters, dependencies),
+        )
+        for command_type, (
+            handler_name,
+            handler,
+            parameters,
+        ) in COMPILED_COMMAND_HANDLERS.items()
     }
 
     return messagebus.MessageBus(
         uow=uow,
         event_handlers=injected_event_handlers,
         command_handlers=injected_command_handlers,
+        observers=observers,
+        dispatch=dispatch,
     )
 
 
+def bind_dependencies(
+    handler: Callable, parameters: Tuple[str, ...], dependencies: Dict
+) -> Callable:
+    deps = {name: dependencies[name] for name in parameters if name in dependencies}
+    return functools.partial(handler, **deps) if deps else handler
+
+
 def inject_dependencies(handler, dependencies):
-    params = inspect.signature(handler).parameters
-    deps = {
-        name: dependency for name, dependency in dependencies.items() if name in params
-    }
-    return lambda message: handler(message, **deps)
+    return bind_dependencies(handler, handler_parameters(handler), dependencies)
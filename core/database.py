@@ -1,147 +1,113 @@
-import sqlite3
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import functools
+import os
+from typing import Dict
+from sqlalchemy import create_engine, event, Engine, make_url
+from sqlalchemy.orm import sessionmaker
 
 import core.config
 
-Base = declarative_base()
-
-engine = create_engine(f"sqlite:///{core.config.DATABASE_PATH}", echo=True)
-
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-
-
-def create_database(db_path):
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        sql_script = """
-        CREATE TABLE Stakeholders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        stakeholder_name TEXT,
-        stakeholder_type TEXT,
-        stakeholder_description TEXT,
-        UNIQUE (stakeholder_name)
-        );
-
-        CREATE TABLE  Documents (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        filepath TEXT NOT NULL,
-        filename TEXT NOT NULL,
-        filetype TEXT,
-        text TEXT,
-        html_text TEXT,
-        version INTEGER NOT NULL DEFAULT 1,
-        previous_version_id INTEGER,
-        last_modified_at DATETIME,
-        last_modified_by DATETIME,
-        created_at DATETIME,
-        created_by DATETIME,
-        processed_at DATETIME,
-        summary TEXT,
-        version_comment TEXT,
-        revision INTEGER DEFAULT 1,
-        UNIQUE (filepath, version),
-        FOREIGN KEY (previous_version_id) REFERENCES Documents(id)
-        );
-
-        CREATE TABLE Comments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        document_id INTEGER NOT NULL,
-        author TEXT,
-        reference_text TEXT,
-        comment_text TEXT,
-        comment_date DATETIME,
-        FOREIGN KEY (document_id) REFERENCES Documents(id)
-        );
-
-        CREATE TABLE RawTopics (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        document_id INTEGER NOT NULL,
-        topic_name TEXT,
-        topic_description TEXT,
-        topic_prevalence INTEGER,
-        FOREIGN KEY (document_id) REFERENCES Documents(id)
-        );
-
-        CREATE TABLE Topics (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        topic_name TEXT,
-        topic_description TEXT
-        );
-
-        CREATE TABLE DocumentTopics (
-        document_id INTEGER NOT NULL,
-        topic_id INTEGER NOT NULL,
-        PRIMARY KEY (document_id, topic_id),
-        FOREIGN KEY (document_id) REFERENCES Documents(id),
-        FOREIGN KEY (topic_id) REFERENCES Topics(id)
-        );
-
-        CREATE TABLE TopicsRawTopics (
-        topic_id INTEGER NOT NULL,
-        raw_topic_id INTEGER NOT NULL,
-        PRIMARY KEY (topic_id, raw_topic_id),
-        FOREIGN KEY (topic_id) REFERENCES Topics(id),
-        FOREIGN KEY (raw_topic_id) REFERENCES RawTopics(id)
-        );
-
-        CREATE TABLE RawEntities (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        document_id INTEGER NOT NULL,
-        entity_name TEXT,
-        entity_description TEXT,
-        entity_prevalence INTEGER,
-        FOREIGN KEY (document_id) REFERENCES Documents(id)
-        );
-
-        CREATE TABLE Entities (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        entity_name TEXT,
-        entity_description TEXT,
-        UNIQUE (entity_name)
-        );
-
-        CREATE TABLE DocumentEntities (
-        document_id INTEGER NOT NULL,
-        entity_id INTEGER NOT NULL,
-        PRIMARY KEY (document_id, entity_id),
-        FOREIGN KEY (document_id) REFERENCES Documents(id),
-        FOREIGN KEY (entity_id) REFERENCES Entities(id)
-        );
-
-        CREATE TABLE EntitiesRawEntities (
-        entity_id INTEGER NOT NULL,
-        raw_entity_id INTEGER NOT NULL,
-        PRIMARY KEY (entity_id, raw_entity_id),
-        FOREIGN KEY (entity_id) REFERENCES Entities(id),
-        FOREIGN KEY (raw_entity_id) REFERENCES RawEntities(id)
-        );
-
-        CREATE TABLE changelogs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, 
-        modified_datetime REAL, 
-        previous_object_json TEXT, 
-        revised_object_json TEXT, 
-        entity_name TEXT, 
-        entity_id INTEGER,
-        UNIQUE(entity_name, entity_id, previous_object_json)
-        );
-
-        """
-        cursor.executescript(sql_script)
-
-        conn.commit()
-        print("Database and tables created successfully!")
-
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
-
-    finally:
-        conn.close()
+
+def sqlite_pragmas(profile: str) -> Dict[str, object]:
+    if profile == "default":
+        return {}
+    if profile == "production":
+        return {
+            # Readers no longer block the writer (and vice versa), and commits
+            # only fsync at checkpoints, which is still safe against app crashes.
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            # Wait for a competing writer instead of failing with "database is locked".
+            "busy_timeout": core.config.DB_BUSY_TIMEOUT_MS,
+            "cache_size": -core.config.DB_CACHE_SIZE_KIB,
+            "mmap_size": core.config.DB_MMAP_SIZE,
+            "temp_store": "MEMORY",
+        }
+    raise ValueError(f"Unknown SQLite pragma profile: {profile}")
+
+
+def create_engine_from_url(
+    url,
+    profile: str = core.config.DB_PRAGMA_PROFILE,
+    echo: bool = False,
+    pool_size: int = core.config.DB_POOL_SIZE,
+    max_overflow: int = core.config.DB_MAX_OVERFLOW,
+    pool_timeout: float = core.config.DB_POOL_TIMEOUT,
+    pool_recycle: int = core.config.DB_POOL_RECYCLE,
+    pool_pre_ping: bool = core.config.DB_POOL_PRE_PING,
+) -> Engine:
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            echo=echo,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+        )
+
+    pragmas = sqlite_pragmas(profile)
+    connect_args = {"check_same_thread": False}
+    if "busy_timeout" in pragmas:
+        connect_args["timeout"] = pragmas["busy_timeout"] / 1000
+    pool_options = {}
+    if url.database not in (None, "", ":memory:"):
+        # In-memory databases use a single shared connection, files get a pool.
+        pool_options = dict(
+            pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout
+        )
+    engine = create_engine(url, echo=echo, connect_args=connect_args, **pool_options)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def create_sqlite_engine(
+    db_path, profile: str = core.config.DB_PRAGMA_PROFILE, echo: bool = False
+) -> Engine:
+    return create_engine_from_url(f"sqlite:///{db_path}", profile=profile, echo=echo)
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    # Created on first use, and only once per process, so importing the ORM,
+    # the unit of work or the entrypoints never opens a database. Every
+    # session, view and worker shares this engine and its connection pool.
+    return create_engine_from_url(core.config.DATABASE_URL, echo=core.config.DB_ECHO)
+
+
+@functools.lru_cache(maxsize=None)
+def get_session_factory():
+    return sessionmaker(bind=get_engine())
+
+
+MIGRATIONS_PATH = os.path.join(os.path.dirname(__file__), "migrations")
+
+
+def migrate(engine: Engine = None, revision: str = "head"):
+    """Upgrades the schema to ``revision`` with the migrations in core/migrations."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_PATH)
+    with (engine or get_engine()).begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def create_database(engine: Engine = None):
+    """Creates or upgrades the schema to the latest migration."""
+    migrate(engine)
+    print("Database and tables created successfully!")
 
 
 if __name__ == "__main__":
-    create_database(core.config.DATABASE_PATH)
+    create_database()
@@ -34,6 +34,7 @@ class CreateDocument(CommandCreatedAudit):
     html_text: Optional[str] = None
     version: Optional[int] = 1
     previous_version_id: Optional[int] = None
+    root_document_id: Optional[int] = None
 
 
 @dataclass(kw_only=True)
@@ -55,6 +56,20 @@ class ConsolidateCanonicalEntities(Command):
     raw_entity_ids: Union[List[int], None]
 
 
+@dataclass(kw_only=True)
+class EmbedDocuments(Command):
+    """Pass in list of specific ids, or leave as None to embed all."""
+
+    document_ids: Union[List[int], None] = None
+
+
+@dataclass(kw_only=True)
+class EmbedEntities(Command):
+    """Pass in list of specific ids, or leave as None to embed all."""
+
+    entity_ids: Union[List[int], None] = None
+
+
 @dataclass(kw_only=True)
 class AddStakeholder(CommandCreatedAudit):
     stakeholder_name: str
@@ -104,3 +119,10 @@ class DeleteTopic(CommandModifiedAudit):
 @dataclass(kw_only=True)
 class DeleteStakeholder(CommandModifiedAudit):
     id: int
+
+
+@dataclass(kw_only=True)
+class RefreshGraphAnalytics(Command):
+    """Counts only links added since the last refresh unless full is set."""
+
+    full: bool = False
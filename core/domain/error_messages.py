@@ -16,3 +16,15 @@ class EntityUpdateError(EntityProcessingError):
 
 class AddStakeholderError(Exception):
     pass
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class UnsupportedFileTypeError(ExtractionError):
+    pass
+
+
+class ExtractionTimeoutError(ExtractionError):
+    pass
@@ -24,6 +24,12 @@ class CommentCreated(Event):
     document_id: int
 
 
+@dataclass
+class DocumentEntitiesLinked(Event):
+    entity_id: int
+    document_ids: List[int]
+
+
 @dataclass
 class ExistingCanonicalEntityHallucination(Event):
     item: CanonicalEntityResponseItem
@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field
+from array import array
 from datetime import datetime
-from typing import Optional, List, NamedTuple
+from typing import Dict, Iterable, Iterator, Optional, List, NamedTuple, Tuple
 from . import events
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 
 class BaseDomainModel(BaseModel):
@@ -20,6 +21,9 @@ class BaseDomainModel(BaseModel):
 
 
 class DomainDataclass:
+    # Empty so the slotted link dataclasses below carry no instance __dict__
+    __slots__ = ()
+
     created_at: datetime
     last_modified_at: datetime
     created_by: str
@@ -35,6 +39,7 @@ class Document(BaseDomainModel):
     text: str
     html_text: Optional[str] = None
     previous_version_id: Optional[int] = None
+    root_document_id: Optional[int] = None
     processed_at: datetime
     summary: Optional[str]
     version_comment: Optional[str]
@@ -170,7 +175,7 @@ class Stakeholder(BaseDomainModel):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentTopic(DomainDataclass):
     document_id: int
     topic_id: int
@@ -180,7 +185,7 @@ class DocumentTopic(DomainDataclass):
         return hash((self.topic_id, self.document_id))
 
 
-@dataclass
+@dataclass(slots=True)
 class TopicRawTopic(DomainDataclass):
     topic_id: int
     raw_topic_id: int
@@ -190,7 +195,7 @@ class TopicRawTopic(DomainDataclass):
         return hash((self.topic_id, self.raw_topic_id))
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentEntity(DomainDataclass):
     document_id: int
     entity_id: int
@@ -200,7 +205,7 @@ class DocumentEntity(DomainDataclass):
         return hash((self.entity_id, self.document_id))
 
 
-@dataclass
+@dataclass(slots=True)
 class EntityRawEntity(DomainDataclass):
     entity_id: int
     raw_entity_id: int
@@ -210,6 +215,71 @@ class EntityRawEntity(DomainDataclass):
         return hash((self.entity_id, self.raw_entity_id))
 
 
+class LinkColumns:
+    """Links of one kind (e.g. DocumentEntity) stored column-wise.
+
+    The two ids are kept in ``array("q")`` columns and the descriptions in a
+    list, so a link costs 16 bytes plus a reference instead of an object.
+    Iterating or indexing builds ``link_class`` instances on demand.
+    """
+
+    __slots__ = ("link_class", "first_ids", "second_ids", "descriptions")
+
+    def __init__(self, link_class):
+        self.link_class = link_class
+        self.first_ids = array("q")
+        self.second_ids = array("q")
+        self.descriptions: List[Optional[str]] = []
+
+    @classmethod
+    def from_rows(cls, link_class, rows: Iterable[Tuple]) -> "LinkColumns":
+        """From (first id, second id, link_description) rows, in the order of
+        ``link_class``'s fields, e.g. a query result."""
+        links = cls(link_class)
+        for first_id, second_id, description in rows:
+            links.first_ids.append(first_id)
+            links.second_ids.append(second_id)
+            links.descriptions.append(description)
+        return links
+
+    @property
+    def id_fields(self) -> Tuple[str, str]:
+        first, second = fields(self.link_class)[:2]
+        return first.name, second.name
+
+    def append(self, link):
+        first, second = self.id_fields
+        self.first_ids.append(getattr(link, first))
+        self.second_ids.append(getattr(link, second))
+        self.descriptions.append(link.link_description)
+
+    def __len__(self) -> int:
+        return len(self.first_ids)
+
+    def __getitem__(self, index: int):
+        return self.link_class(
+            self.first_ids[index], self.second_ids[index], self.descriptions[index]
+        )
+
+    def __iter__(self) -> Iterator:
+        for row in zip(self.first_ids, self.second_ids, self.descriptions):
+            yield self.link_class(*row)
+
+    def pairs(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.first_ids, self.second_ids)
+
+    def grouped(self, by_second: bool = False) -> Dict[int, List[int]]:
+        """Ids of the other side of the links, keyed by the first id (or the
+        second with ``by_second``), in link order."""
+        keys, values = self.first_ids, self.second_ids
+        if by_second:
+            keys, values = values, keys
+        groups: Dict[int, List[int]] = {}
+        for key, value in zip(keys, values):
+            groups.setdefault(key, []).append(value)
+        return groups
+
+
 class DocxComment(NamedTuple):
     reference_text: str
     author: str
@@ -1,20 +1,22 @@
+import argparse
 import os
-import datetime
-from docx2python import docx2python
 
-from core.database import create_database
+import core.config
+from core.adapters import extraction
+from core.adapters.file_watcher import DirectoryWatcher, SqlAlchemyFileStateStore
+from core.adapters.message_queue import SqlAlchemyMessageQueue
+from core.database import create_database, get_session_factory
 from core.service_layer.unit_of_work import SqlAlchemyUnitOfWork
 from core.adapters.llm_connectors import (
     DocumentAnalysisConnector,
     CanonicalEntityConsolidationConnector,
+    get_embedding_connector,
 )
 import core.bootstrap
 
 import core.domain.commands
 import core.service_layer.messagebus
 
-from core.config import DATABASE_PATH
-
 
 def process_file_list(file_list_path):
     try:
@@ -24,67 +26,101 @@ def process_file_list(file_list_path):
         print(f"Error: File list not found at {file_list_path}")
         return
 
+    to_extract = []
     for file_path in file_paths:
         if not os.path.exists(file_path):
-            print("Warning: File not found: {file_path}")
+            print(f"Warning: File not found: {file_path}")
             continue
 
-        file_type = os.path.splitext(file_path)[1].lower()
-
-        if file_type != ".docx":
-            print(f"Skipping non-docx file: {file_path}")
+        if not extraction.is_supported(file_path):
+            print(f"Skipping unsupported file: {file_path}")
             continue
 
-        print(f"Parsing docx file to db: {file_path}")
+        to_extract.append(file_path)
+
+    # Files are extracted in parallel on the shared pool and stored in order
+    for file_path, extracted in extraction.extract_many(to_extract):
+        if isinstance(extracted, Exception):
+            print(f"Error extracting {file_path}: {extracted}")
+            continue
 
-        create_document_from_docx(file_path)
+        print(f"Parsing file to db: {file_path}")
+        bus.handle(message=extraction.document_command(file_path, extracted))
 
 
 def create_document_from_docx(file_path):
-    doc = docx2python(file_path)
-    html_text = docx2python(file_path, html=True).text
-
-    file_name = os.path.basename(file_path)
-
-    create_new_document = core.domain.commands.CreateDocument(
-        filepath=file_path,
-        filename=file_name,
-        filetype=".docx",
-        text=doc.text,
-        html_text=html_text,
-        last_modified_at=datetime.datetime.strptime(
-            doc.properties.get("modified"), "%Y-%m-%dT%H:%M:%SZ"
-        ),
-        processed_at=datetime.datetime.now(),
-        created_at=datetime.datetime.strptime(
-            doc.properties.get("created"), "%Y-%m-%dT%H:%M:%SZ"
-        ),
-        created_by=doc.properties.get("creator", "CKEMPLEN"),
-        last_modified_by=doc.properties.get("lastModifiedBy", "CKEMPLEN"),
-        revision=doc.properties.get("revision", 0),
-        doc_comments=doc.comments,
-    )
+    extracted = extraction.extract_docx(file_path)
+    bus.handle(message=extraction.document_command(file_path, extracted))
+
+
+def watch_directories(directories, interval, enqueue=False):
+    """Ingests new and changed files under ``directories`` until interrupted.
+    With ``enqueue`` their documents are put on the message queue for the
+    workers instead of being handled here."""
+    if not directories:
+        print("Error: No directories to watch; pass them or set WATCH_DIRECTORIES")
+        return
 
-    bus.handle(message=create_new_document)
+    session_factory = get_session_factory()
+    if enqueue:
+        ingest = SqlAlchemyMessageQueue(session_factory=session_factory).put
+    else:
+        ingest = bus.handle
+    watcher = DirectoryWatcher(
+        directories, SqlAlchemyFileStateStore(session_factory), ingest
+    )
+    print(f"Watching {', '.join(directories)} every {interval}s")
+    try:
+        watcher.watch(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
 
 
 if __name__ == "__main__":
+    from core.adapters import vector_store
+
+    parser = argparse.ArgumentParser(description="Ingest documents from disk.")
+    parser.add_argument("--file-list", help="Text file listing one path per line")
+    parser.add_argument(
+        "--watch",
+        nargs="*",
+        metavar="DIRECTORY",
+        help="Keep ingesting new and changed files (default WATCH_DIRECTORIES)",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=core.config.WATCH_INTERVAL_SECONDS
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="Put watched documents on the message queue for the workers",
+    )
+    args = parser.parse_args()
+
     bus = core.bootstrap.bootstrap(
         uow=SqlAlchemyUnitOfWork(),
         document_analysis_connector=DocumentAnalysisConnector(),
         canonical_entity_consolidation_connector=CanonicalEntityConsolidationConnector(),
+        embedding_connector=get_embedding_connector(),
+        embedding_store=vector_store.get_embedding_store(),
     )
 
-    create_database(DATABASE_PATH)
+    create_database()
 
-    # process_file_list(FILE_LIST)
+    if args.file_list:
+        process_file_list(args.file_list)
 
-    bus.handle(
-        message=core.domain.commands.ConsolidateCanonicalEntities(
-            entity_ids=None,
-            raw_entity_ids=None,
+    if args.watch is not None:
+        watch_directories(
+            args.watch or core.config.WATCH_DIRECTORIES, args.interval, args.enqueue
+        )
+    else:
+        bus.handle(
+            message=core.domain.commands.ConsolidateCanonicalEntities(
+                entity_ids=None,
+                raw_entity_ids=None,
+            )
         )
-    )
 
 
 # list(
@@ -0,0 +1,182 @@
+"""Standalone worker that handles commands and events from the persistent queue.
+
+Run several processes on one machine to spread handler work across cores:
+
+    python -m core.entrypoints.worker --processes 4
+
+Producers (the web app, the headless CLI) put messages on the queue with
+``SqlAlchemyMessageQueue.put`` and each worker claims, handles and acknowledges
+them one at a time. The events a message raises are put back on the queue, so
+that the follow-up work is spread over all workers. A message whose event
+handlers give up is failed, and retried with only the handlers that have not
+finished, as the others have already committed their work.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import List
+
+import core.bootstrap
+import core.config
+import core.database
+import core.domain.events as events
+from core.adapters.llm_connectors import (
+    DocumentAnalysisConnector,
+    CanonicalEntityConsolidationConnector,
+    get_embedding_connector,
+)
+from core.adapters.message_queue import (
+    AbstractMessageQueue,
+    QueuedMessage,
+    SqlAlchemyMessageQueue,
+)
+from core.service_layer.unit_of_work import SqlAlchemyUnitOfWork
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseHeartbeat:
+    """Keeps extending a message lease while a long-running handler works on it."""
+
+    def __init__(self, queue: AbstractMessageQueue, item: QueuedMessage, worker_id):
+        self.queue = queue
+        self.item = item
+        self.worker_id = worker_id
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        interval = max(self.queue.lease_seconds / 3, 0.1)
+        while not self._stopped.wait(interval):
+            if not self.queue.extend_lease(self.item.id, self.worker_id):
+                logger.warning(
+                    "Worker %s lost its lease on message %s",
+                    self.worker_id,
+                    self.item.id,
+                )
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stopped.set()
+        self._thread.join()
+
+
+def finished_handlers(bus, message, failures) -> List[str]:
+    """The event handlers of ``message`` that have succeeded on any attempt."""
+    if not isinstance(message, events.Event):
+        return []
+    failed = {f.handler_name for f in failures if f.message is message}
+    return [name for name, _ in bus.event_handlers[type(message)] if name not in failed]
+
+
+def process_next_message(bus, queue: AbstractMessageQueue, worker_id: str) -> bool:
+    """Claims and handles a single message. Returns False if the queue was empty."""
+    item = queue.claim(worker_id)
+    if item is None:
+        return False
+
+    logger.info(
+        "Worker %s handling %s (queue id %s, attempt %s)",
+        worker_id,
+        item.message.__class__.__name__,
+        item.id,
+        item.attempts,
+    )
+    try:
+        with LeaseHeartbeat(queue, item, worker_id):
+            failures = bus.handle(item.message, skip=item.handled_by)
+    except Exception as e:
+        logger.exception("Worker %s failed on message %s", worker_id, item.id)
+        queue.fail(item.id, worker_id, repr(e), handled_by=item.handled_by)
+        return True
+
+    if failures:
+        error = "; ".join(map(str, failures))
+        logger.error("Worker %s failed on message %s: %s", worker_id, item.id, error)
+        queue.fail(
+            item.id,
+            worker_id,
+            error,
+            handled_by=finished_handlers(bus, item.message, failures),
+        )
+    else:
+        queue.ack(item.id, worker_id)
+    return True
+
+
+def run_worker(
+    worker_id: str,
+    stop_event=None,
+    poll_interval: float = core.config.WORKER_POLL_INTERVAL,
+    lease_seconds: float = core.config.WORKER_LEASE_SECONDS,
+):
+    from core.adapters import vector_store  # NumPy is only needed once working
+
+    queue = SqlAlchemyMessageQueue(
+        session_factory=core.database.get_session_factory(),
+        lease_seconds=lease_seconds,
+    )
+    bus = core.bootstrap.bootstrap(
+        uow=SqlAlchemyUnitOfWork(),
+        document_analysis_connector=DocumentAnalysisConnector(),
+        canonical_entity_consolidation_connector=CanonicalEntityConsolidationConnector(),
+        embedding_connector=get_embedding_connector(),
+        embedding_store=vector_store.get_embedding_store(),
+        dispatch=queue.put,
+    )
+
+    logger.info("Worker %s started", worker_id)
+    while stop_event is None or not stop_event.is_set():
+        if not process_next_message(bus, queue, worker_id):
+            time.sleep(poll_interval)
+    logger.info("Worker %s stopped", worker_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run message queue workers.")
+    parser.add_argument("--processes", type=int, default=core.config.WORKER_PROCESSES)
+    parser.add_argument(
+        "--lease-seconds", type=float, default=core.config.WORKER_LEASE_SECONDS
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=core.config.WORKER_POLL_INTERVAL
+    )
+    args = parser.parse_args()
+
+    stop_event = multiprocessing.Event()
+    host = socket.gethostname()
+    workers = [
+        multiprocessing.Process(
+            target=run_worker,
+            name=f"worker-{n}",
+            args=(f"{host}-{os.getpid()}-{n}", stop_event),
+            kwargs=dict(
+                poll_interval=args.poll_interval, lease_seconds=args.lease_seconds
+            ),
+        )
+        for n in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping %s workers...", len(workers))
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == "__main__":
+    main()
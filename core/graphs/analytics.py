@@ -0,0 +1,307 @@
+"""Batch analytics over the document-entity and document-topic links.
+
+Entities and topics are ranked by degree (the documents they appear in),
+weighted degree (their co-occurrence strength: the number of times they share
+a document with another entity or topic) and PageRank, and every node gets the
+number of its connected component, largest first. Entity pairs that share
+documents are counted in ``entity_cooccurrences``.
+
+Everything is computed with array operations on the CSR arrays of a
+:class:`~core.graphs.index.GraphIndex`. A refresh is incremental by default:
+links not yet counted (those missing from ``graph_analytics_links``) only add
+the co-occurrences they create, and PageRank restarts from the stored ranks.
+"""
+
+import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+import core.adapters.orm as orm
+from core.graphs.index import GraphIndex, load_pairs, segment_positions
+
+NODE_TYPES = ("document", "entity", "topic")
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-6  # L1 change between iterations
+PAGERANK_MAX_ITERATIONS = 100
+WRITE_BATCH_SIZE = 10_000
+
+metrics_table = orm.GraphNodeMetricsORM.__table__
+cooccurrence_table = orm.EntityCooccurrenceORM.__table__
+counted_links_table = orm.GraphAnalyticsLinkORM.__table__
+
+
+def load_link_graph(session) -> Tuple[GraphIndex, np.ndarray]:
+    """The link graph, plus its document-entity links as (document, entity) ids."""
+    ids = {
+        "document": session.execute(select(orm.DocumentORM.id)).scalars().all(),
+        "entity": session.execute(select(orm.EntityORM.id)).scalars().all(),
+        "topic": session.execute(select(orm.TopicORM.id)).scalars().all(),
+    }
+    entity_links = load_pairs(
+        session, orm.DocumentEntityORM.document_id, orm.DocumentEntityORM.entity_id
+    )
+    topic_links = load_pairs(
+        session, orm.DocumentTopicORM.document_id, orm.DocumentTopicORM.topic_id
+    )
+    graph = GraphIndex(
+        ids,
+        labels={},
+        links={
+            "document_entity": (entity_links[:, 0], entity_links[:, 1]),
+            "document_topic": (topic_links[:, 0], topic_links[:, 1]),
+        },
+    )
+    return graph, entity_links
+
+
+def weighted_degrees(graph: GraphIndex) -> np.ndarray:
+    """Co-occurrence strength of entities and topics; documents keep their degree.
+
+    An entity in a document with k entities co-occurs k - 1 times there, so its
+    strength is the sum of k - 1 over its documents (likewise for topics).
+    """
+    weighted = graph.degree.astype(np.float64)
+    strength = np.zeros(len(graph))
+    for code in np.unique(graph.edge_relation):
+        in_relation = graph.edge_relation == code
+        documents = graph.edge_source[in_relation]
+        per_document = np.bincount(documents, minlength=len(graph))
+        strength += np.bincount(
+            graph.edge_target[in_relation],
+            weights=per_document[documents] - 1,
+            minlength=len(graph),
+        )
+    is_document = graph.node_group == 0
+    weighted[~is_document] = strength[~is_document]
+    return weighted
+
+
+def pagerank(
+    graph: GraphIndex,
+    initial: Optional[np.ndarray] = None,
+    damping: float = PAGERANK_DAMPING,
+    tolerance: float = PAGERANK_TOLERANCE,
+    max_iterations: int = PAGERANK_MAX_ITERATIONS,
+) -> Tuple[np.ndarray, int]:
+    """PageRank of the undirected graph by power iteration, and the iterations
+    it took. ``initial`` (e.g. the previous ranks) speeds up convergence."""
+    n = len(graph)
+    if not n:
+        return np.zeros(0), 0
+    degree = graph.degree.astype(np.float64)
+    owners = np.repeat(np.arange(n), graph.degree)
+    dangling = degree == 0
+    rank = np.full(n, 1.0 / n) if initial is None else initial / initial.sum()
+    for iteration in range(1, max_iterations + 1):
+        share = np.divide(rank, degree, out=np.zeros(n), where=~dangling)
+        # Sparse matrix-vector product: each node passes its share to neighbours
+        spread = np.bincount(graph.indices, weights=share[owners], minlength=n)
+        new_rank = (1 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+        converged = np.abs(new_rank - rank).sum() < tolerance
+        rank = new_rank
+        if converged:
+            break
+    return rank, iteration
+
+
+def connected_components(graph: GraphIndex) -> np.ndarray:
+    """Component number of every node, numbered from the largest component."""
+    labels = np.arange(len(graph))
+    source, target = graph.edge_source, graph.edge_target
+    while True:
+        low = np.minimum(labels[source], labels[target])
+        high = np.maximum(labels[source], labels[target])
+        differ = low != high
+        if not differ.any():
+            break
+        # Hook each root onto the lowest root it touches, then flatten the trees
+        np.minimum.at(labels, high[differ], low[differ])
+        while True:
+            parents = labels[labels]
+            if np.array_equal(parents, labels):
+                break
+            labels = parents
+    roots, components = np.unique(labels, return_inverse=True)
+    sizes = np.bincount(components)
+    order = np.argsort(-sizes, kind="stable")
+    numbers = np.empty(len(roots), dtype=np.int64)
+    numbers[order] = np.arange(len(roots))
+    return numbers[components]
+
+
+def cooccurrence_counts(
+    documents: np.ndarray, entities: np.ndarray, is_new: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Entity pairs sharing a document, as (entity, other entity, documents)
+    with entity < other. With ``is_new`` only pairs with a new link count."""
+    order = np.lexsort((entities, documents))
+    documents, entities = documents[order], entities[order]
+    if is_new is not None:
+        is_new = is_new[order]
+    positions = np.arange(len(documents))
+    segment_ends = np.searchsorted(documents, documents, side="right")
+    partners = segment_positions(positions + 1, segment_ends - positions - 1)
+    owners = np.repeat(positions, segment_ends - positions - 1)
+    if is_new is not None:
+        keep = is_new[owners] | is_new[partners]
+        owners, partners = owners[keep], partners[keep]
+    first = np.minimum(entities[owners], entities[partners])
+    second = np.maximum(entities[owners], entities[partners])
+    base = int(entities.max()) + 1 if len(entities) else 1
+    keys, counts = np.unique(first * base + second, return_counts=True)
+    return keys // base, keys % base, counts
+
+
+def uncounted_links(session) -> np.ndarray:
+    statement = (
+        select(orm.DocumentEntityORM.document_id, orm.DocumentEntityORM.entity_id)
+        .outerjoin(
+            counted_links_table,
+            (counted_links_table.c.document_id == orm.DocumentEntityORM.document_id)
+            & (counted_links_table.c.entity_id == orm.DocumentEntityORM.entity_id),
+        )
+        .where(counted_links_table.c.document_id.is_(None))
+    )
+    return np.array(session.execute(statement).all(), dtype=np.int64).reshape(-1, 2)
+
+
+def write_rows(session, table, rows):
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        session.execute(insert(table), rows[start : start + WRITE_BATCH_SIZE])
+
+
+def add_cooccurrences(session, first, second, counts):
+    rows = [
+        {"entity_id": a, "other_entity_id": b, "document_count": c}
+        for a, b, c in zip(first.tolist(), second.tolist(), counts.tolist())
+    ]
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        raise NotImplementedError(f"No co-occurrence upsert for {dialect}")
+    statement = upsert(cooccurrence_table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["entity_id", "other_entity_id"],
+        set_={
+            "document_count": cooccurrence_table.c.document_count
+            + statement.excluded.document_count
+        },
+    )
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        session.execute(statement, rows[start : start + WRITE_BATCH_SIZE])
+
+
+def stored_pageranks(session, graph: GraphIndex) -> Optional[np.ndarray]:
+    rows = session.execute(
+        select(
+            metrics_table.c.node_type, metrics_table.c.node_id, metrics_table.c.pagerank
+        )
+    ).all()
+    if not rows:
+        return None
+    initial = np.full(len(graph), 1.0 / len(graph))
+    for node_type in NODE_TYPES:
+        typed = [(id_, rank) for t, id_, rank in rows if t == node_type]
+        if not typed:
+            continue
+        ids, ranks = zip(*typed)
+        positions, found = graph.lookup(node_type, ids)
+        initial[positions[found]] = np.asarray(ranks)[found]
+    return initial
+
+
+def metrics_are_current(session, graph: GraphIndex) -> bool:
+    """Whether the stored node metrics are for the graph's nodes and degrees."""
+    stored = session.execute(
+        select(
+            metrics_table.c.node_type, metrics_table.c.node_id, metrics_table.c.degree
+        )
+    ).all()
+    current = {
+        (node_type, node_id, int(graph.degree[graph.group_offsets[node_type] + i]))
+        for node_type in NODE_TYPES
+        for i, node_id in enumerate(graph.group_ids[node_type].tolist())
+    }
+    return len(stored) == len(current) and set(map(tuple, stored)) == current
+
+
+def refresh(session, full: bool = False) -> dict:
+    """Recomputes the analytics tables in the session's transaction.
+
+    Without ``full``, co-occurrences are only counted for the document-entity
+    links added since the last refresh, and the node metrics are only
+    recomputed when the nodes or their degrees differ from the stored ones.
+    Returns a summary of what was done.
+    """
+    graph, entity_links = load_link_graph(session)
+    if full:
+        session.execute(delete(cooccurrence_table))
+        session.execute(delete(counted_links_table))
+        new_links = entity_links
+        pairs = cooccurrence_counts(entity_links[:, 0], entity_links[:, 1])
+        initial = None
+    else:
+        new_links = uncounted_links(session)
+        if not len(new_links):
+            # New documents, topics or topic links still change the node metrics
+            if metrics_are_current(session, graph):
+                return {"full": False, "new_links": 0}
+            pairs = None
+        else:
+            base = int(entity_links[:, 1].max()) + 1
+            is_new = np.isin(
+                entity_links[:, 0] * base + entity_links[:, 1],
+                new_links[:, 0] * base + new_links[:, 1],
+            )
+            # Only the documents gaining links can gain co-occurrences
+            affected = np.isin(entity_links[:, 0], new_links[:, 0])
+            pairs = cooccurrence_counts(
+                entity_links[affected, 0], entity_links[affected, 1], is_new[affected]
+            )
+        initial = stored_pageranks(session, graph)
+
+    if pairs is not None:
+        add_cooccurrences(session, *pairs)
+    write_rows(
+        session,
+        counted_links_table,
+        [{"document_id": d, "entity_id": e} for d, e in new_links.tolist()],
+    )
+
+    degree = graph.degree
+    weighted = weighted_degrees(graph)
+    ranks, iterations = pagerank(graph, initial)
+    components = connected_components(graph)
+    computed_at = datetime.datetime.now(datetime.timezone.utc)
+    session.execute(delete(metrics_table))
+    rows = []
+    for node_type in NODE_TYPES:
+        offset = graph.group_offsets[node_type]
+        for i, node_id in enumerate(graph.group_ids[node_type].tolist()):
+            index = offset + i
+            rows.append(
+                {
+                    "node_type": node_type,
+                    "node_id": node_id,
+                    "degree": int(degree[index]),
+                    "weighted_degree": float(weighted[index]),
+                    "pagerank": float(ranks[index]),
+                    "component": int(components[index]),
+                    "computed_at": computed_at,
+                }
+            )
+    write_rows(session, metrics_table, rows)
+    return {
+        "full": full,
+        "new_links": len(new_links),
+        "nodes": len(graph),
+        "pagerank_iterations": iterations,
+        "components": int(components.max()) + 1 if len(components) else 0,
+    }
@@ -0,0 +1,289 @@
+"""Cached node/edge graph for the graph page, with versions for delta updates.
+
+The graph is built from narrow column queries (never document text) and kept
+until a message that changes it passes through the bus, or until a cheap
+fingerprint query shows another process has written to the database. Each
+rebuild is diffed against the previous snapshot, so every node and edge
+records the version it last changed in and clients can fetch only what changed
+since the version they hold.
+"""
+
+import hashlib
+import json
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+
+import core.adapters.orm as orm
+import core.config as config
+import core.domain.commands as commands
+import core.domain.events as events
+
+# Messages whose handlers add, change or remove graph nodes or edges
+GRAPH_MESSAGES = (
+    events.DocumentCreated,
+    events.DocumentProcessed,
+    commands.CreateDocument,
+    commands.AddEntity,
+    commands.UpdateEntity,
+    commands.ConsolidateCanonicalEntities,
+    events.DocumentEntitiesLinked,
+    commands.CreateTopic,
+    commands.UpdateTopic,
+    commands.DeleteTopic,
+    commands.AddStakeholder,
+    commands.UpdateStakeholder,
+    commands.DeleteStakeholder,
+)
+
+# Deltas are served for this many versions; older clients reload everything.
+DELTA_HISTORY = 100
+
+EdgeKey = Tuple[str, str]
+
+
+def load_graph(session) -> Tuple[Dict[str, dict], Dict[EdgeKey, dict]]:
+    nodes = {}
+    node_sources = [
+        ("document", orm.DocumentORM.id, orm.DocumentORM.filename),
+        ("topic", orm.TopicORM.id, orm.TopicORM.topic_name),
+        ("entity", orm.EntityORM.id, orm.EntityORM.entity_name),
+        ("stakeholder", orm.StakeholderORM.id, orm.StakeholderORM.stakeholder_name),
+    ]
+    for group, id_column, label_column in node_sources:
+        for id_, label in session.execute(select(id_column, label_column)):
+            node_id = f"{group}-{id_}"
+            nodes[node_id] = {
+                "id": node_id,
+                "name": node_id,
+                "label": label,
+                "group": group,
+                "degree": 0,
+            }
+
+    edges = {}
+    links = select(orm.DocumentEntityORM.document_id, orm.DocumentEntityORM.entity_id)
+    for document_id, entity_id in session.execute(links):
+        source, target = f"document-{document_id}", f"entity-{entity_id}"
+        if source not in nodes or target not in nodes:
+            continue
+        edges[(source, target)] = {"source": source, "target": target}
+        nodes[source]["degree"] += 1
+        nodes[target]["degree"] += 1
+
+    return nodes, edges
+
+
+def database_fingerprint(session) -> tuple:
+    """Row counts and highest ids of the graph's tables, plus the changelog.
+
+    Inserts and deletes change the counts or ids, and updates through the
+    repositories add a changelog row, so any write shows up here.
+    """
+    columns = []
+    for table in (
+        orm.DocumentORM,
+        orm.TopicORM,
+        orm.EntityORM,
+        orm.StakeholderORM,
+        orm.ChangelogORM,
+    ):
+        columns.append(select(func.count(table.id)).scalar_subquery())
+        columns.append(select(func.max(table.id)).scalar_subquery())
+    columns.append(
+        select(func.count()).select_from(orm.DocumentEntityORM).scalar_subquery()
+    )
+    return tuple(session.execute(select(*columns)).one())
+
+
+@dataclass
+class GraphSnapshot:
+    epoch: str
+    version: int
+    nodes: Dict[str, dict]
+    edges: Dict[EdgeKey, dict]
+    node_versions: Dict[str, int]
+    edge_versions: Dict[EdgeKey, int]
+    removed_nodes: Dict[str, int] = field(default_factory=dict)
+    removed_edges: Dict[EdgeKey, int] = field(default_factory=dict)
+    etag: str = ""
+    body: bytes = b""
+
+    @property
+    def token(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    def payload(self) -> dict:
+        return {
+            "version": self.token,
+            "nodes": list(self.nodes.values()),
+            "edges": list(self.edges.values()),
+        }
+
+    def render(self):
+        # Serialised once per snapshot; every request is served these bytes.
+        self.body = json.dumps(self.payload()).encode()
+        content = json.dumps(
+            [sorted(self.nodes.items()), sorted(self.edges)], sort_keys=True
+        ).encode()
+        self.etag = f'"{hashlib.sha1(content).hexdigest()}"'
+
+    def delta(self, since: Optional[str]) -> dict:
+        """Nodes and edges changed since the version token ``since``.
+
+        Falls back to the full graph (``"full": True``) for tokens from another
+        process or older than the retained history.
+        """
+        epoch, _, version = (since or "").partition(".")
+        if (
+            epoch != self.epoch
+            or not version.isdigit()
+            or int(version) < self.version - DELTA_HISTORY
+        ):
+            return {"full": True, **self.payload()}
+        since_version = int(version)
+        return {
+            "full": False,
+            "version": self.token,
+            "nodes": [
+                node
+                for node_id, node in self.nodes.items()
+                if self.node_versions[node_id] > since_version
+            ],
+            "edges": [
+                edge
+                for key, edge in self.edges.items()
+                if self.edge_versions[key] > since_version
+            ],
+            "removed_nodes": [
+                node_id
+                for node_id, removed_in in self.removed_nodes.items()
+                if removed_in > since_version
+            ],
+            "removed_edges": [
+                {"source": source, "target": target}
+                for (source, target), removed_in in self.removed_edges.items()
+                if removed_in > since_version
+            ],
+        }
+
+
+def diff_versions(old_items, new_items, old_versions, version):
+    versions = {}
+    for key, item in new_items.items():
+        if key in old_items and old_items[key] == item:
+            versions[key] = old_versions[key]
+        else:
+            versions[key] = version
+    removed = {key: version for key in old_items.keys() - new_items.keys()}
+    return versions, removed
+
+
+class GraphCache:
+    def __init__(
+        self, revalidate_seconds: float = config.GRAPH_CACHE_REVALIDATE_SECONDS
+    ):
+        self.revalidate_seconds = revalidate_seconds
+        self.epoch = secrets.token_hex(4)
+        self.lock = threading.Lock()
+        self.snapshot: Optional[GraphSnapshot] = None
+        self.index = None
+        # Bumped whenever the data may have changed; the snapshot and the
+        # index record the generation they were built from.
+        self.generation = 0
+        self.built = {"snapshot": -1, "index": -1}
+        self.fingerprint = None
+        self.checked_at = 0.0
+        self.stale = True
+
+    def invalidate(self):
+        self.stale = True
+
+    def observe(self, message):
+        if isinstance(message, GRAPH_MESSAGES):
+            self.invalidate()
+
+    def _revalidate(self, session):
+        now = time.monotonic()
+        if not self.stale and now - self.checked_at < self.revalidate_seconds:
+            return
+        fingerprint = database_fingerprint(session)
+        if self.stale or fingerprint != self.fingerprint:
+            self.generation += 1
+        # Cleared before loading, so an invalidation during the rebuild
+        # (or a write after the fingerprint) triggers another one.
+        self.stale = False
+        self.checked_at = now
+        self.fingerprint = fingerprint
+
+    def get(self, session) -> GraphSnapshot:
+        with self.lock:
+            self._revalidate(session)
+            if self.built["snapshot"] != self.generation:
+                self.snapshot = self._rebuild(session)
+                self.built["snapshot"] = self.generation
+            return self.snapshot
+
+    def get_index(self, session):
+        """The adjacency index over all relations (see core.graphs.index)."""
+        from core.graphs.index import GraphIndex
+
+        with self.lock:
+            self._revalidate(session)
+            if self.built["index"] != self.generation:
+                self.index = GraphIndex.load(session)
+                self.built["index"] = self.generation
+            return self.index
+
+    def _rebuild(self, session) -> GraphSnapshot:
+        nodes, edges = load_graph(session)
+        previous = self.snapshot
+        if previous is None:
+            snapshot = GraphSnapshot(
+                epoch=self.epoch,
+                version=1,
+                nodes=nodes,
+                edges=edges,
+                node_versions=dict.fromkeys(nodes, 1),
+                edge_versions=dict.fromkeys(edges, 1),
+            )
+            snapshot.render()
+            return snapshot
+
+        if nodes == previous.nodes and edges == previous.edges:
+            return previous
+
+        version = previous.version + 1
+        node_versions, removed_nodes = diff_versions(
+            previous.nodes, nodes, previous.node_versions, version
+        )
+        edge_versions, removed_edges = diff_versions(
+            previous.edges, edges, previous.edge_versions, version
+        )
+        oldest = version - DELTA_HISTORY
+        for key, removed_in in previous.removed_nodes.items():
+            if removed_in >= oldest and key not in nodes:
+                removed_nodes.setdefault(key, removed_in)
+        for key, removed_in in previous.removed_edges.items():
+            if removed_in >= oldest and key not in edges:
+                removed_edges.setdefault(key, removed_in)
+
+        snapshot = GraphSnapshot(
+            epoch=self.epoch,
+            version=version,
+            nodes=nodes,
+            edges=edges,
+            node_versions=node_versions,
+            edge_versions=edge_versions,
+            removed_nodes=removed_nodes,
+            removed_edges=removed_edges,
+        )
+        snapshot.render()
+        return snapshot
+
+
+GRAPH_CACHE = GraphCache()
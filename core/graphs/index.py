@@ -0,0 +1,309 @@
+"""Adjacency index over every relation in the knowledge base.
+
+Nodes are numbered group by group and all relations are stored once as
+compressed sparse row (CSR) arrays: the neighbours of node ``i`` are
+``indices[indptr[i]:indptr[i + 1]]``. Edges are undirected for traversal, so
+k-hop neighbourhoods, degree rankings and the edges between a page of nodes
+are all array operations, and only the page that is returned is turned into
+dicts.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+import core.adapters.orm as orm
+
+GROUPS = ("document", "topic", "entity", "stakeholder", "raw_topic", "raw_entity")
+
+NODE_SOURCES = {
+    "document": (orm.DocumentORM.id, orm.DocumentORM.filename),
+    "topic": (orm.TopicORM.id, orm.TopicORM.topic_name),
+    "entity": (orm.EntityORM.id, orm.EntityORM.entity_name),
+    "stakeholder": (orm.StakeholderORM.id, orm.StakeholderORM.stakeholder_name),
+    "raw_topic": (orm.RawTopicORM.id, orm.RawTopicORM.topic_name),
+    "raw_entity": (orm.RawEntityORM.id, orm.RawEntityORM.entity_name),
+}
+
+# relation: (source column, target column, source group, target group)
+RELATIONS = {
+    "document_entity": (
+        orm.DocumentEntityORM.document_id,
+        orm.DocumentEntityORM.entity_id,
+        "document",
+        "entity",
+    ),
+    "document_topic": (
+        orm.DocumentTopicORM.document_id,
+        orm.DocumentTopicORM.topic_id,
+        "document",
+        "topic",
+    ),
+    "topic_raw_topic": (
+        orm.TopicRawTopicORM.topic_id,
+        orm.TopicRawTopicORM.raw_topic_id,
+        "topic",
+        "raw_topic",
+    ),
+    "entity_raw_entity": (
+        orm.EntityRawEntityORM.entity_id,
+        orm.EntityRawEntityORM.raw_entity_id,
+        "entity",
+        "raw_entity",
+    ),
+    "raw_topic_document": (
+        orm.RawTopicORM.id,
+        orm.RawTopicORM.document_id,
+        "raw_topic",
+        "document",
+    ),
+    "raw_entity_document": (
+        orm.RawEntityORM.id,
+        orm.RawEntityORM.document_id,
+        "raw_entity",
+        "document",
+    ),
+    "previous_version": (
+        orm.DocumentORM.id,
+        orm.DocumentORM.previous_version_id,
+        "document",
+        "document",
+    ),
+}
+RELATION_NAMES = tuple(RELATIONS)
+
+
+def load_pairs(session, first, second) -> np.ndarray:
+    rows = session.execute(select(first, second).where(second.is_not(None))).all()
+    return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+
+def segment_positions(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of ``range(start, start + count)`` for each segment."""
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    segment_starts = np.cumsum(counts) - counts
+    return np.repeat(starts - segment_starts, counts) + np.arange(total)
+
+
+class GraphIndex:
+    def __init__(
+        self,
+        ids: Dict[str, Iterable[int]],
+        labels: Dict[str, List[Optional[str]]],
+        links: Dict[str, Tuple[Iterable[int], Iterable[int]]],
+    ):
+        """Builds the index from node ids and labels per group, and (source
+        ids, target ids) per relation. Links to missing nodes are dropped."""
+        self.group_ids = {}
+        self.group_offsets = {}
+        self.labels: List[Optional[str]] = []
+        node_group = []
+        for code, group in enumerate(GROUPS):
+            group_ids = np.asarray(ids.get(group, ()), dtype=np.int64)
+            order = np.argsort(group_ids, kind="stable")
+            self.group_ids[group] = group_ids[order]
+            self.group_offsets[group] = len(self.labels)
+            group_labels = labels.get(group, [None] * len(group_ids))
+            self.labels.extend(group_labels[i] for i in order)
+            node_group.append(np.full(len(group_ids), code, dtype=np.int8))
+        self.node_group = np.concatenate(node_group)
+        node_count = len(self.node_group)
+
+        sources, targets, relations = [], [], []
+        for code, relation in enumerate(RELATION_NAMES):
+            if relation not in links:
+                continue
+            _, _, source_group, target_group = RELATIONS[relation]
+            source_ids, target_ids = links[relation]
+            source, source_found = self.lookup(source_group, source_ids)
+            target, target_found = self.lookup(target_group, target_ids)
+            found = source_found & target_found
+            sources.append(source[found])
+            targets.append(target[found])
+            relations.append(np.full(int(found.sum()), code, dtype=np.int8))
+        self.edge_source = np.concatenate(sources or [np.empty(0, np.int64)])
+        self.edge_target = np.concatenate(targets or [np.empty(0, np.int64)])
+        self.edge_relation = np.concatenate(relations or [np.empty(0, np.int8)])
+
+        # Each edge is stored at both of its ends
+        ends = np.concatenate([self.edge_source, self.edge_target])
+        others = np.concatenate([self.edge_target, self.edge_source])
+        edge_numbers = np.tile(np.arange(len(self.edge_source)), 2)
+        order = np.argsort(ends, kind="stable")
+        self.indices = others[order]
+        self.adjacency_edge = edge_numbers[order]
+        self.adjacency_relation = self.edge_relation[self.adjacency_edge]
+        self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends, minlength=node_count), out=self.indptr[1:])
+        self.degree = np.diff(self.indptr)
+        self._relation_degrees = {}
+
+    @classmethod
+    def load(cls, session) -> "GraphIndex":
+        ids, labels, links = {}, {}, {}
+        for group, (id_column, label_column) in NODE_SOURCES.items():
+            rows = session.execute(select(id_column, label_column)).all()
+            ids[group] = [row[0] for row in rows]
+            labels[group] = [row[1] for row in rows]
+        for relation, (first, second, _, _) in RELATIONS.items():
+            pairs = load_pairs(session, first, second)
+            links[relation] = (pairs[:, 0], pairs[:, 1])
+        return cls(ids, labels, links)
+
+    def __len__(self) -> int:
+        return len(self.node_group)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_source)
+
+    def lookup(self, group, ids) -> Tuple[np.ndarray, np.ndarray]:
+        """Node indices of a group's database ids, and which ids were found."""
+        group_ids = self.group_ids[group]
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(group_ids, ids)
+        positions = np.minimum(positions, max(len(group_ids) - 1, 0))
+        found = (
+            group_ids[positions] == ids if len(group_ids) else np.zeros(len(ids), bool)
+        )
+        return positions + self.group_offsets[group], found
+
+    def node_index(self, node_id: str) -> int:
+        """Index of a node named like the graph page, e.g. ``"raw_topic-12"``."""
+        group, _, id_ = node_id.rpartition("-")
+        if group not in self.group_ids or not id_.isdigit():
+            raise KeyError(node_id)
+        position, found = self.lookup(group, [int(id_)])
+        if not found[0]:
+            raise KeyError(node_id)
+        return int(position[0])
+
+    def node_name(self, index: int) -> str:
+        group = GROUPS[self.node_group[index]]
+        db_id = self.group_ids[group][index - self.group_offsets[group]]
+        return f"{group}-{db_id}"
+
+    def relation_mask(self, relations: Optional[Iterable[str]]) -> np.ndarray:
+        allowed = np.zeros(len(RELATION_NAMES), dtype=bool)
+        codes = [RELATION_NAMES.index(r) for r in relations or () if r in RELATIONS]
+        allowed[codes or slice(None)] = True
+        return allowed
+
+    def degrees(self, relations: Optional[Iterable[str]] = None) -> np.ndarray:
+        allowed = self.relation_mask(relations)
+        if allowed.all():
+            return self.degree
+        key = allowed.tobytes()
+        if key not in self._relation_degrees:
+            kept = allowed[self.edge_relation]
+            ends = np.concatenate([self.edge_source[kept], self.edge_target[kept]])
+            self._relation_degrees[key] = np.bincount(ends, minlength=len(self))
+        return self._relation_degrees[key]
+
+    def _adjacent(self, nodes: np.ndarray, allowed: np.ndarray):
+        positions = segment_positions(
+            self.indptr[nodes], self.indptr[nodes + 1] - self.indptr[nodes]
+        )
+        positions = positions[allowed[self.adjacency_relation[positions]]]
+        return self.indices[positions], self.adjacency_edge[positions]
+
+    def neighbourhood(
+        self, node: int, hops: int = 1, relations: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """Indices of the nodes at most ``hops`` edges away from ``node``."""
+        allowed = self.relation_mask(relations)
+        visited = np.zeros(len(self), dtype=bool)
+        visited[node] = True
+        frontier = np.array([node], dtype=np.int64)
+        reached = np.zeros(len(self), dtype=bool)
+        for _ in range(hops):
+            neighbours, _ = self._adjacent(frontier, allowed)
+            # A mask rather than np.unique: hubs reach most of the graph
+            reached[neighbours] = True
+            reached &= ~visited
+            frontier = np.flatnonzero(reached)
+            if not len(frontier):
+                break
+            visited[frontier] = True
+            reached[frontier] = False
+        return np.flatnonzero(visited)
+
+    def induced_edges(
+        self, nodes: np.ndarray, relations: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """Numbers of the edges with both ends in ``nodes``."""
+        selected = np.zeros(len(self), dtype=bool)
+        selected[nodes] = True
+        neighbours, edges = self._adjacent(
+            np.asarray(nodes, dtype=np.int64), self.relation_mask(relations)
+        )
+        # Each edge is listed at both ends; keep it once, from its source
+        keep = selected[neighbours] & (self.edge_target[edges] == neighbours)
+        return np.sort(edges[keep])
+
+    def query(
+        self,
+        node: Optional[str] = None,
+        hops: int = 1,
+        groups: Optional[Iterable[str]] = None,
+        relations: Optional[Iterable[str]] = None,
+        top: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 500,
+    ) -> dict:
+        """One page of a filtered subgraph, highest degree nodes first.
+
+        ``node`` restricts the graph to its ``hops`` neighbourhood, ``groups``
+        and ``relations`` to those node and edge types, and ``top`` to the
+        best connected nodes; the page holds the edges between its own nodes.
+        Raises KeyError for an unknown ``node``.
+        """
+        degree = self.degrees(relations)
+        if node is None:
+            candidates = np.arange(len(self))
+        else:
+            center = self.node_index(node)
+            candidates = self.neighbourhood(center, hops, relations)
+        codes = [GROUPS.index(g) for g in groups or () if g in GROUPS]
+        if codes:
+            keep = np.isin(self.node_group[candidates], codes)
+            if node is not None:
+                keep |= candidates == center
+            candidates = candidates[keep]
+
+        total = len(candidates) if top is None else min(len(candidates), top)
+        wanted = min(total, offset + limit)
+        # Unique scores (degree, then lowest index) keep pages stable
+        scores = degree[candidates] * len(self) + (len(self) - 1 - candidates)
+        if 0 < wanted < len(candidates):
+            best = np.argpartition(-scores, wanted - 1)[:wanted]
+            candidates, scores = candidates[best], scores[best]
+        page = candidates[np.argsort(-scores, kind="stable")][offset:wanted]
+
+        edges = self.induced_edges(page, relations)
+        return {
+            "nodes": [
+                {
+                    "id": self.node_name(i),
+                    "name": self.node_name(i),
+                    "label": self.labels[i],
+                    "group": GROUPS[self.node_group[i]],
+                    "degree": int(degree[i]),
+                }
+                for i in page.tolist()
+            ],
+            "edges": [
+                {
+                    "source": self.node_name(self.edge_source[e]),
+                    "target": self.node_name(self.edge_target[e]),
+                    "relation": RELATION_NAMES[self.edge_relation[e]],
+                }
+                for e in edges.tolist()
+            ],
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+        }
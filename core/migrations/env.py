@@ -0,0 +1,47 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+import core.adapters.orm as orm
+import core.database
+from core.adapters import search
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = orm.Base.metadata
+
+
+def include_name(name, type_, parent_names):
+    # The FTS5 table and its shadow tables are created with raw DDL
+    return not (type_ == "table" and search.is_fts_table(name))
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite can only alter tables by copying them
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # core.database.migrate() hands over a connection to the engine it was given
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+
+    with core.database.get_engine().connect() as connection:
+        run_migrations(connection)
+
+
+if context.is_offline_mode():
+    raise RuntimeError("Offline (SQL script) migrations are not supported.")
+
+run_migrations_online()
@@ -0,0 +1,242 @@
+"""Canonical schema with foreign-key indexes
+
+Brings both kinds of existing database to one schema: those created by the old
+raw SQLite script in core/database.py (missing audit columns, no secondary
+indexes) and those created from the ORM metadata (missing processed_at and the
+UNIQUE constraints). Fresh databases get every table created here.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-20
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def audit_columns():
+    return [
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("last_modified_at", sa.DateTime),
+        sa.Column("created_by", sa.String),
+        sa.Column("last_modified_by", sa.String),
+        sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+    ]
+
+
+def id_column():
+    return sa.Column("id", sa.Integer, primary_key=True, autoincrement=True)
+
+
+# Ordered so that referenced tables are created first.
+TABLES = {
+    "Documents": lambda: [
+        id_column(),
+        sa.Column("filepath", sa.String, nullable=False),
+        sa.Column("filename", sa.String, nullable=False),
+        sa.Column("filetype", sa.String),
+        sa.Column("text", sa.String),
+        sa.Column("html_text", sa.String),
+        sa.Column("previous_version_id", sa.Integer, sa.ForeignKey("Documents.id")),
+        sa.Column("processed_at", sa.DateTime),
+        sa.Column("summary", sa.String),
+        sa.Column("version_comment", sa.String),
+        sa.Column("revision", sa.Integer),
+        *audit_columns(),
+    ],
+    "Stakeholders": lambda: [
+        id_column(),
+        sa.Column("stakeholder_name", sa.String),
+        sa.Column("stakeholder_type", sa.String),
+        sa.Column("stakeholder_description", sa.String),
+        *audit_columns(),
+    ],
+    "Topics": lambda: [
+        id_column(),
+        sa.Column("topic_name", sa.String),
+        sa.Column("topic_description", sa.String),
+        *audit_columns(),
+    ],
+    "Entities": lambda: [
+        id_column(),
+        sa.Column("entity_name", sa.String),
+        sa.Column("entity_description", sa.String),
+        *audit_columns(),
+    ],
+    "Comments": lambda: [
+        id_column(),
+        sa.Column(
+            "document_id", sa.Integer, sa.ForeignKey("Documents.id"), nullable=False
+        ),
+        sa.Column("author", sa.String),
+        sa.Column("comment_text", sa.String),
+        sa.Column("reference_text", sa.String),
+        sa.Column("comment_date", sa.DateTime),
+        *audit_columns(),
+    ],
+    "RawTopics": lambda: [
+        id_column(),
+        sa.Column(
+            "document_id", sa.Integer, sa.ForeignKey("Documents.id"), nullable=False
+        ),
+        sa.Column("topic_name", sa.String),
+        sa.Column("topic_description", sa.String),
+        sa.Column("topic_prevalence", sa.Integer),
+        *audit_columns(),
+    ],
+    "RawEntities": lambda: [
+        id_column(),
+        sa.Column(
+            "document_id", sa.Integer, sa.ForeignKey("Documents.id"), nullable=False
+        ),
+        sa.Column("entity_name", sa.String),
+        sa.Column("entity_description", sa.String),
+        sa.Column("entity_prevalence", sa.Integer),
+        *audit_columns(),
+    ],
+    "DocumentTopics": lambda: [
+        sa.Column(
+            "document_id", sa.Integer, sa.ForeignKey("Documents.id"), primary_key=True
+        ),
+        sa.Column("topic_id", sa.Integer, sa.ForeignKey("Topics.id"), primary_key=True),
+        sa.Column("link_description", sa.String),
+        *audit_columns(),
+    ],
+    "TopicsRawTopics": lambda: [
+        sa.Column("topic_id", sa.Integer, sa.ForeignKey("Topics.id"), primary_key=True),
+        sa.Column(
+            "raw_topic_id",
+            sa.Integer,
+            sa.ForeignKey("RawTopics.id"),
+            primary_key=True,
+        ),
+        sa.Column("link_description", sa.String),
+        *audit_columns(),
+    ],
+    "DocumentEntities": lambda: [
+        sa.Column(
+            "document_id", sa.Integer, sa.ForeignKey("Documents.id"), primary_key=True
+        ),
+        sa.Column(
+            "entity_id", sa.Integer, sa.ForeignKey("Entities.id"), primary_key=True
+        ),
+        sa.Column("link_description", sa.String),
+        *audit_columns(),
+    ],
+    "EntitiesRawEntities": lambda: [
+        sa.Column(
+            "entity_id", sa.Integer, sa.ForeignKey("Entities.id"), primary_key=True
+        ),
+        sa.Column(
+            "raw_entity_id",
+            sa.Integer,
+            sa.ForeignKey("RawEntities.id"),
+            primary_key=True,
+        ),
+        sa.Column("link_description", sa.String),
+        *audit_columns(),
+    ],
+    "changelogs": lambda: [
+        id_column(),
+        sa.Column("modified_datetime", sa.DateTime),
+        sa.Column("previous_object_json", sa.String),
+        sa.Column("revised_object_json", sa.String),
+        sa.Column("entity_name", sa.String),
+        sa.Column("entity_id", sa.Integer),
+    ],
+    "message_queue": lambda: [
+        id_column(),
+        sa.Column("message_kind", sa.String, nullable=False),
+        sa.Column("message_type", sa.String, nullable=False),
+        sa.Column("payload_json", sa.String, nullable=False),
+        sa.Column("status", sa.String, nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("enqueued_at", sa.Float, nullable=False),
+        sa.Column("available_at", sa.Float, nullable=False),
+        sa.Column("leased_by", sa.String),
+        sa.Column("leased_until", sa.Float),
+        sa.Column("last_error", sa.String),
+    ],
+}
+
+# (index name, table, columns, unique)
+INDEXES = [
+    ("uq_documents_filepath_version", "Documents", ["filepath", "version"], True),
+    ("ix_documents_filename", "Documents", ["filename"], False),
+    ("ix_documents_previous_version_id", "Documents", ["previous_version_id"], False),
+    ("uq_stakeholders_stakeholder_name", "Stakeholders", ["stakeholder_name"], True),
+    ("uq_entities_entity_name", "Entities", ["entity_name"], True),
+    ("ix_comments_document_id", "Comments", ["document_id"], False),
+    ("ix_rawtopics_document_id", "RawTopics", ["document_id"], False),
+    ("ix_rawentities_document_id", "RawEntities", ["document_id"], False),
+    ("ix_documenttopics_topic_id", "DocumentTopics", ["topic_id"], False),
+    ("ix_topicsrawtopics_raw_topic_id", "TopicsRawTopics", ["raw_topic_id"], False),
+    ("ix_documententities_entity_id", "DocumentEntities", ["entity_id"], False),
+    (
+        "ix_entitiesrawentities_raw_entity_id",
+        "EntitiesRawEntities",
+        ["raw_entity_id"],
+        False,
+    ),
+    ("ix_changelogs_entity", "changelogs", ["entity_name", "entity_id"], False),
+    (
+        "ix_message_queue_status_available",
+        "message_queue",
+        ["status", "available_at"],
+        False,
+    ),
+]
+
+
+def add_missing_columns(inspector, table_name, columns):
+    existing = {c["name"] for c in inspector.get_columns(table_name)}
+    for column in columns:
+        if column.name in existing:
+            continue
+        if column.primary_key:
+            raise RuntimeError(
+                f"{table_name} is missing primary key column {column.name}; "
+                "it cannot be migrated in place."
+            )
+        # Existing rows need a value, so only columns with a server default
+        # can be added as NOT NULL.
+        column.nullable = column.nullable or column.server_default is None
+        # Foreign keys cannot be added by ALTER TABLE on SQLite
+        column.foreign_keys = set()
+        column.constraints = set()
+        op.add_column(table_name, column)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = set(inspector.get_table_names())
+
+    for table_name, columns in TABLES.items():
+        if table_name in existing_tables:
+            add_missing_columns(inspector, table_name, columns())
+        else:
+            op.create_table(table_name, *columns())
+
+    inspector = sa.inspect(op.get_bind())
+    for index_name, table_name, columns, unique in INDEXES:
+        existing_indexes = {i["name"] for i in inspector.get_indexes(table_name)}
+        if index_name not in existing_indexes:
+            op.create_index(index_name, table_name, columns, unique=unique)
+
+
+def downgrade():
+    # The baseline also adopts databases that pre-date migrations, and which
+    # tables and columns it added to those is not recorded, so nothing is
+    # dropped: the database keeps the baseline schema, only unversioned.
+    logger.warning(
+        "Not downgrading below the baseline schema (0001); its tables are kept."
+    )
@@ -0,0 +1,44 @@
+"""Full-text search index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-27
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from core.adapters import search
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "search_paragraphs",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("kind", sa.String, nullable=False),
+        sa.Column("ref_id", sa.Integer, nullable=False),
+        sa.Column("document_id", sa.Integer),
+        sa.Column("field", sa.String, nullable=False),
+        sa.Column("position", sa.Integer, nullable=False),
+        sa.Column("title", sa.String),
+        sa.Column("body", sa.String, nullable=False),
+    )
+    op.create_index("ix_search_paragraphs_ref", "search_paragraphs", ["kind", "ref_id"])
+
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for statement in search.FTS_DDL:
+            op.execute(statement)
+    search.rebuild(bind)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute(f"DROP TABLE IF EXISTS {search.FTS_TABLE}")
+    op.drop_index("ix_search_paragraphs_ref", "search_paragraphs")
+    op.drop_table("search_paragraphs")
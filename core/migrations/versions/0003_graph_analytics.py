@@ -0,0 +1,63 @@
+"""Graph analytics results
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-29
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "graph_node_metrics",
+        sa.Column("node_type", sa.String, primary_key=True),
+        sa.Column("node_id", sa.Integer, primary_key=True),
+        sa.Column("degree", sa.Integer, nullable=False),
+        sa.Column("weighted_degree", sa.Float, nullable=False),
+        sa.Column("pagerank", sa.Float, nullable=False),
+        sa.Column("component", sa.Integer, nullable=False),
+        sa.Column("computed_at", sa.DateTime),
+    )
+    op.create_index(
+        "ix_graph_node_metrics_pagerank",
+        "graph_node_metrics",
+        ["node_type", "pagerank"],
+    )
+    op.create_table(
+        "entity_cooccurrences",
+        sa.Column(
+            "entity_id", sa.Integer, sa.ForeignKey("Entities.id"), primary_key=True
+        ),
+        sa.Column(
+            "other_entity_id",
+            sa.Integer,
+            sa.ForeignKey("Entities.id"),
+            primary_key=True,
+        ),
+        sa.Column("document_count", sa.Integer, nullable=False),
+    )
+    op.create_index(
+        "ix_entity_cooccurrences_other_entity_id",
+        "entity_cooccurrences",
+        ["other_entity_id"],
+    )
+    op.create_table(
+        "graph_analytics_links",
+        sa.Column("document_id", sa.Integer, primary_key=True),
+        sa.Column("entity_id", sa.Integer, primary_key=True),
+    )
+
+
+def downgrade():
+    op.drop_table("graph_analytics_links")
+    op.drop_index("ix_entity_cooccurrences_other_entity_id", "entity_cooccurrences")
+    op.drop_table("entity_cooccurrences")
+    op.drop_index("ix_graph_node_metrics_pagerank", "graph_node_metrics")
+    op.drop_table("graph_node_metrics")
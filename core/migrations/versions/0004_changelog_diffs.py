@@ -0,0 +1,82 @@
+"""Changelog entries store changed fields only
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-02-05
+"""
+
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+changelogs = sa.table(
+    "changelogs",
+    sa.column("id", sa.Integer),
+    sa.column("previous_object_json", sa.String),
+    sa.column("revised_object_json", sa.String),
+    sa.column("changes_json", sa.String),
+)
+
+
+def diff(previous, revised):
+    # As core.adapters.changelog.diff at the time of this migration
+    changes = {}
+    for field in sorted(previous.keys() | revised.keys()):
+        old, new = previous.get(field), revised.get(field)
+        if isinstance(old, list) or isinstance(new, list):
+            continue
+        # Updates never write these; snapshots taken from whole update
+        # commands show their defaults instead of the stored values
+        if field in ("created_at", "created_by"):
+            continue
+        if old != new:
+            changes[field] = [old, new]
+    return changes
+
+
+def upgrade():
+    op.add_column("changelogs", sa.Column("changes_json", sa.String))
+
+    # Replace the full snapshots of existing entries with their differences
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(changelogs)
+            .where(changelogs.c.id > last_id, changelogs.c.changes_json.is_(None))
+            .order_by(changelogs.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            changes = diff(
+                json.loads(row.previous_object_json or "{}"),
+                json.loads(row.revised_object_json or "{}"),
+            )
+            conn.execute(
+                changelogs.update()
+                .where(changelogs.c.id == row.id)
+                .values(
+                    changes_json=json.dumps(changes),
+                    previous_object_json=None,
+                    revised_object_json=None,
+                )
+            )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    # Lossy: the snapshots that upgrade() replaced with differences were
+    # nulled and cannot be restored, and entries written since only ever had
+    # differences. Dropping changes_json leaves all of them empty.
+    with op.batch_alter_table("changelogs") as batch:
+        batch.drop_column("changes_json")
@@ -0,0 +1,29 @@
+"""Index changelog entries by object and time
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-02-07
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Point-in-time queries find an object's entries on either side of a time;
+    # the new index also serves lookups by object, which the old one did.
+    op.create_index(
+        "ix_changelogs_entity_time",
+        "changelogs",
+        ["entity_name", "entity_id", "modified_datetime"],
+    )
+    op.drop_index("ix_changelogs_entity", "changelogs")
+
+
+def downgrade():
+    op.create_index("ix_changelogs_entity", "changelogs", ["entity_name", "entity_id"])
+    op.drop_index("ix_changelogs_entity_time", "changelogs")
@@ -0,0 +1,61 @@
+"""Index document versions by their first version
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-02-10
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+documents = sa.table(
+    "Documents",
+    sa.column("id", sa.Integer),
+    sa.column("previous_version_id", sa.Integer),
+    sa.column("root_document_id", sa.Integer),
+)
+
+
+def upgrade():
+    op.add_column("Documents", sa.Column("root_document_id", sa.Integer))
+
+    # First versions are their own root; each later version takes its
+    # predecessor's, one step along every chain per statement.
+    conn = op.get_bind()
+    conn.execute(
+        documents.update()
+        .where(documents.c.previous_version_id.is_(None))
+        .values(root_document_id=documents.c.id)
+    )
+    previous = documents.alias("previous")
+    root_of_previous = (
+        sa.select(previous.c.root_document_id)
+        .where(previous.c.id == documents.c.previous_version_id)
+        .scalar_subquery()
+    )
+    while True:
+        result = conn.execute(
+            documents.update()
+            .where(
+                documents.c.root_document_id.is_(None),
+                root_of_previous.is_not(None),
+            )
+            .values(root_document_id=root_of_previous)
+        )
+        if not result.rowcount:
+            break
+
+    op.create_index(
+        "ix_documents_root_version", "Documents", ["root_document_id", "version"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_documents_root_version", "Documents")
+    with op.batch_alter_table("Documents") as batch:
+        batch.drop_column("root_document_id")
@@ -0,0 +1,30 @@
+"""Track the files ingested by the directory watcher
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-02-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "file_state",
+        sa.Column("path", sa.String, primary_key=True),
+        sa.Column("size", sa.BigInteger, nullable=False),
+        sa.Column("mtime_ns", sa.BigInteger, nullable=False),
+        sa.Column("sha256", sa.String, nullable=False),
+        sa.Column("ingested_at", sa.DateTime),
+        sa.Column("last_error", sa.String),
+    )
+
+
+def downgrade():
+    op.drop_table("file_state")
@@ -0,0 +1,106 @@
+"""Drop creation fields from changelog entries
+
+Updates that passed whole command objects logged the commands' default
+created_at/created_by as changes and stored them in snapshots, although the
+rows kept their values. Changes to them are removed, and snapshots take them
+from the row where it still exists.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-02-17
+"""
+
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+CREATION_FIELDS = ("created_at", "created_by")
+
+changelogs = sa.table(
+    "changelogs",
+    sa.column("id", sa.Integer),
+    sa.column("entity_name", sa.String),
+    sa.column("entity_id", sa.Integer),
+    sa.column("revised_object_json", sa.String),
+    sa.column("changes_json", sa.String),
+)
+
+# Changelog entity name: table of its rows
+ENTITY_TABLES = {
+    name: sa.table(
+        table_name,
+        sa.column("id", sa.Integer),
+        sa.column("created_at", sa.DateTime),
+        sa.column("created_by", sa.String),
+    )
+    for name, table_name in (
+        ("Document", "Documents"),
+        ("Topic", "Topics"),
+        ("Entity", "Entities"),
+        ("Stakeholder", "Stakeholders"),
+    )
+}
+
+
+def stored_creation_fields(conn, entity_name, entity_id):
+    table = ENTITY_TABLES.get(entity_name)
+    if table is None:
+        return None
+    row = conn.execute(
+        sa.select(table.c.created_at, table.c.created_by).where(table.c.id == entity_id)
+    ).first()
+    if row is None:
+        return None
+    created_at = row.created_at.isoformat() if row.created_at else None
+    return {"created_at": created_at, "created_by": row.created_by}
+
+
+def upgrade():
+    conn = op.get_bind()
+    affected = sa.or_(
+        changelogs.c.changes_json.like('%"created\\_%', escape="\\"),
+        changelogs.c.revised_object_json.is_not(None),
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(changelogs)
+            .where(changelogs.c.id > last_id, affected)
+            .order_by(changelogs.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            values = {}
+            changes = json.loads(row.changes_json or "{}")
+            if any(field in changes for field in CREATION_FIELDS):
+                for field in CREATION_FIELDS:
+                    changes.pop(field, None)
+                values["changes_json"] = json.dumps(changes)
+            # Entries without changes_json are pre-0004 snapshots, diffed on read
+            if row.revised_object_json is not None and row.changes_json is not None:
+                stored = stored_creation_fields(conn, row.entity_name, row.entity_id)
+                if stored is not None:
+                    state = json.loads(row.revised_object_json)
+                    state.update(stored)
+                    values["revised_object_json"] = json.dumps(state)
+            if values:
+                conn.execute(
+                    changelogs.update()
+                    .where(changelogs.c.id == row.id)
+                    .values(**values)
+                )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    # The removed values were never the stored ones, so nothing is restored.
+    pass
@@ -0,0 +1,23 @@
+"""Record the event handlers that finished on a queued message
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-02-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("message_queue", sa.Column("handled_by", sa.String))
+
+
+def downgrade():
+    with op.batch_alter_table("message_queue") as batch:
+        batch.drop_column("handled_by")
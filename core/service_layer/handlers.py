@@ -9,15 +9,19 @@ from core.domain.model import (
     Stakeholder,
     Topic,
 )
+import core.config as config
 import core.domain.error_messages
 import core.service_layer.unit_of_work as uow
+from core.service_layer import incremental_analysis
 from core.adapters.llm_connectors import (
     DocumentAnalysisResponse,
     CanonicalEntityResponse,
     AbstractConnector,
+    AbstractEmbeddingConnector,
 )
 import json
 from dataclasses import asdict
+from datetime import datetime, timezone
 
 
 def add_new_document(
@@ -26,15 +30,13 @@ def add_new_document(
 ) -> Document:
     with uow:
         try:
-            sorted_documents = sorted(
-                uow.documents.list(), key=lambda d: d.version, reverse=True
-            )
-            existing_doc = next(
-                (d for d in sorted_documents if d.filepath == cmd.filepath), None
+            existing_doc = uow.documents.latest_versions([cmd.filepath]).get(
+                cmd.filepath
             )
             if existing_doc is not None:
                 cmd.version = existing_doc.version + 1
                 cmd.previous_version_id = existing_doc.id
+                cmd.root_document_id = existing_doc.root_document_id or existing_doc.id
 
             new_doc = uow.documents.add(cmd)
 
@@ -74,6 +76,42 @@ def add_document_comments(
                 uow.commit()
 
 
+def analyse_new_version(
+    doc: Document,
+    uow: uow.AbstractUnitOfWork,
+    document_analysis_connector: AbstractConnector,
+):
+    """Raw entities, raw topics and summary for a new version of a processed
+    document, analysing only its changed paragraphs; None when the whole text
+    needs analysing."""
+    if doc.previous_version_id is None:
+        return None
+    previous: Document = uow.documents.get(reference=doc.previous_version_id)
+    previous_entities = uow.raw_entities.for_document(previous.id)
+    previous_topics = uow.raw_topics.for_document(previous.id)
+    if not (previous_entities or previous_topics):
+        return None  # Never analysed, so there is nothing to reuse
+
+    changes = incremental_analysis.diff_paragraphs(previous.text, doc.text)
+    if not incremental_analysis.use_incremental(changes):
+        return None
+
+    found_entities, found_topics = [], []
+    if changes.added:
+        response: DocumentAnalysisResponse = document_analysis_connector.generate(
+            document_text="\n\n".join(changes.added)
+        )
+        found_entities = incremental_analysis.raw_entities_from_response(response)
+        found_topics = incremental_analysis.raw_topics_from_response(response)
+    return (
+        incremental_analysis.merge_entities(
+            previous_entities, found_entities, changes, doc.text
+        ),
+        incremental_analysis.merge_topics(previous_topics, found_topics),
+        previous.summary or "",
+    )
+
+
 def get_document_topics_entities_and_summary(
     event: events.DocumentCreated,
     uow: uow.AbstractUnitOfWork,
@@ -83,44 +121,31 @@ def get_document_topics_entities_and_summary(
         try:
             doc: Document = uow.documents.get(reference=event.document_id)
 
-            response: DocumentAnalysisResponse = document_analysis_connector.generate(
-                document_text=doc.text
+            analysis = analyse_new_version(doc, uow, document_analysis_connector)
+            if analysis is not None:
+                entities, topics, summary = analysis
+            else:
+                response: DocumentAnalysisResponse = (
+                    document_analysis_connector.generate(document_text=doc.text)
+                )
+                entities = incremental_analysis.raw_entities_from_response(response)
+                topics = incremental_analysis.raw_topics_from_response(response)
+                summary = response["document_analysis"]["summary"]
+
+            # Raw items are attributed to whoever last changed the document
+            audit = dict(
+                document_id=doc.id,
+                created_by=doc.last_modified_by,
+                last_modified_by=doc.last_modified_by,
+                last_modified_at=datetime.now(tz=timezone.utc),
             )
-
-            entities = response["document_analysis"]["entities"]
-            topics = response["document_analysis"]["topics"]
-
             for entity in entities:
-                uow.raw_entities.add(
-                    dict(
-                        document_id=doc.id,
-                        entity_name=entity["name"],
-                        entity_description=entity["description"],
-                        entity_prevalence=entity["prevalence"],
-                    )
-                )
+                uow.raw_entities.add(dict(audit, **entity))
 
             for topic in topics:
-                uow.raw_topics.add(
-                    dict(
-                        document_id=doc.id,
-                        topic_name=topic["name"],
-                        topic_description=topic["description"],
-                        topic_prevalence=topic["prevalence"],
-                    )
-                )
-                if topic["subtopics"]:
-                    for subtopic in topic["subtopics"]:
-                        uow.raw_topics.add(
-                            dict(
-                                document_id=doc.id,
-                                topic_name=subtopic["name"],
-                                topic_description=subtopic["description"],
-                                topic_prevalence=subtopic["prevalence"],
-                            )
-                        )
-
-            doc.summary = response["document_analysis"]["summary"]
+                uow.raw_topics.add(dict(audit, **topic))
+
+            doc.summary = summary
             uow.documents.update(updated_obj=doc, fields=["summary"])
 
             doc.events.append(events.DocumentProcessed(document_id=doc.id))
@@ -224,7 +249,12 @@ def process_reviewed_entity(reviewed_canon_entity, uow):
             link_raw_entities(
                 new_entity.id, reviewed_canon_entity["raw_entity_ids"], uow
             )
-            link_document_entities(new_entity.id, uow)
+            document_ids = link_document_entities(new_entity.id, uow)
+            new_entity.events.append(
+                events.DocumentEntitiesLinked(
+                    entity_id=new_entity.id, document_ids=document_ids
+                )
+            )
     except Exception as e:
         raise core.domain.error_messages.EntityProcessingError(
             f"Error processing reviewed entity: {e}"
@@ -321,12 +351,15 @@ def link_raw_entities(entity_id, raw_entity_ids, uow):
 def link_document_entities(entity_id, uow):
     try:
         linked_raw_entities = uow.entities.get_raw_entities(entity_id)
+        document_ids = []
         for linked_raw_entity in linked_raw_entities:
             doc_id = linked_raw_entity.raw_entity.document_id
             new_document_entity_link = DocumentEntity(
                 document_id=doc_id, entity_id=entity_id, link_description=""
             )
             uow.entities.add_document_entity(new_document_entity_link)
+            document_ids.append(doc_id)
+        return document_ids
     except Exception as e:
         raise core.domain.error_messages.EntityProcessingError(
             f"Error linking document entities: {e}"
@@ -467,6 +500,114 @@ def delete_stakeholder(cmd: commands.DeleteStakeholder, uow: uow.AbstractUnitOfW
             uow.commit()
 
 
+EMBEDDING_BATCH_SIZE = 32
+
+
+def document_embedding_text(document: Document) -> str:
+    parts = [document.summary, document.text[: config.EMBEDDING_MAX_CHARS]]
+    return "\n".join(part for part in parts if part)
+
+
+def entity_embedding_text(entity: Entity) -> str:
+    return f"{entity.entity_name}: {entity.entity_description}"
+
+
+def embed_in_batches(objects, to_text, embedding_connector, vector_store):
+    for start in range(0, len(objects), EMBEDDING_BATCH_SIZE):
+        batch = objects[start : start + EMBEDDING_BATCH_SIZE]
+        vectors = embedding_connector.generate(texts=[to_text(o) for o in batch])
+        vector_store.upsert([o.id for o in batch], vectors)
+
+
+def embed_documents(
+    cmd: commands.EmbedDocuments,
+    uow: uow.AbstractUnitOfWork,
+    embedding_connector: AbstractEmbeddingConnector = None,
+    embedding_store=None,
+):
+    if embedding_connector is None or embedding_store is None:
+        return
+    with uow:
+        try:
+            if cmd.document_ids is None:
+                documents = uow.documents.list()
+            else:
+                documents = [uow.documents.get(reference=i) for i in cmd.document_ids]
+            embed_in_batches(
+                documents,
+                document_embedding_text,
+                embedding_connector,
+                embedding_store.documents,
+            )
+        except Exception as e:
+            print("Error occurred embedding documents.")
+            print(e)
+
+
+def embed_processed_document(
+    event: events.DocumentProcessed,
+    uow: uow.AbstractUnitOfWork,
+    embedding_connector: AbstractEmbeddingConnector = None,
+    embedding_store=None,
+):
+    embed_documents(
+        commands.EmbedDocuments(document_ids=[event.document_id]),
+        uow,
+        embedding_connector,
+        embedding_store,
+    )
+
+
+def embed_entities(
+    cmd: commands.EmbedEntities,
+    uow: uow.AbstractUnitOfWork,
+    embedding_connector: AbstractEmbeddingConnector = None,
+    embedding_store=None,
+):
+    if embedding_connector is None or embedding_store is None:
+        return
+    with uow:
+        try:
+            if cmd.entity_ids is None:
+                entities = uow.entities.list()
+            else:
+                entities = [uow.entities.get(reference=i) for i in cmd.entity_ids]
+            embed_in_batches(
+                [e for e in entities if e is not None],
+                entity_embedding_text,
+                embedding_connector,
+                embedding_store.entities,
+            )
+        except Exception as e:
+            print("Error occurred embedding entities.")
+            print(e)
+
+
+def refresh_graph_analytics(
+    cmd: commands.RefreshGraphAnalytics, uow: uow.AbstractUnitOfWork
+):
+    # Imported here so numpy is only loaded by processes that run analytics
+    from core.graphs import analytics
+
+    with uow:
+        try:
+            summary = analytics.refresh(uow.session, full=cmd.full)
+            print(f"Refreshed graph analytics: {summary}")
+        except Exception as e:
+            print("Error occurred refreshing graph analytics.")
+            print(e)
+            uow.rollback()
+        finally:
+            uow.commit()
+
+
+def refresh_linked_graph_analytics(
+    event: events.DocumentEntitiesLinked, uow: uow.AbstractUnitOfWork
+):
+    # Picks up every uncounted link, so later events in a batch find none
+    refresh_graph_analytics(commands.RefreshGraphAnalytics(), uow)
+
+
 EVENT_HANDLERS = {
     events.DocumentCreated: [
         ("add_document_comments", add_document_comments),
@@ -477,10 +618,16 @@ EVENT_HANDLERS = {
         ("log_document_creation", log_document_creation),
     ],
     events.CommentCreated: [],
-    events.DocumentProcessed: [("log_document_processed", log_document_processed)],
+    events.DocumentProcessed: [
+        ("log_document_processed", log_document_processed),
+        ("embed_processed_document", embed_processed_document),
+    ],
     events.ExistingCanonicalEntityHallucination: [
         ("log_hallucination", log_hallucination)
     ],
+    events.DocumentEntitiesLinked: [
+        ("refresh_linked_graph_analytics", refresh_linked_graph_analytics)
+    ],
 }
 
 COMMAND_HANDLERS = {
@@ -501,4 +648,10 @@ COMMAND_HANDLERS = {
     commands.UpdateTopic: ("update_topic", update_topic),
     commands.DeleteTopic: ("delete_topic", delete_topic),
     commands.DeleteStakeholder: ("delete_stakeholder", delete_stakeholder),
+    commands.EmbedDocuments: ("embed_documents", embed_documents),
+    commands.EmbedEntities: ("embed_entities", embed_entities),
+    commands.RefreshGraphAnalytics: (
+        "refresh_graph_analytics",
+        refresh_graph_analytics,
+    ),
 }
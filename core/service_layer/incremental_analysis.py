@@ -0,0 +1,125 @@
+"""Analysis of a new document version from the paragraphs that changed.
+
+The previous version's text and the new one are compared paragraph by
+paragraph. When the added and removed paragraphs are at most
+``INCREMENTAL_ANALYSIS_MAX_CHANGE`` of the longer of the two texts, only the
+added or rewritten paragraphs are sent for analysis; larger edits, including
+large deletions, are analysed in full. The result is merged with the previous version's raw topics
+and entities:
+
+- Previous raw entities are kept unless their name only occurred in removed
+  paragraphs.
+- Previous raw topics are kept.
+- Entities and topics found in the changed paragraphs are added when their name
+  is new, and otherwise raise the prevalence of the one already kept.
+
+The previous summary is carried over, since the changed paragraphs alone cannot
+summarise the document.
+"""
+
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import core.config as config
+from core.domain.model import RawEntity, RawTopic
+
+
+@dataclass
+class ParagraphDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # Characters in added and removed paragraphs over characters in the longer
+    # text, at most 1
+    changed_share: float = 0.0
+
+
+def paragraphs(text: Optional[str]) -> List[str]:
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
+
+
+def diff_paragraphs(previous_text: Optional[str], text: Optional[str]) -> ParagraphDiff:
+    old, new = paragraphs(previous_text), paragraphs(text)
+    result = ParagraphDiff()
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        result.removed.extend(old[old_start:old_end])
+        result.added.extend(new[new_start:new_end])
+    changed = sum(map(len, result.added)) + sum(map(len, result.removed))
+    total = max(sum(map(len, old)), sum(map(len, new)))
+    result.changed_share = min(changed / total, 1.0) if total else 0.0
+    return result
+
+
+def use_incremental(changes: ParagraphDiff) -> bool:
+    max_change = config.INCREMENTAL_ANALYSIS_MAX_CHANGE
+    return max_change > 0 and changes.changed_share <= max_change
+
+
+def raw_entities_from_response(response) -> List[dict]:
+    return [
+        dict(
+            entity_name=entity["name"],
+            entity_description=entity["description"],
+            entity_prevalence=entity["prevalence"],
+        )
+        for entity in response["document_analysis"]["entities"]
+    ]
+
+
+def raw_topics_from_response(response) -> List[dict]:
+    topics = []
+    for topic in response["document_analysis"]["topics"]:
+        for item in [topic] + (topic.get("subtopics") or []):
+            topics.append(
+                dict(
+                    topic_name=item["name"],
+                    topic_description=item["description"],
+                    topic_prevalence=item["prevalence"],
+                )
+            )
+    return topics
+
+
+def merge(kept: Dict[str, dict], found: List[dict], name: str, prevalence: str):
+    for item in found:
+        existing = kept.get(item[name].lower())
+        if existing is None:
+            kept[item[name].lower()] = item
+        else:
+            existing[prevalence] = max(existing[prevalence] or 0, item[prevalence] or 0)
+    return list(kept.values())
+
+
+def merge_entities(
+    previous: List[RawEntity], found: List[dict], changes: ParagraphDiff, text: str
+) -> List[dict]:
+    removed_text = "\n".join(changes.removed)
+    kept = {}
+    for entity in previous:
+        name = entity.entity_name.lower()
+        # Whole words only, so "AI" is not found in "said"
+        mentioned = re.compile(rf"(?<!\w){re.escape(entity.entity_name)}(?!\w)", re.I)
+        if mentioned.search(removed_text) and not mentioned.search(text or ""):
+            continue
+        kept[name] = dict(
+            entity_name=entity.entity_name,
+            entity_description=entity.entity_description,
+            entity_prevalence=entity.entity_prevalence,
+        )
+    return merge(kept, found, "entity_name", "entity_prevalence")
+
+
+def merge_topics(previous: List[RawTopic], found: List[dict]) -> List[dict]:
+    kept = {
+        topic.topic_name.lower(): dict(
+            topic_name=topic.topic_name,
+            topic_description=topic.topic_description,
+            topic_prevalence=topic.topic_prevalence,
+        )
+        for topic in previous
+    }
+    return merge(kept, found, "topic_name", "topic_prevalence")
@@ -1,13 +1,16 @@
+import contextvars
 import threading
 import core.domain.events as events
 import core.domain.commands as commands
 import core.service_layer.unit_of_work as unit_of_work
+from core.service_layer.metrics import BusMetrics, BUS_METRICS
+from core import tracing
 
 import logging
 import json
 from datetime import datetime, timezone
-from dataclasses import asdict
-from typing import Union, List, Dict, Type, Callable, Tuple
+from dataclasses import asdict, dataclass
+from typing import Union, List, Dict, Type, Callable, Optional, Tuple, Iterable
 from tenacity import Retrying, RetryError, stop_after_attempt, wait_exponential
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,18 @@ logger = logging.getLogger(__name__)
 Message = Union[commands.Command, events.Event]
 
 
+@dataclass
+class HandlerFailure:
+    """An event handler that gave up after its retries."""
+
+    message: Message
+    handler_name: str
+    error: str
+
+    def __str__(self):
+        return f"{self.handler_name} on {self.message.__class__.__name__}: {self.error}"
+
+
 class MessageBus:
     def __init__(
         self,
@@ -22,17 +37,23 @@ class MessageBus:
         event_handlers: Dict[Type[events.Event], List[Tuple[str, Callable]]],
         command_handlers: Dict[Type[commands.Command], Tuple[str, Callable]],
         log_file: str = "message_bus_log.json",
+        metrics: BusMetrics = BUS_METRICS,
+        observers: List[Callable[[Message], None]] = (),
+        dispatch: Optional[Callable[[Message], object]] = None,
     ):
         self.uow = uow
         self.event_handlers = event_handlers
         self.command_handlers = command_handlers
         self.log_file = log_file
         self.queue = []
-        self.metrics = {
-            "queue_length": 0,
-            "processed_messages": 0,
-            "failed_messages": 0,
-        }
+        self.metrics = metrics
+        # Called with every message once its handlers have run, e.g. to
+        # invalidate caches of the data the message changed.
+        self.observers = list(observers)
+        # Where the events raised by handlers go, e.g. a persistent queue's put
+        # so that other workers handle them; by default they are handled here.
+        self.dispatch = dispatch
+        self.retry_wait = wait_exponential()
 
     def log_message(
         self, message: Message, handler_name: str, status: str, error: str = None
@@ -49,65 +70,117 @@ class MessageBus:
         try:
             with open(self.log_file, "a") as f:
                 f.write(json.dumps(log_entry) + "\n")
-                f.write(json.dumps(self.metrics) + "\n")
+                f.write(json.dumps(self.metrics.totals()) + "\n")
             logger.info(f"Logged message: {log_entry}")
         except Exception as e:
             logger.error("Failed to write log entry: %s", e)
 
-    def handle(self, message: Message):
+    def handle(
+        self, message: Message, skip: Iterable[str] = ()
+    ) -> List[HandlerFailure]:
+        """Handles the message and the events it raises, returning the event
+        handlers that failed. Command handler failures are raised. The event
+        handlers named in ``skip`` are not run for ``message`` itself, e.g.
+        those that finished on an earlier attempt."""
+        failures = []
+        first, skip = message, set(skip)
         self.queue.append(message)
-        self.metrics["queue_length"] = len(self.queue)
-        logger.info(f"Queue length: {self.metrics['queue_length']}")
+        self.metrics.set_queue_length(len(self.queue))
+        logger.info(f"Queue length: {len(self.queue)}")
 
         while self.queue:
             message = self.queue.pop(0)
-            self.metrics["queue_length"] = len(self.queue)
+            self.metrics.set_queue_length(len(self.queue))
             logger.info(
-                f"Processing message: {message.__class__.__name__}, Queue length: {self.metrics['queue_length']}"
+                f"Processing message: {message.__class__.__name__}, Queue length: {len(self.queue)}"
             )
-            if isinstance(message, events.Event):
-                print("Is an event")
-                self.handle_event(message)
-            elif isinstance(message, commands.Command):
-                print("Is a command.")
-                self.handle_command(message)
-            else:
-                print(type(message))
-                raise Exception(
-                    f"{message.__class__.__name__} was not an Event or Command"
-                )
-
-    def handle_event(self, event: events.Event):
+            try:
+                if isinstance(message, events.Event):
+                    print("Is an event")
+                    failures.extend(
+                        self.handle_event(message, skip if message is first else ())
+                    )
+                elif isinstance(message, commands.Command):
+                    print("Is a command.")
+                    self.handle_command(message)
+                else:
+                    print(type(message))
+                    raise Exception(
+                        f"{message.__class__.__name__} was not an Event or Command"
+                    )
+            finally:
+                # Handlers commit even when they fail part way
+                self.notify_observers(message)
+        return failures
+
+    def collect_new_events(self):
+        new_events = self.uow.collect_new_events()
+        if self.dispatch is None:
+            self.queue.extend(new_events)
+        else:
+            for event in new_events:
+                self.dispatch(event)
+
+    def notify_observers(self, message: Message):
+        for observer in self.observers:
+            try:
+                observer(message)
+            except Exception:
+                logger.exception("Observer %s failed for %s", observer, message)
+
+    def handle_event(
+        self, event: events.Event, skip: Iterable[str] = ()
+    ) -> List[HandlerFailure]:
         threads = []
+        failures = []
+
+        def run(handler_name, handler):
+            failure = self._handle_event_with_retry(event, handler_name, handler)
+            if failure is not None:
+                failures.append(failure)
+
         for handler_name, handler in self.event_handlers[type(event)]:
+            if handler_name in skip:
+                continue
+            # Run each handler in a copy of the current context so spans opened
+            # on the handler thread join the trace of the message being handled.
             thread = threading.Thread(
-                target=self._handle_event_with_retry,
-                args=(event, handler_name, handler),
+                target=contextvars.copy_context().run,
+                args=(run, handler_name, handler),
             )
             thread.start()
             threads.append(thread)
 
         for thread in threads:
             thread.join()
+        return failures
 
     def _handle_event_with_retry(
         self, event: events.Event, handler_name: str, handler: Callable
-    ):
+    ) -> Optional[HandlerFailure]:
+        event_type = event.__class__.__name__
         try:
             for attempt in Retrying(
-                stop=stop_after_attempt(3), wait=wait_exponential()
+                stop=stop_after_attempt(3), wait=self.retry_wait
             ):
                 with attempt:
+                    if attempt.retry_state.attempt_number > 1:
+                        self.metrics.record_retry(event_type, handler_name)
                     logger.debug(
-                        f"Handling event {event.__class__.__name__} with handler {handler_name}"
+                        f"Handling event {event_type} with handler {handler_name}"
                     )
-                    handler(event)
-                    self.queue.extend(self.uow.collect_new_events())
+                    with tracing.span(
+                        f"event:{event_type}",
+                        handler=handler_name,
+                        attempt=attempt.retry_state.attempt_number,
+                    ), self.metrics.track(event_type, handler_name):
+                        handler(event)
+                    self.collect_new_events()
                     logger.info(
-                        f"Event {event.__class__.__name__} handled successfully with {handler_name}."
+                        f"Event {event_type} handled successfully with {handler_name}."
                     )
                     self.log_message(event, handler_name, "success")
-                    self.metrics["processed_messages"] += 1
+                    self.metrics.record_success(event_type, handler_name)
         except RetryError as retry_failure:
             logger.error(
                 "Failed to handle %s event with handler %s %s times, giving up!",
@@ -116,19 +189,28 @@ class MessageBus:
                 retry_failure.last_attempt.attempt_number,
             )
             self.log_message(event, handler_name, "failure", str(retry_failure))
-            self.metrics["failed_messages"] += 1
+            self.metrics.record_failure(event_type, handler_name)
+            return HandlerFailure(
+                event, handler_name, repr(retry_failure.last_attempt.exception())
+            )
+        return None
 
     def handle_command(self, command: commands.Command):
-        logger.debug("Handling command %s", command.__class__.__name__)
+        command_type = command.__class__.__name__
+        logger.debug("Handling command %s", command_type)
+        handler_name = None
         try:
             handler_name, handler = self.command_handlers[type(command)]
             logger.debug(
-                f"Handling command {command.__class__.__name__} with command handler: {handler_name}."
+                f"Handling command {command_type} with command handler: {handler_name}."
             )
-            handler(command)
-            self.queue.extend(self.uow.collect_new_events())
+            with tracing.span(
+                f"command:{command_type}", handler=handler_name
+            ), self.metrics.track(command_type, handler_name):
+                handler(command)
+            self.collect_new_events()
             self.log_message(command, handler_name, "success")
-            self.metrics["processed_messages"] += 1
+            self.metrics.record_success(command_type, handler_name)
         except Exception as e:
             logger.exception(
                 "Exception handling command %s with command handler %s",
@@ -136,11 +218,11 @@ class MessageBus:
                 handler_name,
             )
             self.log_message(command, handler_name, "failure", str(e))
-            self.metrics["failed_messages"] += 1
+            self.metrics.record_failure(command_type, str(handler_name))
             raise Exception
 
     def get_metrics(self):
-        return self.metrics
+        return self.metrics.snapshot()
 
 
 # Ensure logging is configured to capture all levels
@@ -0,0 +1,262 @@
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+HandlerKey = Tuple[str, str]  # (message_type, handler_name)
+
+
+class LatencyHistogram:
+    """Cumulative bucket counts for Prometheus plus a bounded sample reservoir
+    used to report p50/p95/p99 over the most recent observations."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, reservoir_size: int = 1024):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=reservoir_size)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+        for i, upper_bound in enumerate(self.buckets):
+            if seconds <= upper_bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return math.nan
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def cumulative_buckets(self):
+        running = 0
+        for upper_bound, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            yield upper_bound, running
+
+
+class BusMetrics:
+    """Thread-safe counters, gauges and latency histograms for the message bus.
+
+    Event handlers run on their own threads, so every mutation takes the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue_length = 0
+        self.in_flight: Dict[HandlerKey, int] = defaultdict(int)
+        self.processed: Dict[HandlerKey, int] = defaultdict(int)
+        self.failed: Dict[HandlerKey, int] = defaultdict(int)
+        self.retries: Dict[HandlerKey, int] = defaultdict(int)
+        self.latency: Dict[HandlerKey, LatencyHistogram] = defaultdict(LatencyHistogram)
+
+    def set_queue_length(self, length: int):
+        with self._lock:
+            self.queue_length = length
+
+    @contextmanager
+    def track(self, message_type: str, handler_name: str):
+        """Counts the handler as in flight and records its latency."""
+        key = (message_type, handler_name)
+        with self._lock:
+            self.in_flight[key] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight[key] -= 1
+                self.latency[key].observe(elapsed)
+
+    def record_success(self, message_type: str, handler_name: str):
+        with self._lock:
+            self.processed[(message_type, handler_name)] += 1
+
+    def record_failure(self, message_type: str, handler_name: str):
+        with self._lock:
+            self.failed[(message_type, handler_name)] += 1
+
+    def record_retry(self, message_type: str, handler_name: str):
+        with self._lock:
+            self.retries[(message_type, handler_name)] += 1
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queue_length": self.queue_length,
+                "processed_messages": sum(self.processed.values()),
+                "failed_messages": sum(self.failed.values()),
+                "in_flight": sum(self.in_flight.values()),
+                "retries": sum(self.retries.values()),
+            }
+
+    def snapshot(self) -> Dict:
+        totals = self.totals()
+        with self._lock:
+            keys = sorted(
+                set(self.processed)
+                | set(self.failed)
+                | set(self.retries)
+                | set(self.latency)
+                | set(self.in_flight)
+            )
+            handlers = []
+            for message_type, handler_name in keys:
+                key = (message_type, handler_name)
+                histogram = self.latency.get(key)
+                handlers.append(
+                    {
+                        "message_type": message_type,
+                        "handler_name": handler_name,
+                        "processed": self.processed.get(key, 0),
+                        "failed": self.failed.get(key, 0),
+                        "retries": self.retries.get(key, 0),
+                        "in_flight": self.in_flight.get(key, 0),
+                        "latency_seconds": {
+                            f"p{int(q * 100)}": (
+                                histogram.quantile(q) if histogram else math.nan
+                            )
+                            for q in QUANTILES
+                        },
+                    }
+                )
+        return {**totals, "handlers": handlers}
+
+    def render_prometheus(self, prefix: str = "knowledge_worker_bus") -> str:
+        lines = []
+
+        def add_family(name, metric_type, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+
+        def add_sample(name, labels, value):
+            lines.append(f"{prefix}_{name}{_format_labels(labels)} {_format(value)}")
+
+        with self._lock:
+            add_family("queue_length", "gauge", "Messages waiting on the bus queue.")
+            add_sample("queue_length", {}, self.queue_length)
+
+            for name, metric_type, help_text, values in (
+                (
+                    "messages_processed_total",
+                    "counter",
+                    "Messages handled successfully.",
+                    self.processed,
+                ),
+                (
+                    "messages_failed_total",
+                    "counter",
+                    "Messages that failed after all attempts.",
+                    self.failed,
+                ),
+                (
+                    "handler_retries_total",
+                    "counter",
+                    "Handler attempts retried by the retry loop.",
+                    self.retries,
+                ),
+                (
+                    "handlers_in_flight",
+                    "gauge",
+                    "Handlers currently running.",
+                    self.in_flight,
+                ),
+            ):
+                add_family(name, metric_type, help_text)
+                for (message_type, handler_name), value in sorted(values.items()):
+                    add_sample(
+                        name,
+                        {"message_type": message_type, "handler": handler_name},
+                        value,
+                    )
+
+            add_family(
+                "handler_duration_seconds", "histogram", "Handler latency in seconds."
+            )
+            for (message_type, handler_name), histogram in sorted(self.latency.items()):
+                labels = {"message_type": message_type, "handler": handler_name}
+                for upper_bound, count in histogram.cumulative_buckets():
+                    add_sample(
+                        "handler_duration_seconds_bucket",
+                        {**labels, "le": _format(upper_bound)},
+                        count,
+                    )
+                add_sample(
+                    "handler_duration_seconds_bucket",
+                    {**labels, "le": "+Inf"},
+                    histogram.count,
+                )
+                add_sample("handler_duration_seconds_sum", labels, histogram.sum)
+                add_sample("handler_duration_seconds_count", labels, histogram.count)
+
+            add_family(
+                "handler_duration_quantile_seconds",
+                "gauge",
+                "Handler latency quantiles over recent observations.",
+            )
+            for (message_type, handler_name), histogram in sorted(self.latency.items()):
+                for q in QUANTILES:
+                    add_sample(
+                        "handler_duration_quantile_seconds",
+                        {
+                            "message_type": message_type,
+                            "handler": handler_name,
+                            "quantile": str(q),
+                        },
+                        histogram.quantile(q),
+                    )
+
+        return "\n".join(lines) + "\n"
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+# Buses are bootstrapped per web request, so they share one process-wide registry.
+BUS_METRICS = BusMetrics()
@@ -0,0 +1,207 @@
+"""In-process LRU/TTL cache for the read models in core.views.
+
+Entries are keyed by view, database and arguments, and tagged with the kinds
+of data the view reads. The message bus passes every handled message to
+``ReadModelCache.observe``, which drops the entries tagged with what the
+message changes; messages it does not know about clear the whole cache. Writes
+made by other processes (the queue workers) are picked up when entries expire
+after ``READ_CACHE_TTL_SECONDS``.
+
+Cached results are shared between requests and must not be mutated.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Iterable, Tuple
+
+import core.config as config
+import core.database
+import core.domain.commands as commands
+import core.domain.events as events
+from core.service_layer import unit_of_work
+from core.service_layer.metrics import _format, _format_labels
+
+DOCUMENTS = "documents"
+TOPICS = "topics"
+ENTITIES = "entities"
+STAKEHOLDERS = "stakeholders"
+ANALYTICS = "analytics"
+
+# Message type: tags of the read models its handlers change
+INVALIDATIONS: Dict[type, Tuple[str, ...]] = {
+    commands.CreateDocument: (DOCUMENTS,),
+    commands.ProcessDocument: (DOCUMENTS, TOPICS, ENTITIES),
+    commands.UpdateDocumentSummary: (DOCUMENTS,),
+    events.DocumentCreated: (DOCUMENTS,),
+    events.DocumentProcessed: (DOCUMENTS, TOPICS, ENTITIES),
+    events.CommentCreated: (DOCUMENTS,),
+    commands.ConsolidateCanonicalEntities: (ENTITIES,),
+    commands.AddEntity: (ENTITIES,),
+    commands.UpdateEntity: (ENTITIES,),
+    events.DocumentEntitiesLinked: (ENTITIES, DOCUMENTS),
+    events.ExistingCanonicalEntityHallucination: (ENTITIES,),
+    commands.CreateTopic: (TOPICS,),
+    commands.UpdateTopic: (TOPICS,),
+    commands.DeleteTopic: (TOPICS,),
+    commands.AddStakeholder: (STAKEHOLDERS,),
+    commands.UpdateStakeholder: (STAKEHOLDERS,),
+    commands.DeleteStakeholder: (STAKEHOLDERS,),
+    commands.RefreshGraphAnalytics: (ANALYTICS,),
+    commands.EmbedDocuments: (),
+    commands.EmbedEntities: (),
+}
+
+
+class ReadModelCache:
+    def __init__(
+        self,
+        max_entries: int = config.READ_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = config.READ_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # key: (expires_at, tags, value), least recently used first
+        self.entries: OrderedDict = OrderedDict()
+        # Bumped on invalidation so a load that overlapped it is not stored
+        self.tag_generations: Dict[str, int] = defaultdict(int)
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.evictions: Dict[str, int] = defaultdict(int)
+        self.invalidations: Dict[str, int] = defaultdict(int)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get_or_load(self, key: tuple, tags: Tuple[str, ...], load: Callable):
+        view = key[0]
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits[view] += 1
+                return entry[2]
+            self.misses[view] += 1
+            generations = [self.tag_generations[tag] for tag in tags]
+
+        value = load()
+
+        with self._lock:
+            if generations == [self.tag_generations[tag] for tag in tags]:
+                self.entries[key] = (time.monotonic() + self.ttl_seconds, tags, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    evicted, _ = self.entries.popitem(last=False)
+                    self.evictions[evicted[0]] += 1
+        return value
+
+    def invalidate(self, tags: Iterable[str]):
+        tags = set(tags)
+        with self._lock:
+            for tag in tags:
+                self.tag_generations[tag] += 1
+            for key in [
+                key
+                for key, entry in self.entries.items()
+                if tags.intersection(entry[1])
+            ]:
+                del self.entries[key]
+                self.invalidations[key[0]] += 1
+
+    def clear(self):
+        with self._lock:
+            for tag in list(self.tag_generations):
+                self.tag_generations[tag] += 1
+            for key in self.entries:
+                self.invalidations[key[0]] += 1
+            self.entries.clear()
+
+    def observe(self, message):
+        tags = INVALIDATIONS.get(type(message))
+        if tags is None:
+            self.clear()
+        elif tags:
+            self.invalidate(tags)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            views = sorted(set(self.hits) | set(self.misses))
+            return {
+                view: {
+                    "hits": self.hits[view],
+                    "misses": self.misses[view],
+                    "hit_rate": self.hits[view]
+                    / ((self.hits[view] + self.misses[view]) or 1),
+                    "evictions": self.evictions[view],
+                    "invalidations": self.invalidations[view],
+                }
+                for view in views
+            }
+
+    def render_prometheus(self, prefix: str = "knowledge_worker_read_cache") -> str:
+        lines = []
+        stats = self.stats()
+        with self._lock:
+            size = len(self.entries)
+        lines.append(f"# HELP {prefix}_entries Read models currently cached.")
+        lines.append(f"# TYPE {prefix}_entries gauge")
+        lines.append(f"{prefix}_entries {size}")
+        for name, metric_type, help_text in (
+            ("hits_total", "counter", "View calls answered from the cache."),
+            ("misses_total", "counter", "View calls that loaded from the database."),
+            ("evictions_total", "counter", "Entries dropped to stay under the limit."),
+            ("invalidations_total", "counter", "Entries dropped by bus messages."),
+            ("hit_rate", "gauge", "Share of view calls answered from the cache."),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            field = name.removesuffix("_total")
+            for view, values in stats.items():
+                lines.append(
+                    f"{prefix}_{name}{_format_labels({'view': view})} "
+                    f"{_format(values[field])}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def freeze(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def cached_view(*tags: str):
+    """Caches a view ``view(uow, *args, **kwargs)`` in READ_MODEL_CACHE.
+
+    The key includes the unit of work's session factory, so views over
+    different databases never share entries.
+    """
+
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(uow, *args, **kwargs):
+            if not READ_MODEL_CACHE.enabled or not isinstance(
+                uow, unit_of_work.SqlAlchemyUnitOfWork
+            ):
+                return view(uow, *args, **kwargs)
+            if uow.session_factory is None:
+                uow.session_factory = core.database.get_session_factory()
+            key = (
+                view.__name__,
+                uow.session_factory,
+                tuple(map(freeze, args)),
+                tuple(sorted((name, freeze(value)) for name, value in kwargs.items())),
+            )
+            return READ_MODEL_CACHE.get_or_load(
+                key, tags, lambda: view(uow, *args, **kwargs)
+            )
+
+        wrapper.uncached = view
+        return wrapper
+
+    return decorate
+
+
+# Views are called with a new unit of work per request, so the cache is shared.
+READ_MODEL_CACHE = ReadModelCache()
@@ -1,23 +1,8 @@
 import core.adapters.repository as repository
-import core.config
+import core.adapters.changelog as changelog
+import core.database
 import abc
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-
-DEFAULT_SESSION_FACTORY = sessionmaker(
-    # bind=create_engine(
-    #     "sqlite:///C:/Users/ckemplen/POLICY_DEVELOPMENT_APP/db.sqlite",  # echo=config.DB_ECHO
-    # )
-    # bind=create_engine(
-    #     "sqlite:///C:/Users/chris/Knowledge_Worker/db.sqlite",  # echo=config.DB_ECHO
-    # )
-    bind=create_engine(
-        f"sqlite:///{core.config.DATABASE_PATH}",  # echo=config.DB_ECHO
-    )
-)
-
 
 class AbstractUnitOfWork(abc.ABC):
     documents: repository.AbstractRepository
@@ -60,11 +45,14 @@ class AbstractUnitOfWork(abc.ABC):
 
 
 class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
-    def __init__(self, session_factory=DEFAULT_SESSION_FACTORY):
+    def __init__(self, session_factory=None):
         super().__init__()  # Initialize the base class
         self.session_factory = session_factory
 
     def __enter__(self):
+        if self.session_factory is None:
+            # Resolved on first use so the shared engine is only built when needed
+            self.session_factory = core.database.get_session_factory()
         self.session = self.session_factory()
         self.documents = repository.SqlAlchemyDocumentRepository(self.session)
         self.comments = repository.SqlAlchemyCommentRepository(self.session)
@@ -80,13 +68,26 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         self.session.close()
 
     def commit(self):
+        changelog.write_pending(self.session)
         self.session.commit()
 
     def _commit(self):
         return self.commit()
 
     def rollback(self):
+        changelog.discard_pending(self.session)
         self.session.rollback()
+        # Aggregates loaded before the rollback may hold changes it undid
+        for repo in (
+            self.documents,
+            self.comments,
+            self.raw_topics,
+            self.raw_entities,
+            self.topics,
+            self.entities,
+            self.stakeholders,
+        ):
+            repo.clear_identity_map()
 
 
 class FakeUnitOfWork(AbstractUnitOfWork):
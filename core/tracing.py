@@ -0,0 +1,155 @@
+"""Lightweight span tracing exported to a local JSON-lines file.
+
+Spans nest through a context variable, so every span opened while handling a
+request or message shares the trace id of the outermost span. Tracing is off
+unless TRACE_FILE is set (or an exporter is installed with ``set_exporter``),
+in which case ``span`` costs a single context variable lookup.
+
+Turn a trace file into folded stacks for flamegraph tools with:
+
+    python -m core.tracing trace.jsonl > trace.folded
+"""
+
+import abc
+import contextvars
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterator, List, Optional
+
+import core.config
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start_time: float
+    attributes: Dict = field(default_factory=dict)
+    duration: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    _start_perf: float = field(default=0.0, repr=False)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict:
+        span_dict = asdict(self)
+        del span_dict["_start_perf"]
+        return span_dict
+
+
+class AbstractSpanExporter(abc.ABC):
+    @abc.abstractmethod
+    def export(self, span: Span):
+        raise NotImplementedError
+
+
+class JSONLinesSpanExporter(AbstractSpanExporter):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+class InMemorySpanExporter(AbstractSpanExporter):
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_exporter: Optional[AbstractSpanExporter] = (
+    JSONLinesSpanExporter(core.config.TRACE_FILE) if core.config.TRACE_FILE else None
+)
+
+
+def set_exporter(exporter: Optional[AbstractSpanExporter]):
+    global _exporter
+    _exporter = exporter
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    exporter = _exporter
+    if exporter is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    new_span = Span(
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        start_time=time.time(),
+        attributes=attributes,
+        _start_perf=time.perf_counter(),
+    )
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.status = "error"
+        new_span.error = repr(e)
+        raise
+    finally:
+        new_span.duration = time.perf_counter() - new_span._start_perf
+        _current_span.reset(token)
+        exporter.export(new_span)
+
+
+def folded_stacks(spans: List[Dict]) -> Dict[str, int]:
+    """Collapses spans into ``root;child;leaf -> self time in microseconds``."""
+    by_id = {s["span_id"]: s for s in spans}
+    child_time = defaultdict(float)
+    for s in spans:
+        if s["parent_id"] in by_id:
+            child_time[s["parent_id"]] += s["duration"]
+
+    stacks = defaultdict(int)
+    for s in spans:
+        path = [s["name"]]
+        parent = by_id.get(s["parent_id"])
+        while parent is not None:
+            path.append(parent["name"])
+            parent = by_id.get(parent["parent_id"])
+        self_time = max(s["duration"] - child_time[s["span_id"]], 0.0)
+        stacks[";".join(reversed(path))] += int(self_time * 1_000_000)
+    return stacks
+
+
+def read_spans(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    for stack, micros in sorted(folded_stacks(read_spans(sys.argv[1])).items()):
+        print(f"{stack} {micros}")
@@ -1,8 +1,18 @@
+import datetime
+import difflib
+from typing import Iterator, List, Optional, Union
+
+from sqlalchemy import case, or_, select
+
 from core.service_layer import unit_of_work
+from core.service_layer import read_cache
 from core.domain import model
-from sqlalchemy import text
+from core.adapters import orm, repository
+from core.adapters import search as search_index
+from core.graphs import cache as graph_cache
 
 
+@read_cache.cached_view(read_cache.DOCUMENTS)
 def get_all_documents(uow: unit_of_work.SqlAlchemyUnitOfWork):
     with uow:
         results = uow.documents.list()
@@ -10,12 +20,14 @@ def get_all_documents(uow: unit_of_work.SqlAlchemyUnitOfWork):
     return results
 
 
+@read_cache.cached_view(read_cache.STAKEHOLDERS)
 def get_all_stakeholders(uow: unit_of_work.SqlAlchemyUnitOfWork):
     with uow:
         results = uow.stakeholders.list()
     return results
 
 
+@read_cache.cached_view(read_cache.TOPICS)
 def get_all_topics(uow: unit_of_work.SqlAlchemyUnitOfWork):
     with uow:
         results = uow.topics.list()
@@ -23,6 +35,7 @@ def get_all_topics(uow: unit_of_work.SqlAlchemyUnitOfWork):
     return results
 
 
+@read_cache.cached_view(read_cache.ENTITIES)
 def get_all_entities(uow: unit_of_work.SqlAlchemyUnitOfWork):
     with uow:
         results = uow.entities.list()
@@ -30,72 +43,296 @@ def get_all_entities(uow: unit_of_work.SqlAlchemyUnitOfWork):
     return results
 
 
+@read_cache.cached_view(read_cache.ENTITIES)
 def get_entity_by_id(uow: unit_of_work.SqlAlchemyUnitOfWork, id: int):
     with uow:
         result = uow.entities.get(reference=id)
     return result
 
 
+@read_cache.cached_view(read_cache.TOPICS)
 def get_topic_by_id(uow: unit_of_work.SqlAlchemyUnitOfWork, id: int):
     with uow:
         result = uow.topics.get(reference=id)
     return result
 
 
+@read_cache.cached_view(read_cache.DOCUMENTS)
 def get_document_by_filename(uow: unit_of_work.SqlAlchemyUnitOfWork, filename: str):
     with uow:
-        result = uow.session.execute(
-            text(
-                """
-            SELECT * FROM Documents 
-            WHERE filename = :filename 
-            ORDER BY version DESC 
-            LIMIT 1;
-            """,
-                {"filename": filename},
-            )
-        ).fetchone()
-    return model.Document(result) if result else None
+        result = (
+            uow.session.query(orm.DocumentORM)
+            .filter_by(filename=filename)
+            .order_by(orm.DocumentORM.version.desc())
+            .first()
+        )
+        return (
+            repository.trusted_model(model.Document, result.to_dict())
+            if result
+            else None
+        )
 
 
+@read_cache.cached_view(read_cache.DOCUMENTS)
+def get_document_history(uow: unit_of_work.SqlAlchemyUnitOfWork, id: int):
+    with uow:
+        return uow.documents.versions(id)
+
+
+@read_cache.cached_view(read_cache.DOCUMENTS)
+def get_latest_documents(
+    uow: unit_of_work.SqlAlchemyUnitOfWork, filepaths: Optional[List[str]] = None
+):
+    with uow:
+        return uow.documents.latest_versions(filepaths)
+
+
+@read_cache.cached_view(read_cache.DOCUMENTS)
+def get_document_diff(
+    uow: unit_of_work.SqlAlchemyUnitOfWork, from_id: int, to_id: int, context: int = 3
+) -> str:
+    """Unified diff of the text of two document versions."""
+    with uow:
+        rows = uow.session.execute(
+            select(
+                orm.DocumentORM.id,
+                orm.DocumentORM.filename,
+                orm.DocumentORM.version,
+                orm.DocumentORM.text,
+            ).where(orm.DocumentORM.id.in_([from_id, to_id]))
+        )
+        documents = {row.id: row for row in rows}
+    old, new = documents[from_id], documents[to_id]
+    return "".join(
+        difflib.unified_diff(
+            (old.text or "").splitlines(keepends=True),
+            (new.text or "").splitlines(keepends=True),
+            fromfile=f"{old.filename} (version {old.version})",
+            tofile=f"{new.filename} (version {new.version})",
+            n=context,
+        )
+    )
+
+
+@read_cache.cached_view(read_cache.DOCUMENTS)
 def get_document_by_id(uow: unit_of_work.SqlAlchemyUnitOfWork, id: int):
     with uow:
         result = uow.documents.get(reference=id)
     return result
 
 
+@read_cache.cached_view(read_cache.STAKEHOLDERS)
 def get_stakeholder_by_name(uow: unit_of_work.SqlAlchemyUnitOfWork, name: str):
     with uow:
         result = uow.stakeholders.get_stakeholder_by_name(name=name)
     return result
 
 
+@read_cache.cached_view(read_cache.ENTITIES)
 def get_entity_by_name(uow: unit_of_work.SqlAlchemyUnitOfWork, name: str):
     with uow:
         result = uow.entities.get_entity_by_name(name=name)
     return result
 
 
+@read_cache.cached_view(read_cache.STAKEHOLDERS)
 def get_stakeholder_by_id(uow: unit_of_work.SqlAlchemyUnitOfWork, id: int):
     with uow:
         result = uow.stakeholders.get(reference=id)
     return result
 
 
+@read_cache.cached_view(read_cache.ENTITIES, read_cache.DOCUMENTS)
 def get_entity_documents(uow: unit_of_work.SqlAlchemyUnitOfWork):
-    entity_documents = {}
     with uow:
-        links = uow.session.execute(
-            text(
-                """
-                SELECT document_id, entity_id FROM DocumentEntities 
-                """
+        links = repository.load_links(uow.session, model.DocumentEntity)
+    return links.grouped(by_second=True)
+
+
+@read_cache.cached_view(read_cache.DOCUMENTS, read_cache.TOPICS, read_cache.ENTITIES)
+def search(
+    uow: unit_of_work.SqlAlchemyUnitOfWork,
+    query: str,
+    kinds: Optional[List[str]] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    with uow:
+        return search_index.search(
+            uow.session, query, kinds=kinds, limit=limit, offset=offset
+        )
+
+
+def find_similar_documents(
+    uow: unit_of_work.SqlAlchemyUnitOfWork,
+    embedding_store,
+    document_id: int,
+    k: int = 10,
+    mode: str = "auto",
+):
+    vector = embedding_store.documents.get(document_id)
+    if vector is None:
+        return []
+    matches = embedding_store.documents.search(
+        vector, k=k, mode=mode, exclude_ids=[document_id]
+    )
+    with uow:
+        return [(uow.documents.get(reference=id_), score) for id_, score in matches]
+
+
+def find_similar_entities(
+    uow: unit_of_work.SqlAlchemyUnitOfWork,
+    embedding_store,
+    entity_id: int,
+    k: int = 10,
+    mode: str = "auto",
+):
+    vector = embedding_store.entities.get(entity_id)
+    if vector is None:
+        return []
+    matches = embedding_store.entities.search(
+        vector, k=k, mode=mode, exclude_ids=[entity_id]
+    )
+    with uow:
+        results = [(uow.entities.get(reference=id_), score) for id_, score in matches]
+    return [(entity, score) for entity, score in results if entity is not None]
+
+
+def get_graph(uow: unit_of_work.SqlAlchemyUnitOfWork) -> graph_cache.GraphSnapshot:
+    with uow:
+        return graph_cache.GRAPH_CACHE.get(uow.session)
+
+
+def get_subgraph(
+    uow: unit_of_work.SqlAlchemyUnitOfWork,
+    node: Optional[str] = None,
+    hops: int = 1,
+    groups: Optional[List[str]] = None,
+    relations: Optional[List[str]] = None,
+    top: Optional[int] = None,
+    offset: int = 0,
+    limit: int = 500,
+) -> dict:
+    with uow:
+        index = graph_cache.GRAPH_CACHE.get_index(uow.session)
+    return index.query(
+        node=node,
+        hops=hops,
+        groups=groups,
+        relations=relations,
+        top=top,
+        offset=offset,
+        limit=limit,
+    )
+
+
+# node_type: (label column, id column) of the rows graph analytics are stored for
+GRAPH_NODE_LABELS = {
+    "document": (orm.DocumentORM.filename, orm.DocumentORM.id),
+    "entity": (orm.EntityORM.entity_name, orm.EntityORM.id),
+    "topic": (orm.TopicORM.topic_name, orm.TopicORM.id),
+}
+GRAPH_RANKINGS = ("pagerank", "weighted_degree", "degree")
+
+
+@read_cache.cached_view(
+    read_cache.ANALYTICS, read_cache.DOCUMENTS, read_cache.TOPICS, read_cache.ENTITIES
+)
+def get_graph_rankings(
+    uow: unit_of_work.SqlAlchemyUnitOfWork,
+    node_type: str,
+    order_by: str = "pagerank",
+    limit: int = 50,
+    offset: int = 0,
+) -> List[dict]:
+    label, id_column = GRAPH_NODE_LABELS[node_type]
+    metrics = orm.GraphNodeMetricsORM
+    with uow:
+        rows = (
+            uow.session.query(metrics, label)
+            .join(id_column.class_, id_column == metrics.node_id)
+            .filter(metrics.node_type == node_type)
+            .order_by(getattr(metrics, order_by).desc(), metrics.node_id)
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
+        return [dict(row.to_dict(), label=name) for row, name in rows]
+
+
+@read_cache.cached_view(read_cache.ANALYTICS, read_cache.ENTITIES)
+def get_entity_cooccurrences(
+    uow: unit_of_work.SqlAlchemyUnitOfWork, entity_id: int, limit: int = 20
+) -> List[dict]:
+    pairs = orm.EntityCooccurrenceORM
+    other_id = case(
+        (pairs.entity_id == entity_id, pairs.other_entity_id), else_=pairs.entity_id
+    )
+    with uow:
+        rows = (
+            uow.session.query(other_id, orm.EntityORM.entity_name, pairs.document_count)
+            .join(orm.EntityORM, orm.EntityORM.id == other_id)
+            .filter(
+                or_(pairs.entity_id == entity_id, pairs.other_entity_id == entity_id)
             )
-        ).all()
+            .order_by(pairs.document_count.desc(), other_id)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {"entity_id": id_, "entity_name": name, "document_count": count}
+            for id_, name, count in rows
+        ]
+
+
+# Document listings leave out the full text unless asked for it
+DOCUMENT_TEXT_COLUMNS = ("text", "html_text")
+
+
+def stream_documents(
+    uow: unit_of_work.SqlAlchemyUnitOfWork, include_text: bool = False
+) -> Iterator[dict]:
+    columns = [
+        column.name
+        for column in orm.DocumentORM.__table__.columns
+        if include_text or column.name not in DOCUMENT_TEXT_COLUMNS
+    ]
+    with uow:
+        yield from uow.documents.stream(columns=columns)
+
+
+def stream_topics(uow: unit_of_work.SqlAlchemyUnitOfWork) -> Iterator[dict]:
+    with uow:
+        yield from uow.topics.stream()
+
+
+def stream_entities(uow: unit_of_work.SqlAlchemyUnitOfWork) -> Iterator[dict]:
+    with uow:
+        yield from uow.entities.stream()
 
-        for document_id, entity_id in links:
-            entity_documents[entity_id] = []
-        for document_id, entity_id in links:
-            entity_documents[entity_id].append(document_id)
 
-        return entity_documents
+def stream_stakeholders(uow: unit_of_work.SqlAlchemyUnitOfWork) -> Iterator[dict]:
+    with uow:
+        yield from uow.stakeholders.stream()
+
+
+# Kinds of object get_as_of can rebuild: unit of work repository
+AS_OF_REPOSITORIES = {
+    "document": "documents",
+    "topic": "topics",
+    "entity": "entities",
+    "stakeholder": "stakeholders",
+}
+
+
+def get_as_of(
+    uow: unit_of_work.SqlAlchemyUnitOfWork,
+    kind: str,
+    id: int,
+    when: Union[datetime.datetime, str],
+):
+    """The object as it was at ``when``, rebuilt from its changelog, or None if
+    it did not exist then."""
+    with uow:
+        repo = getattr(uow, AS_OF_REPOSITORIES[kind])
+        return repo.get_as_of(id, when)
@@ -0,0 +1,304 @@
+import datetime
+import json
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from core import database, views
+from core.adapters import changelog, orm
+from core.domain import commands
+from core.service_layer import handlers, unit_of_work
+
+
+def add_document(uow, text):
+    with uow:
+        document = uow.documents.add(
+            commands.CreateDocument(filepath="a.docx", filename="a.docx", text=text)
+        )
+        uow.commit()
+    return document.id
+
+
+def add_stakeholder(uow, **audit):
+    with uow:
+        stakeholder = uow.stakeholders.add(
+            commands.AddStakeholder(
+                stakeholder_name="Treasury",
+                stakeholder_type="Department",
+                stakeholder_description="",
+                **audit,
+            )
+        )
+        uow.commit()
+    return stakeholder.id
+
+
+def update_stakeholder(uow, id_, name):
+    handlers.update_stakeholder(
+        commands.UpdateStakeholder(
+            id=id_,
+            stakeholder_name=name,
+            stakeholder_type="Department",
+            stakeholder_description="",
+            last_modified_by="bob",
+        ),
+        uow,
+    )
+
+
+CREATED_AT = datetime.datetime(2024, 1, 1)
+
+
+def changelog_count(session_factory):
+    with session_factory() as session:
+        return session.scalar(select(func.count()).select_from(orm.ChangelogORM))
+
+
+class TestChangelog:
+    def test_entries_hold_changed_fields_and_are_written_at_commit(
+        self, session_factory, monkeypatch
+    ):
+        monkeypatch.setattr(changelog.config, "CHANGELOG_COMPRESS_MIN_CHARS", 100)
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_document(uow, "budget " * 1000)
+
+        with uow:
+            document = uow.documents.get(reference=id_)
+            document.summary = "A long budget. " * 20
+            uow.documents.update(document, ["summary"])
+            assert changelog_count(session_factory) == 0
+            uow.commit()
+
+        with session_factory() as session:
+            [row] = session.scalars(select(orm.ChangelogORM))
+        stored = json.loads(row.changes_json)
+        assert row.previous_object_json is None
+        assert set(stored) == {"summary", "version"}
+        assert set(stored["summary"][1]) == {changelog.COMPRESSED}
+        assert changelog.decode_changes(row)["summary"] == [
+            None,
+            "A long budget. " * 20,
+        ]
+
+    def test_rollback_discards_queued_entries(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_document(uow, "budget")
+
+        with uow:
+            document = uow.documents.get(reference=id_)
+            document.summary = "Budget"
+            uow.documents.update(document, ["summary"])
+            uow.rollback()
+            uow.commit()
+
+        assert changelog_count(session_factory) == 0
+
+    def test_rebuilds_every_revision(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_document(uow, "budget")
+        with uow:
+            for summary in ("First", "Second", "Third"):
+                document = uow.documents.get(reference=id_)
+                document.summary = summary
+                uow.documents.update(document, ["summary"])
+            uow.commit()
+
+        with uow:
+            summaries = [
+                uow.documents.get_revision(id_, revision).summary
+                for revision in range(4)
+            ]
+            with pytest.raises(IndexError):
+                uow.documents.get_revision(id_, 4)
+
+        assert summaries == [None, "First", "Second", "Third"]
+
+    def test_handler_updates_log_only_the_fields_written(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_stakeholder(uow, created_by="alice", created_at=CREATED_AT)
+
+        update_stakeholder(uow, id_, "HM Treasury")
+
+        with uow:
+            [change] = uow.stakeholders.history(id_)
+            stakeholder = uow.stakeholders.get(reference=id_)
+        assert stakeholder.created_by == "alice"
+        assert set(change.changes) == {
+            "stakeholder_name",
+            "last_modified_by",
+            "last_modified_at",
+            "version",
+        }
+
+    def test_reads_entries_with_full_snapshots(self, session_factory):
+        with session_factory() as session:
+            session.add(
+                orm.ChangelogORM(
+                    entity_name="Topic",
+                    entity_id=1,
+                    previous_object_json=json.dumps({"topic_name": "a", "events": []}),
+                    revised_object_json=json.dumps({"topic_name": "b", "events": [1]}),
+                )
+            )
+            session.commit()
+
+            [change] = changelog.history(session, "Topic", 1)
+
+        assert change.changes == {"topic_name": ["a", "b"]}
+
+    def test_migration_replaces_snapshots_with_differences(self, tmp_path):
+        engine = database.create_engine_from_url(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        database.migrate(engine, "0003")
+        legacy = {
+            "entity_name": "Stakeholder",
+            "entity_id": 1,
+            "previous_object_json": json.dumps({"stakeholder_name": "a", "version": 1}),
+            "revised_object_json": json.dumps({"stakeholder_name": "b", "version": 2}),
+        }
+        with engine.begin() as conn:
+            conn.execute(insert(orm.ChangelogORM.__table__), [legacy])
+
+        database.migrate(engine)
+
+        with engine.connect() as conn:
+            row = conn.execute(select(orm.ChangelogORM.__table__)).one()
+        engine.dispose()
+        assert row.previous_object_json is None
+        assert json.loads(row.changes_json) == {
+            "stakeholder_name": ["a", "b"],
+            "version": [1, 2],
+        }
+
+    def test_migration_drops_logged_creation_fields(self, tmp_path):
+        engine = database.create_engine_from_url(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        database.migrate(engine, "0007")
+        snapshot = {
+            "stakeholder_name": "b",
+            "created_by": "ADMIN",
+            "created_at": "2025-02-01T00:00:00",
+        }
+        with engine.begin() as conn:
+            conn.execute(
+                insert(orm.StakeholderORM.__table__),
+                [dict(stakeholder_name="b", created_by="alice", created_at=CREATED_AT)],
+            )
+            conn.execute(
+                insert(orm.ChangelogORM.__table__),
+                [
+                    {
+                        "entity_name": "Stakeholder",
+                        "entity_id": 1,
+                        "changes_json": json.dumps(
+                            {
+                                "stakeholder_name": ["a", "b"],
+                                "created_by": ["alice", "ADMIN"],
+                            }
+                        ),
+                        "revised_object_json": json.dumps(snapshot),
+                    }
+                ],
+            )
+
+        database.migrate(engine)
+
+        with engine.connect() as conn:
+            row = conn.execute(select(orm.ChangelogORM.__table__)).one()
+        engine.dispose()
+        assert json.loads(row.changes_json) == {"stakeholder_name": ["a", "b"]}
+        assert json.loads(row.revised_object_json) == {
+            "stakeholder_name": "b",
+            "created_by": "alice",
+            "created_at": CREATED_AT.isoformat(),
+        }
+
+
+def rename_stakeholder(uow, id_, names):
+    """Renames the stakeholder once per commit; returns the time after each."""
+    times = []
+    for name in names:
+        with uow:
+            stakeholder = uow.stakeholders.get(reference=id_)
+            stakeholder.stakeholder_name = name
+            uow.stakeholders.update(stakeholder, ["stakeholder_name"])
+            uow.commit()
+        times.append(datetime.datetime.now(datetime.timezone.utc))
+    return times
+
+
+class TestAsOf:
+    NAMES = [f"Treasury {n}" for n in range(1, 8)]
+
+    @pytest.fixture
+    def stakeholder(self, session_factory, monkeypatch):
+        monkeypatch.setattr(changelog.config, "CHANGELOG_SNAPSHOT_INTERVAL", 3)
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        before = datetime.datetime.now(datetime.timezone.utc)
+        with uow:
+            id_ = uow.stakeholders.add(
+                commands.AddStakeholder(
+                    stakeholder_name="Treasury",
+                    stakeholder_type="Department",
+                    stakeholder_description="",
+                )
+            ).id
+            uow.commit()
+        created = datetime.datetime.now(datetime.timezone.utc)
+        return id_, before, [created] + rename_stakeholder(uow, id_, self.NAMES)
+
+    def test_every_interval_entry_stores_a_snapshot(self, session_factory, stakeholder):
+        with session_factory() as session:
+            rows = session.scalars(
+                select(orm.ChangelogORM).order_by(orm.ChangelogORM.id)
+            )
+            snapshots = [row.revised_object_json is not None for row in rows]
+
+        assert snapshots == [False, False, True, False, False, True, False]
+
+    def test_rebuilds_the_object_at_each_time(self, session_factory, stakeholder):
+        id_, before, times = stakeholder
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        names = [
+            views.get_as_of(uow, "stakeholder", id_, when).stakeholder_name
+            for when in times
+        ]
+
+        assert names == ["Treasury"] + self.NAMES
+        assert views.get_as_of(uow, "stakeholder", id_, before) is None
+
+    def test_replays_from_a_snapshot_without_the_current_state(
+        self, session_factory, stakeholder
+    ):
+        id_, _, times = stakeholder
+
+        with session_factory() as session:
+            state = changelog.as_of(
+                session,
+                "Stakeholder",
+                id_,
+                times[5].isoformat(),
+                current=lambda: pytest.fail("rebuilt from the current state"),
+            )
+
+        assert state["stakeholder_name"] == "Treasury 5"
+
+    def test_handler_updates_keep_the_stored_creation_fields(
+        self, session_factory, monkeypatch
+    ):
+        monkeypatch.setattr(changelog.config, "CHANGELOG_SNAPSHOT_INTERVAL", 1)
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_stakeholder(uow, created_by="alice")
+        created = datetime.datetime.now(datetime.timezone.utc)
+
+        update_stakeholder(uow, id_, "HM Treasury")
+        updated = datetime.datetime.now(datetime.timezone.utc)
+
+        with uow:
+            stored = uow.stakeholders.get(reference=id_)
+        before_update = views.get_as_of(uow, "stakeholder", id_, created)
+        after_update = views.get_as_of(uow, "stakeholder", id_, updated)
+        assert before_update.stakeholder_name == "Treasury"
+        assert after_update.stakeholder_name == "HM Treasury"
+        for state in (before_update, after_update):
+            assert state.created_by == "alice"
+            assert state.created_at == stored.created_at
@@ -0,0 +1,60 @@
+from sqlalchemy import inspect, text
+
+from core import database
+from core.adapters import orm
+from core.domain import commands
+from core.service_layer import unit_of_work
+
+
+class TestSqliteEngine:
+    def test_production_profile_applies_pragmas_on_connect(self, tmp_path):
+        engine = database.create_sqlite_engine(
+            tmp_path / "db.sqlite", profile="production"
+        )
+
+        with engine.connect() as conn:
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+            synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+            busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout == database.sqlite_pragmas("production")["busy_timeout"]
+
+    def test_default_profile_leaves_sqlite_settings(self, tmp_path):
+        engine = database.create_sqlite_engine(
+            tmp_path / "db.sqlite", profile="default"
+        )
+
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+
+
+class TestBackends:
+    def test_create_database_builds_schema_from_orm_metadata(self, engine):
+        tables = set(inspect(engine).get_table_names())
+
+        assert set(orm.Base.metadata.tables) <= tables
+
+    def test_repository_round_trip(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        with uow:
+            uow.stakeholders.add(
+                commands.AddStakeholder(
+                    stakeholder_name="Treasury",
+                    stakeholder_type="Department",
+                    stakeholder_description="Finance ministry",
+                )
+            )
+            uow.commit()
+
+        with uow:
+            [stakeholder] = uow.stakeholders.list()
+        assert stakeholder.stakeholder_name == "Treasury"
+
+    def test_pool_settings_apply_to_file_databases(self, tmp_path):
+        engine = database.create_engine_from_url(
+            f"sqlite:///{tmp_path / 'db.sqlite'}", pool_size=3, max_overflow=1
+        )
+
+        assert engine.pool.size() == 3
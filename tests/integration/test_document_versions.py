@@ -0,0 +1,81 @@
+from sqlalchemy import insert, select
+
+from core import database, views
+from core.adapters import orm
+from core.domain import commands
+from core.service_layer import handlers, unit_of_work
+
+
+def add_version(session_factory, filepath, text):
+    uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+    return handlers.add_new_document(
+        commands.CreateDocument(filepath=filepath, filename=filepath, text=text),
+        uow,
+    )
+
+
+class TestDocumentVersions:
+    def test_versions_share_the_first_version_as_root(self, session_factory):
+        first = add_version(session_factory, "budget.docx", "Draft")
+        second = add_version(session_factory, "budget.docx", "Final")
+        add_version(session_factory, "other.docx", "Other")
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        history = views.get_document_history(uow, second.id)
+
+        assert [(d.id, d.version) for d in history] == [(first.id, 1), (second.id, 2)]
+        assert {d.root_document_id for d in history} == {first.id}
+        assert history[1].previous_version_id == first.id
+
+    def test_latest_version_of_each_file(self, session_factory):
+        add_version(session_factory, "budget.docx", "Draft")
+        latest = add_version(session_factory, "budget.docx", "Final")
+        other = add_version(session_factory, "other.docx", "Other")
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        everything = views.get_latest_documents(uow)
+        one = views.get_latest_documents(uow, ["other.docx"])
+
+        assert {path: d.id for path, d in everything.items()} == {
+            "budget.docx": latest.id,
+            "other.docx": other.id,
+        }
+        assert list(one) == ["other.docx"]
+
+    def test_diff_between_versions(self, session_factory):
+        first = add_version(session_factory, "budget.docx", "Intro\nSpend 5\nEnd\n")
+        second = add_version(session_factory, "budget.docx", "Intro\nSpend 7\nEnd\n")
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        diff = views.get_document_diff(uow, first.id, second.id).splitlines()
+
+        assert diff[:2] == [
+            "--- budget.docx (version 1)",
+            "+++ budget.docx (version 2)",
+        ]
+        assert "-Spend 5" in diff and "+Spend 7" in diff
+
+    def test_migration_indexes_existing_chains(self, tmp_path):
+        engine = database.create_engine_from_url(f"sqlite:///{tmp_path / 'db.sqlite'}")
+        database.migrate(engine, "0005")
+        documents = orm.DocumentORM.__table__
+        with engine.begin() as conn:
+            for id_, version, previous_id in [(1, 1, None), (2, 2, 1), (3, 3, 2)]:
+                conn.execute(
+                    insert(documents).values(
+                        id=id_,
+                        filepath="a.docx",
+                        filename="a.docx",
+                        version=version,
+                        previous_version_id=previous_id,
+                    )
+                )
+
+        database.migrate(engine)
+
+        with engine.connect() as conn:
+            roots = conn.scalars(
+                select(documents.c.root_document_id).order_by(documents.c.id)
+            ).all()
+        engine.dispose()
+        assert roots == [1, 1, 1]
@@ -0,0 +1,42 @@
+from core import bootstrap, views
+from core.adapters import llm_connectors
+from core.adapters.vector_store import EmbeddingStore
+from core.domain import commands
+from core.service_layer import unit_of_work
+
+
+class TestEmbeddings:
+    def test_embedded_documents_can_be_queried_for_similar_ones(
+        self, session_factory, tmp_path
+    ):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        with uow:
+            for filename, text in [
+                ("budget.docx", "Treasury budget and spending review"),
+                ("spending.docx", "Spending review of the treasury budget"),
+                ("housing.docx", "Social housing supply"),
+            ]:
+                uow.documents.add(
+                    commands.CreateDocument(
+                        filepath=filename, filename=filename, text=text
+                    )
+                )
+            uow.commit()
+        embedding_store = EmbeddingStore(str(tmp_path), dimensions=64)
+        bus = bootstrap.bootstrap(
+            uow=uow,
+            document_analysis_connector=llm_connectors.FakeDocumentAnalysisConnector(),
+            canonical_entity_consolidation_connector=None,
+            embedding_connector=llm_connectors.FakeEmbeddingConnector(dimensions=64),
+            embedding_store=embedding_store,
+        )
+
+        bus.handle(commands.EmbedDocuments())
+        budget = views.get_document_by_filename(uow, "budget.docx")
+        [(most_similar, score), _] = views.find_similar_documents(
+            uow, embedding_store, budget.id, k=2
+        )
+
+        assert len(embedding_store.documents) == 3
+        assert most_similar.filename == "spending.docx"
+        assert score > 0.5
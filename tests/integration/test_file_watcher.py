@@ -0,0 +1,96 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.adapters.file_watcher import DirectoryWatcher, SqlAlchemyFileStateStore
+
+
+def write(path, text, age=60):
+    with open(path, "w") as f:
+        f.write(text)
+    modified = time.time() - age
+    os.utime(path, (modified, modified))
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+class TestDirectoryWatcher:
+    def make_watcher(self, directory, session_factory, executor, ingested):
+        return DirectoryWatcher(
+            [str(directory)],
+            SqlAlchemyFileStateStore(session_factory),
+            ingested.append,
+            debounce=5,
+            executor=executor,
+        )
+
+    def test_only_new_and_changed_files_are_ingested(
+        self, tmp_path, session_factory, executor
+    ):
+        (tmp_path / "sub").mkdir()
+        write(tmp_path / "a.txt", "First")
+        write(tmp_path / "sub" / "b.md", "Second")
+        write(tmp_path / "ignored.xyz", "Unsupported")
+        write(tmp_path / "~$lock.docx", "Office lock file")
+        ingested = []
+        watcher = self.make_watcher(tmp_path, session_factory, executor, ingested)
+
+        assert watcher.scan_once() == [
+            str(tmp_path / "a.txt"),
+            str(tmp_path / "sub" / "b.md"),
+        ]
+        assert watcher.scan_once() == []
+
+        write(tmp_path / "a.txt", "First, revised", age=30)
+        write(tmp_path / "sub" / "b.md", "Second", age=30)  # Touched only
+        write(tmp_path / "c.txt", "Third", age=30)
+        # A new watcher starts from the stored state
+        watcher = self.make_watcher(tmp_path, session_factory, executor, ingested)
+
+        assert watcher.scan_once() == [str(tmp_path / "a.txt"), str(tmp_path / "c.txt")]
+        assert [cmd.text for cmd in ingested] == [
+            "First",
+            "Second",
+            "First, revised",
+            "Third",
+        ]
+        assert ingested[0].filepath == str(tmp_path / "a.txt")
+
+    def test_files_still_being_written_wait_for_a_later_scan(
+        self, tmp_path, session_factory, executor
+    ):
+        write(tmp_path / "a.txt", "Being written", age=0)
+        ingested = []
+        watcher = self.make_watcher(tmp_path, session_factory, executor, ingested)
+
+        assert watcher.scan_once() == []
+
+        watcher.clock = lambda: time.time() + 10
+        assert watcher.scan_once() == [str(tmp_path / "a.txt")]
+
+    def test_failed_ingestion_is_retried(self, tmp_path, session_factory, executor):
+        write(tmp_path / "a.txt", "Text")
+        attempts = []
+
+        def ingest(cmd):
+            attempts.append(cmd)
+            if len(attempts) == 1:
+                raise RuntimeError("Database unavailable")
+
+        watcher = DirectoryWatcher(
+            [str(tmp_path)],
+            SqlAlchemyFileStateStore(session_factory),
+            ingest,
+            debounce=5,
+            executor=executor,
+        )
+
+        assert watcher.scan_once() == []
+        assert watcher.scan_once() == [str(tmp_path / "a.txt")]
+        assert len(attempts) == 2
@@ -0,0 +1,137 @@
+from sqlalchemy import select
+
+from core import bootstrap, views
+from core.adapters import orm
+from core.domain import events
+from core.graphs import analytics
+from core.service_layer import unit_of_work
+
+
+def add_rows(session_factory, *rows):
+    with session_factory() as session:
+        session.add_all(rows)
+        session.commit()
+
+
+def link(session_factory, *pairs):
+    add_rows(
+        session_factory,
+        *[orm.DocumentEntityORM(document_id=d, entity_id=e) for d, e in pairs],
+    )
+
+
+def refresh(session_factory, full=False):
+    with session_factory() as session:
+        summary = analytics.refresh(session, full=full)
+        session.commit()
+    return summary
+
+
+def stored(session_factory):
+    with session_factory() as session:
+        pairs = session.execute(
+            select(orm.EntityCooccurrenceORM).order_by(
+                orm.EntityCooccurrenceORM.entity_id,
+                orm.EntityCooccurrenceORM.other_entity_id,
+            )
+        ).scalars()
+        metrics = session.execute(select(orm.GraphNodeMetricsORM)).scalars()
+        return (
+            [(p.entity_id, p.other_entity_id, p.document_count) for p in pairs],
+            {
+                (m.node_type, m.node_id): (m.degree, m.weighted_degree, m.component)
+                for m in metrics
+            },
+        )
+
+
+def seed(session_factory):
+    add_rows(
+        session_factory,
+        *[
+            orm.DocumentORM(id=i, filepath=f"{i}.docx", filename=f"{i}.docx")
+            for i in range(1, 4)
+        ],
+        *[
+            orm.EntityORM(id=i, entity_name=name)
+            for i, name in enumerate(
+                ["Treasury", "Cabinet Office", "Home Office", "HMRC"], start=1
+            )
+        ],
+        orm.TopicORM(id=1, topic_name="Budget"),
+    )
+    add_rows(session_factory, orm.DocumentTopicORM(document_id=1, topic_id=1))
+    link(session_factory, (1, 1), (1, 2), (2, 1), (2, 2), (2, 3))
+
+
+class TestGraphAnalytics:
+    def test_incremental_refresh_matches_a_full_one(self, session_factory):
+        seed(session_factory)
+        assert refresh(session_factory)["new_links"] == 5
+        assert refresh(session_factory) == {"full": False, "new_links": 0}
+
+        link(session_factory, (3, 1), (3, 4), (1, 3))
+        summary = refresh(session_factory)
+        incremental = stored(session_factory)
+        refresh(session_factory, full=True)
+
+        assert summary["new_links"] == 3
+        assert incremental == stored(session_factory)
+        assert incremental[0] == [
+            (1, 2, 2),
+            (1, 3, 2),
+            (1, 4, 1),
+            (2, 3, 2),
+        ]
+
+    def test_refresh_without_new_entity_links_updates_node_metrics(
+        self, session_factory
+    ):
+        seed(session_factory)
+        refresh(session_factory)
+        add_rows(
+            session_factory,
+            orm.DocumentORM(id=4, filepath="4.docx", filename="4.docx"),
+            orm.TopicORM(id=2, topic_name="Tax"),
+        )
+        add_rows(session_factory, orm.DocumentTopicORM(document_id=4, topic_id=2))
+
+        summary = refresh(session_factory)
+        metrics = stored(session_factory)[1]
+
+        assert summary["new_links"] == 0
+        assert summary["nodes"] == 10
+        assert metrics[("document", 4)] == (1, 1.0, 1)
+        assert metrics[("topic", 2)] == (1, 0.0, 1)
+        assert refresh(session_factory) == {"full": False, "new_links": 0}
+
+    def test_views_rank_nodes_and_list_cooccurrences(self, session_factory):
+        seed(session_factory)
+        refresh(session_factory)
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        entities = views.get_graph_rankings(uow, "entity", limit=2)
+        by_degree = views.get_graph_rankings(uow, "entity", order_by="degree")
+        cooccurring = views.get_entity_cooccurrences(uow, 2)
+
+        assert [e["label"] for e in entities] == ["Treasury", "Cabinet Office"]
+        assert [e["degree"] for e in by_degree] == [2, 2, 1, 0]
+        assert cooccurring == [
+            {"entity_id": 1, "entity_name": "Treasury", "document_count": 2},
+            {"entity_id": 3, "entity_name": "Home Office", "document_count": 1},
+        ]
+
+    def test_linked_entities_event_refreshes_through_the_bus(
+        self, session_factory, tmp_path, monkeypatch
+    ):
+        monkeypatch.chdir(tmp_path)  # the bus writes its log to the working directory
+        seed(session_factory)
+        bus = bootstrap.bootstrap(
+            uow=unit_of_work.SqlAlchemyUnitOfWork(session_factory),
+            document_analysis_connector=None,
+            canonical_entity_consolidation_connector=None,
+        )
+
+        bus.handle(events.DocumentEntitiesLinked(entity_id=1, document_ids=[1, 2]))
+
+        assert stored(session_factory)[0] == [(1, 2, 2), (1, 3, 1), (2, 3, 1)]
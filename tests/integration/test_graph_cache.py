@@ -0,0 +1,131 @@
+from core.adapters import orm
+from core.domain import commands
+from core.graphs.cache import GraphCache
+
+
+def add_rows(session_factory, *rows):
+    with session_factory() as session:
+        session.add_all(rows)
+        session.commit()
+
+
+def seed(session_factory):
+    add_rows(
+        session_factory,
+        orm.DocumentORM(id=1, filepath="a.docx", filename="a.docx"),
+        orm.EntityORM(id=1, entity_name="Treasury"),
+        orm.EntityORM(id=2, entity_name="Cabinet Office"),
+    )
+    add_rows(session_factory, orm.DocumentEntityORM(document_id=1, entity_id=1))
+
+
+class TestGraphCache:
+    def test_snapshot_is_reused_until_invalidated(self, session_factory):
+        seed(session_factory)
+        cache = GraphCache(revalidate_seconds=60)
+        with session_factory() as session:
+            first = cache.get(session)
+            assert cache.get(session) is first
+            assert first.etag and first.body
+
+            cache.observe(
+                commands.AddEntity(entity_name="Home Office", entity_description="")
+            )
+            assert cache.stale
+            # Nothing changed in the database, so the same snapshot comes back
+            assert cache.get(session) is first
+
+    def test_unrelated_messages_do_not_invalidate(self, session_factory):
+        seed(session_factory)
+        cache = GraphCache(revalidate_seconds=60)
+        with session_factory() as session:
+            cache.get(session)
+        cache.observe(commands.EmbedDocuments())
+
+        assert not cache.stale
+
+    def test_delta_contains_new_edge_and_degrees(self, session_factory):
+        seed(session_factory)
+        cache = GraphCache(revalidate_seconds=60)
+        with session_factory() as session:
+            before = cache.get(session)
+        add_rows(session_factory, orm.DocumentEntityORM(document_id=1, entity_id=2))
+        cache.invalidate()
+        with session_factory() as session:
+            after = cache.get(session)
+
+        delta = after.delta(before.token)
+
+        assert after.etag != before.etag
+        assert delta["full"] is False
+        assert delta["edges"] == [{"source": "document-1", "target": "entity-2"}]
+        assert {node["id"] for node in delta["nodes"]} == {"document-1", "entity-2"}
+        assert after.delta(after.token)["edges"] == []
+
+    def test_foreign_or_expired_tokens_get_the_full_graph(self, session_factory):
+        seed(session_factory)
+        cache = GraphCache(revalidate_seconds=60)
+        with session_factory() as session:
+            snapshot = cache.get(session)
+
+        assert snapshot.delta("other.1")["full"] is True
+        assert snapshot.delta(None)["full"] is True
+        assert len(snapshot.delta("junk")["nodes"]) == 3
+
+    def test_fingerprint_notices_writes_from_other_processes(self, session_factory):
+        seed(session_factory)
+        cache = GraphCache(revalidate_seconds=0)
+        with session_factory() as session:
+            before = cache.get(session)
+        add_rows(session_factory, orm.StakeholderORM(stakeholder_name="Minister"))
+        with session_factory() as session:
+            after = cache.get(session)
+
+        assert after.version == before.version + 1
+        assert after.delta(before.token)["nodes"][0]["group"] == "stakeholder"
+
+
+class TestGraphIndexCache:
+    def test_index_covers_every_relation_and_follows_invalidation(
+        self, session_factory
+    ):
+        seed(session_factory)
+        add_rows(
+            session_factory,
+            orm.DocumentORM(
+                id=2,
+                filepath="a.docx",
+                filename="a.docx",
+                version=2,
+                previous_version_id=1,
+            ),
+            orm.TopicORM(id=1, topic_name="Budget"),
+            orm.RawTopicORM(id=1, document_id=2, topic_name="budget"),
+            orm.RawEntityORM(id=1, document_id=2, entity_name="HM Treasury"),
+        )
+        add_rows(
+            session_factory,
+            orm.DocumentTopicORM(document_id=2, topic_id=1),
+            orm.TopicRawTopicORM(topic_id=1, raw_topic_id=1),
+            orm.EntityRawEntityORM(entity_id=1, raw_entity_id=1),
+        )
+        cache = GraphCache(revalidate_seconds=60)
+        with session_factory() as session:
+            index = cache.get_index(session)
+            assert cache.get_index(session) is index
+
+        page = index.query(node="document-2", limit=100)
+        relations = {edge["relation"] for edge in page["edges"]}
+        assert relations == {
+            "document_topic",
+            "raw_topic_document",
+            "raw_entity_document",
+            "previous_version",
+            "topic_raw_topic",
+        }
+
+        cache.observe(
+            commands.AddEntity(entity_name="Home Office", entity_description="")
+        )
+        with session_factory() as session:
+            assert cache.get_index(session) is not index
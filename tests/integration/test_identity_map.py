@@ -0,0 +1,127 @@
+from dataclasses import asdict
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import NoResultFound
+
+from core.domain import commands, model
+from core.service_layer import unit_of_work
+
+
+def add_stakeholder(uow):
+    with uow:
+        stakeholder = uow.stakeholders.add(
+            commands.AddStakeholder(
+                stakeholder_name="Treasury",
+                stakeholder_type="Department",
+                stakeholder_description="",
+            )
+        )
+        uow.commit()
+    return stakeholder.id
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self.engine, "before_cursor_execute", self.record)
+
+    def record(self, conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append(statement)
+
+
+class TestIdentityMap:
+    def test_each_aggregate_is_loaded_once_per_unit_of_work(
+        self, engine, session_factory
+    ):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_stakeholder(uow)
+
+        with uow, StatementCounter(engine) as counter:
+            first = uow.stakeholders.get(reference=id_)
+            assert uow.stakeholders.get(reference=id_) is first
+            first.stakeholder_description = "Finance ministry"
+            uow.stakeholders.update(first, ["stakeholder_description"])
+
+        # The get loads the aggregate and the update its row; neither the second
+        # get nor the update's version check go back to the database.
+        assert len(counter.statements) == 2
+
+    def test_changelog_records_state_before_in_place_changes(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_stakeholder(uow)
+
+        with uow:
+            stakeholder: model.Stakeholder = uow.stakeholders.get(reference=id_)
+            stakeholder.stakeholder_name = "HM Treasury"
+            uow.stakeholders.update(stakeholder, ["stakeholder_name"])
+            stakeholder.stakeholder_name = "His Majesty's Treasury"
+            uow.stakeholders.update(stakeholder, ["stakeholder_name"])
+            changes = [c.changes for c in uow.stakeholders.history(id_)]
+
+        assert changes == [
+            {"stakeholder_name": ["Treasury", "HM Treasury"], "version": [1, 2]},
+            {
+                "stakeholder_name": ["HM Treasury", "His Majesty's Treasury"],
+                "version": [2, 3],
+            },
+        ]
+
+    def test_rollback_forgets_loaded_aggregates(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_stakeholder(uow)
+
+        with uow:
+            stakeholder = uow.stakeholders.get(reference=id_)
+            stakeholder.stakeholder_name = "Changed in memory"
+            uow.rollback()
+
+            assert uow.stakeholders.get(reference=id_).stakeholder_name == "Treasury"
+
+    def test_updates_remember_the_stored_state(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_stakeholder(uow)
+
+        with uow:
+            stored = uow.stakeholders.get(reference=id_)
+            created_by, created_at = stored.created_by, stored.created_at
+            # As update_stakeholder builds it, with the command's creation defaults
+            updated = model.Stakeholder(
+                **asdict(
+                    commands.UpdateStakeholder(
+                        id=id_,
+                        stakeholder_name="HM Treasury",
+                        stakeholder_type="Department",
+                        stakeholder_description="",
+                    )
+                )
+            )
+            uow.stakeholders.update(updated, ["stakeholder_name"])
+            stakeholder = uow.stakeholders.get(reference=id_)
+
+        assert stakeholder is not updated
+        assert stakeholder.stakeholder_name == "HM Treasury"
+        assert (stakeholder.created_by, stakeholder.created_at) == (
+            created_by,
+            created_at,
+        )
+        assert stakeholder.version == 2
+
+    def test_deleted_aggregates_are_forgotten(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        id_ = add_stakeholder(uow)
+
+        with uow:
+            uow.stakeholders.get(reference=id_)
+            uow.stakeholders.delete(id_)
+
+            with pytest.raises(NoResultFound):
+                uow.stakeholders.get(reference=id_)
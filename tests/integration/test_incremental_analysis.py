@@ -0,0 +1,86 @@
+from core.adapters import llm_connectors
+from core.domain import commands, events
+from core.service_layer import handlers, unit_of_work
+
+FAKE_ANALYSIS = (
+    ["Fake entity name"],
+    ["Fake subtopic name", "Fake topic name"],
+    "Summary of document.",
+)
+PARAGRAPHS = [f"Paragraph {n} about the Treasury budget." for n in range(20)]
+
+
+class RecordingConnector(llm_connectors.FakeDocumentAnalysisConnector):
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+
+    def _generate(self, **kwargs):
+        self.texts.append(kwargs["document_text"])
+        return super()._generate(**kwargs)
+
+
+def add_and_analyse(session_factory, connector, text):
+    uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+    document = handlers.add_new_document(
+        commands.CreateDocument(
+            filepath="budget.docx", filename="budget.docx", text=text
+        ),
+        uow,
+    )
+    handlers.get_document_topics_entities_and_summary(
+        events.DocumentCreated(document_id=document.id, comments=None),
+        uow,
+        connector,
+    )
+    return document.id
+
+
+def analysis(session_factory, document_id):
+    uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+    with uow:
+        return (
+            sorted(e.entity_name for e in uow.raw_entities.for_document(document_id)),
+            sorted(t.topic_name for t in uow.raw_topics.for_document(document_id)),
+            uow.documents.get(reference=document_id).summary,
+        )
+
+
+class TestIncrementalAnalysis:
+    def test_new_version_sends_only_changed_paragraphs(self, session_factory):
+        connector = RecordingConnector()
+        first = add_and_analyse(session_factory, connector, "\n".join(PARAGRAPHS))
+        edited = PARAGRAPHS[:5] + ["A rewritten paragraph."] + PARAGRAPHS[6:]
+
+        second = add_and_analyse(session_factory, connector, "\n".join(edited))
+
+        assert connector.texts[1] == "A rewritten paragraph."
+        assert analysis(session_factory, first) == FAKE_ANALYSIS
+        assert analysis(session_factory, second) == FAKE_ANALYSIS
+
+    def test_unchanged_version_reuses_the_analysis(self, session_factory):
+        connector = RecordingConnector()
+        add_and_analyse(session_factory, connector, "\n".join(PARAGRAPHS))
+
+        second = add_and_analyse(session_factory, connector, "\n".join(PARAGRAPHS))
+
+        assert len(connector.texts) == 1
+        assert analysis(session_factory, second)[2] == "Summary of document."
+
+    def test_large_rewrites_are_analysed_in_full(self, session_factory):
+        connector = RecordingConnector()
+        add_and_analyse(session_factory, connector, "\n".join(PARAGRAPHS))
+        rewritten = "\n".join(p.upper() for p in PARAGRAPHS)
+
+        add_and_analyse(session_factory, connector, rewritten)
+
+        assert connector.texts[1] == rewritten
+
+    def test_mostly_deleted_version_is_analysed_in_full(self, session_factory):
+        connector = RecordingConnector()
+        add_and_analyse(session_factory, connector, "\n".join(PARAGRAPHS))
+
+        add_and_analyse(session_factory, connector, PARAGRAPHS[0])
+
+        # The previous summary described text that no longer exists
+        assert connector.texts[1] == PARAGRAPHS[0]
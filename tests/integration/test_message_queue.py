@@ -0,0 +1,148 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from tenacity import wait_none
+
+from core.adapters import message_queue
+from core.domain import commands, events
+from core.entrypoints import worker
+from core.service_layer import messagebus
+
+
+def make_queue(tmp_path, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.sqlite'}")
+    return message_queue.SqlAlchemyMessageQueue(
+        session_factory=sessionmaker(bind=engine), **kwargs
+    )
+
+
+class TestMessageQueue:
+    def test_round_trips_commands_and_events(self, tmp_path):
+        queue = make_queue(tmp_path)
+        created_at = datetime(2024, 12, 31, 14, 24, 1)
+        queue.put(
+            commands.AddStakeholder(
+                stakeholder_name="name",
+                stakeholder_type="type",
+                stakeholder_description="description",
+                created_at=created_at,
+            )
+        )
+        queue.put(
+            events.DocumentCreated(
+                document_id=1, comments=[{"comment_date": created_at}]
+            )
+        )
+
+        first = queue.claim("worker-1")
+        second = queue.claim("worker-1")
+
+        assert first.message.stakeholder_name == "name"
+        assert first.message.created_at == created_at
+        assert second.message.comments[0]["comment_date"] == created_at
+        assert queue.claim("worker-1") is None
+
+    def test_leased_message_is_invisible_until_lease_expires(self, tmp_path):
+        queue = make_queue(tmp_path, lease_seconds=0)
+        queue.put(commands.DeleteTopic(id=1))
+
+        claimed = queue.claim("worker-1")
+        reclaimed = queue.claim("worker-2")
+
+        assert reclaimed.id == claimed.id
+        assert reclaimed.attempts == 2
+        assert not queue.ack(claimed.id, "worker-1")
+        assert queue.ack(reclaimed.id, "worker-2")
+        assert queue.claim("worker-1") is None
+
+    def test_failed_message_is_retried_then_dead_lettered(self, tmp_path):
+        queue = make_queue(tmp_path, max_attempts=2)
+        queue.retry_delay = lambda attempts: 0
+        queue.put(commands.DeleteTopic(id=1))
+
+        queue.fail(queue.claim("worker-1").id, "worker-1", "boom")
+        queue.fail(queue.claim("worker-1").id, "worker-1", "boom")
+
+        assert queue.claim("worker-1") is None
+        assert [m.last_error for m in queue.list_failed()] == ["boom"]
+
+
+class EventsUnitOfWork:
+    def __init__(self):
+        self.new_events = []
+
+    def collect_new_events(self):
+        new_events, self.new_events = self.new_events, []
+        return new_events
+
+
+def make_bus(tmp_path, uow, event_handlers=None, command_handlers=None, **kwargs):
+    bus = messagebus.MessageBus(
+        uow=uow,
+        event_handlers=event_handlers or {},
+        command_handlers=command_handlers or {},
+        log_file=str(tmp_path / "bus_log.json"),
+        **kwargs,
+    )
+    bus.retry_wait = wait_none()
+    return bus
+
+
+class TestWorker:
+    def test_message_whose_event_handler_fails_is_retried(self, tmp_path):
+        queue = make_queue(tmp_path, max_attempts=2)
+        queue.retry_delay = lambda attempts: 0
+
+        calls = []
+
+        def failing(event):
+            calls.append("failing")
+            raise ValueError("analysis unavailable")
+
+        bus = make_bus(
+            tmp_path,
+            EventsUnitOfWork(),
+            event_handlers={
+                events.DocumentProcessed: [
+                    ("failing", failing),
+                    ("succeeding", lambda event: calls.append("succeeding")),
+                ]
+            },
+        )
+        queue.put(events.DocumentProcessed(document_id=1))
+
+        assert worker.process_next_message(bus, queue, "worker-1")
+        assert worker.process_next_message(bus, queue, "worker-1")
+
+        assert not worker.process_next_message(bus, queue, "worker-1")
+        [failed] = queue.list_failed()
+        assert failed.attempts == 2
+        assert "failing on DocumentProcessed" in failed.last_error
+        assert "succeeding" not in failed.last_error
+        # The handler that committed is not run again on the retry
+        assert calls.count("succeeding") == 1
+        assert calls.count("failing") == 6
+
+    def test_raised_events_are_put_on_the_queue(self, tmp_path):
+        queue = make_queue(tmp_path)
+        uow = EventsUnitOfWork()
+        handled = []
+
+        def delete_topic(cmd):
+            uow.new_events.append(events.DocumentProcessed(document_id=cmd.id))
+
+        bus = make_bus(
+            tmp_path,
+            uow,
+            event_handlers={events.DocumentProcessed: [("log", handled.append)]},
+            command_handlers={commands.DeleteTopic: ("delete_topic", delete_topic)},
+            dispatch=queue.put,
+        )
+        queue.put(commands.DeleteTopic(id=7))
+
+        assert worker.process_next_message(bus, queue, "worker-1")
+        assert handled == []
+        assert worker.process_next_message(bus, queue, "worker-2")
+        assert handled == [events.DocumentProcessed(document_id=7)]
+        assert not worker.process_next_message(bus, queue, "worker-1")
@@ -0,0 +1,88 @@
+import sqlite3
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+from core import database
+from core.adapters import orm, search
+
+# The schema the old raw-SQL create_database() produced, trimmed to the tables
+# the migration has to extend.
+LEGACY_SCHEMA = """
+CREATE TABLE Stakeholders (
+id INTEGER PRIMARY KEY AUTOINCREMENT,
+stakeholder_name TEXT,
+stakeholder_type TEXT,
+stakeholder_description TEXT,
+UNIQUE (stakeholder_name)
+);
+CREATE TABLE Documents (
+id INTEGER PRIMARY KEY AUTOINCREMENT,
+filepath TEXT NOT NULL,
+filename TEXT NOT NULL,
+filetype TEXT,
+text TEXT,
+html_text TEXT,
+version INTEGER NOT NULL DEFAULT 1,
+previous_version_id INTEGER,
+summary TEXT,
+UNIQUE (filepath, version),
+FOREIGN KEY (previous_version_id) REFERENCES Documents(id)
+);
+CREATE TABLE RawTopics (
+id INTEGER PRIMARY KEY AUTOINCREMENT,
+document_id INTEGER NOT NULL,
+topic_name TEXT,
+topic_description TEXT,
+topic_prevalence INTEGER,
+FOREIGN KEY (document_id) REFERENCES Documents(id)
+);
+INSERT INTO Stakeholders (stakeholder_name) VALUES ('Treasury');
+"""
+
+
+class TestMigrations:
+    def test_migrated_schema_matches_orm_metadata(self, engine):
+        with engine.connect() as conn:
+            context = MigrationContext.configure(
+                conn,
+                opts={
+                    "include_name": lambda name, type_, parents: not (
+                        type_ == "table" and search.is_fts_table(name)
+                    )
+                },
+            )
+            diff = compare_metadata(context, orm.Base.metadata)
+
+        assert diff == []
+
+    def test_upgrades_legacy_database_in_place(self, tmp_path):
+        db_path = tmp_path / "legacy.sqlite"
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript(LEGACY_SCHEMA)
+        engine = database.create_sqlite_engine(db_path)
+
+        database.migrate(engine)
+
+        inspector = inspect(engine)
+        assert set(orm.Base.metadata.tables) <= set(inspector.get_table_names())
+        stakeholder_columns = {c["name"] for c in inspector.get_columns("Stakeholders")}
+        assert {"created_at", "version"} <= stakeholder_columns
+        assert "ix_rawtopics_document_id" in {
+            i["name"] for i in inspector.get_indexes("RawTopics")
+        }
+        with engine.connect() as conn:
+            [(name, version)] = conn.exec_driver_sql(
+                "SELECT stakeholder_name, version FROM Stakeholders"
+            ).all()
+        assert (name, version) == ("Treasury", 1)
+
+    def test_migrate_is_idempotent(self, engine):
+        database.migrate(engine)
+
+        with engine.connect() as conn:
+            revision = MigrationContext.configure(conn).get_current_revision()
+        head = ScriptDirectory(database.MIGRATIONS_PATH).get_current_head()
+        assert revision == head
@@ -0,0 +1,91 @@
+import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from core import bootstrap, views
+from core.adapters import orm
+from core.domain import commands
+from core.service_layer import read_cache, unit_of_work
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = read_cache.ReadModelCache(max_entries=100, ttl_seconds=60)
+    monkeypatch.setattr(read_cache, "READ_MODEL_CACHE", cache)
+    return cache
+
+
+def add_row(session_factory, orm_class, **columns):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with session_factory() as session:
+        session.add(
+            orm_class(
+                created_at=now,
+                last_modified_at=now,
+                created_by="ADMIN",
+                last_modified_by="ADMIN",
+                **columns,
+            )
+        )
+        session.commit()
+
+
+def make_bus(session_factory, cache, tmp_path):
+    bus = bootstrap.bootstrap(
+        uow=unit_of_work.SqlAlchemyUnitOfWork(session_factory),
+        document_analysis_connector=None,
+        canonical_entity_consolidation_connector=None,
+        observers=(cache.observe,),
+    )
+    bus.log_file = str(tmp_path / "bus_log.json")
+    return bus
+
+
+class TestCachedViews:
+    def test_views_are_served_from_the_cache_until_the_bus_changes_them(
+        self, session_factory, cache, tmp_path
+    ):
+        add_row(
+            session_factory,
+            orm.StakeholderORM,
+            id=1,
+            stakeholder_name="Treasury",
+            stakeholder_type="Department",
+            stakeholder_description="",
+        )
+
+        def get_stakeholder():
+            return views.get_stakeholder_by_id(
+                unit_of_work.SqlAlchemyUnitOfWork(session_factory), 1
+            )
+
+        first = get_stakeholder()
+        assert get_stakeholder() is first
+
+        make_bus(session_factory, cache, tmp_path).handle(
+            commands.UpdateStakeholder(
+                id=1,
+                stakeholder_name="HM Treasury",
+                stakeholder_type="Department",
+                stakeholder_description="",
+            )
+        )
+
+        assert get_stakeholder().stakeholder_name == "HM Treasury"
+        assert cache.stats()["get_stakeholder_by_id"] == {
+            "hits": 1,
+            "misses": 2,
+            "hit_rate": 1 / 3,
+            "evictions": 0,
+            "invalidations": 1,
+        }
+
+    def test_entries_are_keyed_by_session_factory(self, engine, cache):
+        first, second = sessionmaker(bind=engine), sessionmaker(bind=engine)
+        assert views.get_all_topics(unit_of_work.SqlAlchemyUnitOfWork(first)) == []
+        # Written behind the bus's back, so only a new key sees it
+        add_row(first, orm.TopicORM, id=1, topic_name="Budget", topic_description="")
+
+        assert views.get_all_topics(unit_of_work.SqlAlchemyUnitOfWork(first)) == []
+        assert len(views.get_all_topics(unit_of_work.SqlAlchemyUnitOfWork(second))) == 1
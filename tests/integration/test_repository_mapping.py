@@ -0,0 +1,109 @@
+import datetime
+
+from core import tracing
+from core.adapters import orm, repository
+from core.domain import model
+from core.service_layer import unit_of_work
+
+NOW = datetime.datetime(2024, 5, 1, 12, 30)
+AUDIT = dict(
+    created_at=NOW, last_modified_at=NOW, created_by="ADMIN", last_modified_by="ADMIN"
+)
+
+
+def seed(session_factory):
+    with session_factory() as session:
+        session.add_all(
+            [
+                orm.DocumentORM(
+                    id=1,
+                    filepath="a.docx",
+                    filename="a.docx",
+                    text="Budget",
+                    processed_at=NOW,
+                    summary="",
+                    **AUDIT,
+                ),
+                orm.EntityORM(
+                    id=1, entity_name="Treasury", entity_description="", **AUDIT
+                ),
+                orm.TopicORM(id=1, topic_name="Budget", topic_description="", **AUDIT),
+                orm.TopicORM(id=2, topic_name="Tax", topic_description="", **AUDIT),
+                orm.RawTopicORM(
+                    id=1,
+                    document_id=1,
+                    topic_name="Budget",
+                    topic_description="",
+                    topic_prevalence=3,
+                    **AUDIT,
+                ),
+            ]
+        )
+        session.flush()
+        session.add_all(
+            [
+                orm.DocumentEntityORM(document_id=1, entity_id=1, **AUDIT),
+                orm.DocumentTopicORM(
+                    document_id=1, topic_id=1, link_description="main", **AUDIT
+                ),
+                orm.TopicRawTopicORM(
+                    topic_id=1, raw_topic_id=1, link_description="", **AUDIT
+                ),
+            ]
+        )
+        session.commit()
+
+
+class TestTrustedModels:
+    def test_matches_validated_models_and_does_not_share_defaults(self):
+        values = dict(id=1, topic_name="Budget", topic_description="", **AUDIT)
+
+        first = repository.trusted_model(model.Topic, dict(values))
+        second = repository.trusted_model(model.Topic, dict(values))
+
+        assert first == model.Topic.model_validate(values)
+        assert first.model_fields_set == set(values)
+        assert first.events is not second.events
+        first.topic_name = "Spending"
+        assert "topic_name" in first.model_fields_set
+
+    def test_repositories_return_what_model_validate_did(self, session_factory):
+        seed(session_factory)
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        with uow:
+            topics = uow.topics.list()
+            expected = [
+                model.Topic.model_validate(topic.to_dict())
+                for topic in uow.session.query(orm.TopicORM).order_by(orm.TopicORM.id)
+            ]
+            [document] = uow.documents.list()
+            [entity] = uow.entities.list()
+
+        # Links are loaded in bulk; model_validate could not convert them at all
+        expected[0].document_topics = [
+            model.DocumentTopic(document_id=1, topic_id=1, link_description="main")
+        ]
+        expected[0].raw_topics = [
+            model.TopicRawTopic(topic_id=1, raw_topic_id=1, link_description="")
+        ]
+        assert topics == expected
+        assert [e.entity_name for e in document.entities] == ["Treasury"]
+        assert [d.filename for d in entity.documents] == ["a.docx"]
+
+
+class TestRepositoryTracing:
+    def test_lookups_outside_get_and_list_are_traced(self, session_factory):
+        exporter = tracing.InMemorySpanExporter()
+        tracing.set_exporter(exporter)
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        try:
+            with uow:
+                uow.documents.latest_versions(["a.docx"])
+                uow.raw_entities.for_document(1)
+        finally:
+            tracing.set_exporter(None)
+
+        names = [span.name for span in exporter.spans]
+        assert "SqlAlchemyDocumentRepository.latest_versions" in names
+        assert "SqlAlchemyRawEntitiesRepository.for_document" in names
@@ -0,0 +1,127 @@
+from dataclasses import asdict
+
+from sqlalchemy import select, update
+
+from core.adapters import search
+from core.domain import commands
+from core.service_layer import unit_of_work
+from core import views
+
+
+def add_document(uow, filename, text):
+    with uow:
+        document = uow.documents.add(
+            commands.CreateDocument(filepath=filename, filename=filename, text=text)
+        )
+        uow.commit()
+    return document
+
+
+class TestFtsQuery:
+    def test_quotes_words_so_operators_are_literal(self):
+        assert (
+            search.fts_query('budget NEAR( "treasury') == '"budget" "NEAR(" "treasury"'
+        )
+
+    def test_keeps_prefix_searches(self):
+        assert search.fts_query("treas*") == '"treas"*'
+
+    def test_highlight_escapes_html_around_marks(self):
+        snippet = f"<b>{search.HIGHLIGHT_OPEN}tax{search.HIGHLIGHT_CLOSE}</b>"
+
+        assert search.highlight(snippet) == "&lt;b&gt;<mark>tax</mark>&lt;/b&gt;"
+
+
+class TestSearch:
+    def test_finds_matching_paragraph_with_snippet(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        add_document(
+            uow,
+            "budget.docx",
+            "Introduction to the report.\nThe spending review sets departmental budgets.",
+        )
+        add_document(uow, "minutes.docx", "Minutes of the board meeting.")
+
+        [result] = views.search(uow, "spending budgets")
+
+        assert (result.kind, result.title, result.field) == (
+            "document",
+            "budget.docx",
+            "text",
+        )
+        assert "<mark>" in result.snippet_html
+
+    def test_updates_replace_indexed_text(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        with uow:
+            topic = uow.topics.add(
+                asdict(
+                    commands.CreateTopic(
+                        topic_name="Housing", topic_description="Social housing supply"
+                    )
+                )
+            )
+            uow.commit()
+        with uow:
+            topic.topic_description = "Planning reform"
+            uow.topics.update(topic, ["topic_description"])
+
+        assert views.search(uow, "supply") == []
+        [result] = views.search(uow, "planning", kinds=["topic"])
+        assert result.ref_id == topic.id
+
+    def test_updates_only_replace_the_rows_of_indexed_fields(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        document = add_document(uow, "budget.docx", "Spending review.\nTax rates.")
+        paragraphs = search.paragraphs_table
+        with session_factory() as session:
+            # Marks the rows, so rewritten ones are told apart
+            session.execute(update(paragraphs).values(title="marked"))
+            session.commit()
+
+        with uow:
+            document.summary = "Budget summary"
+            uow.documents.update(document, ["summary"])
+            uow.documents.update(document, ["no ORM field to update"])
+
+        with session_factory() as session:
+            rows = session.execute(
+                select(paragraphs.c.field, paragraphs.c.title).order_by(paragraphs.c.id)
+            )
+            assert rows.all() == [
+                ("text", "marked"),
+                ("text", "marked"),
+                ("summary", "budget.docx"),
+            ]
+        [result] = views.search(uow, "summary")
+        assert result.field == "summary"
+
+    def test_filters_by_kind(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        add_document(uow, "housing.docx", "Housing policy")
+        with uow:
+            uow.topics.add(
+                asdict(
+                    commands.CreateTopic(
+                        topic_name="Housing", topic_description="Supply"
+                    )
+                )
+            )
+            uow.commit()
+
+        assert {r.kind for r in views.search(uow, "housing")} == {"document", "topic"}
+        assert [r.kind for r in views.search(uow, "housing", kinds=["topic"])] == [
+            "topic"
+        ]
+
+    def test_substring_search_matches_wildcards_literally(self, session_factory):
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+        add_document(uow, "growth.docx", "Growth of 5% in the tax_year.")
+        add_document(uow, "other.docx", "Growth of 50 in the tax year.")
+
+        with session_factory() as session:
+            percent = search._search_like(session, "5%", None, 10, 0)
+            underscore = search._search_like(session, "tax_year", None, 10, 0)
+
+        assert [r.title for r in percent] == ["growth.docx"]
+        assert [r.title for r in underscore] == ["growth.docx"]
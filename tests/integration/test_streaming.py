@@ -0,0 +1,40 @@
+from core import views
+from core.adapters import orm
+from core.service_layer import unit_of_work
+
+
+class TestStreamingViews:
+    def test_documents_stream_in_batches_without_text(self, session_factory):
+        with session_factory() as session:
+            session.add_all(
+                [
+                    orm.DocumentORM(
+                        filepath=f"{i}.docx", filename=f"{i}.docx", text="body " * 50
+                    )
+                    for i in range(1, 8)
+                ]
+            )
+            session.commit()
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        with uow:
+            batched = list(uow.documents.stream(batch_size=3, columns=["id"]))
+        listed = list(views.stream_documents(uow))
+        with_text = next(views.stream_documents(uow, include_text=True))
+
+        assert batched == [{"id": i} for i in range(1, 8)]
+        assert [d["filename"] for d in listed] == [f"{i}.docx" for i in range(1, 8)]
+        assert "text" not in listed[0] and "html_text" not in listed[0]
+        assert with_text["text"].startswith("body")
+
+    def test_unit_of_work_stays_open_until_the_stream_is_finished(
+        self, session_factory
+    ):
+        with session_factory() as session:
+            session.add(orm.TopicORM(topic_name="Budget"))
+            session.commit()
+        uow = unit_of_work.SqlAlchemyUnitOfWork(session_factory)
+
+        topics = views.stream_topics(uow)
+        assert next(topics)["topic_name"] == "Budget"
+        assert list(topics) == []
@@ -0,0 +1,45 @@
+import functools
+
+from core import bootstrap
+from core.domain import commands, events
+
+
+class TestBootstrap:
+    def test_only_requested_dependencies_are_bound(self):
+        bus = bootstrap.bootstrap(
+            uow="uow",
+            document_analysis_connector="da",
+            canonical_entity_consolidation_connector="ce",
+        )
+
+        _, add_stakeholder = bus.command_handlers[commands.AddStakeholder]
+        analysis_handler = dict(bus.event_handlers[events.DocumentCreated])[
+            "get_document_topics_entities_and_summary"
+        ]
+        log_handler = dict(bus.event_handlers[events.DocumentProcessed])[
+            "log_document_processed"
+        ]
+
+        assert isinstance(add_stakeholder, functools.partial)
+        assert add_stakeholder.keywords == {"uow": "uow"}
+        assert analysis_handler.keywords == {
+            "uow": "uow",
+            "document_analysis_connector": "da",
+        }
+        assert not isinstance(log_handler, functools.partial)
+
+    def test_signatures_are_not_inspected_per_bootstrap(self):
+        bootstrap.bootstrap(
+            uow=None,
+            document_analysis_connector=None,
+            canonical_entity_consolidation_connector=None,
+        )
+        misses = bootstrap.handler_parameters.cache_info().misses
+
+        bootstrap.bootstrap(
+            uow=None,
+            document_analysis_connector=None,
+            canonical_entity_consolidation_connector=None,
+        )
+
+        assert bootstrap.handler_parameters.cache_info().misses == misses
@@ -0,0 +1,154 @@
+import asyncio
+import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.bench_pdf_extraction import concatenate_pages, write_text_pdf
+from core.adapters import extraction
+from core.domain import error_messages
+from web import uploads
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=3)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+class TestPdfExtraction:
+    def test_parallel_extraction_keeps_page_order(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "review.pdf")
+        write_text_pdf(path, pages=7, lines_per_page=3)
+        monkeypatch.setattr(extraction.config, "EXTRACTION_PROCESSES", 3)
+        monkeypatch.setattr(extraction.config, "PDF_PARALLEL_MIN_PAGES", 2)
+        monkeypatch.setattr(extraction.config, "PDF_PAGES_PER_TASK", 1)
+
+        with CountingExecutor() as executor:
+            text = extraction.extract(path, executor).text
+
+        # One task opens the PDF, then three runs of three pages or fewer
+        assert executor.submitted == 4
+        assert text == concatenate_pages(path)
+        assert text.index("Page 1 line 1") < text.index("Page 7 line 3")
+
+    def test_small_pdfs_are_extracted_in_one_task(self, tmp_path):
+        path = str(tmp_path / "note.pdf")
+        write_text_pdf(path, pages=2, lines_per_page=1)
+
+        with CountingExecutor() as executor:
+            text = extraction.extract(path, executor).text
+
+        assert executor.submitted == 1
+        assert text == concatenate_pages(path)
+
+    def test_pages_are_counted_under_the_timeout(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "review.pdf")
+        write_text_pdf(path, pages=2, lines_per_page=1)
+        calls = []
+
+        def record_timeout(timeout, function, *args):
+            calls.append((timeout, function))
+            return function(*args)
+
+        monkeypatch.setattr(extraction, "run_with_timeout", record_timeout)
+        monkeypatch.setitem(extraction.config.EXTRACTION_TIMEOUT_SECONDS, "pdf", 7)
+
+        with ThreadPoolExecutor() as executor:
+            extraction.extract(path, executor)
+
+        assert calls == [(7, extraction.open_pdf)]
+
+
+class TestExtractorRegistry:
+    def test_text_formats(self, tmp_path):
+        (tmp_path / "notes.md").write_text("# Budget\n\nSpend *less*.")
+        (tmp_path / "page.html").write_text(
+            "<html><head><title>x</title><style>p {}</style></head>"
+            "<body><h1>Budget</h1><p>Spend   less.</p><script>x()</script></body>"
+        )
+
+        with ThreadPoolExecutor() as executor:
+            markdown = extraction.extract(str(tmp_path / "notes.md"), executor)
+            page = extraction.extract(str(tmp_path / "page.html"), executor)
+
+        assert markdown.text == "# Budget\n\nSpend *less*."
+        assert page.text == "Budget\nSpend less."
+        assert page.html_text.startswith("<html>")
+
+    def test_extract_many_reports_errors_in_order(self, tmp_path):
+        paths = [str(tmp_path / name) for name in ("a.txt", "b.xyz", "c.txt")]
+        (tmp_path / "a.txt").write_text("A")
+        (tmp_path / "c.txt").write_text("C")
+
+        with ThreadPoolExecutor() as executor:
+            results = list(extraction.extract_many(paths, executor))
+
+        assert [path for path, _ in results] == paths
+        assert results[0][1].text == "A" and results[2][1].text == "C"
+        assert isinstance(results[1][1], error_messages.UnsupportedFileTypeError)
+
+    def test_tasks_over_their_timeout_are_stopped(self):
+        with pytest.raises(error_messages.ExtractionTimeoutError):
+            extraction.run_with_timeout(0.05, time.sleep, 5)
+
+    def test_document_command_uses_file_properties(self):
+        extracted = extraction.Extracted(
+            text="Budget",
+            properties={"creator": "HMT", "created": "2025-01-02T03:04:05Z"},
+        )
+
+        cmd = extraction.document_command("/share/budget.docx", extracted)
+
+        assert (cmd.filename, cmd.filetype, cmd.created_by) == (
+            "budget.docx",
+            ".docx",
+            "HMT",
+        )
+        assert cmd.created_at == datetime.datetime(2025, 1, 2, 3, 4, 5)
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+class TestUploads:
+    def test_stream_is_written_to_disk(self, tmp_path):
+        path = str(tmp_path / "upload.pdf")
+
+        size = asyncio.run(uploads.save_stream(chunks(b"ab", b"cd"), path, 10))
+
+        assert size == 4
+        assert open(path, "rb").read() == b"abcd"
+
+    def test_oversized_upload_is_refused_and_removed(self, tmp_path):
+        path = tmp_path / "upload.pdf"
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(uploads.save_stream(chunks(b"abc", b"def"), str(path), 5))
+
+        assert error.value.status_code == 413
+        assert not path.exists()
+
+    def test_failed_upload_keeps_the_earlier_file(self, tmp_path):
+        path = tmp_path / "upload.pdf"
+        path.write_bytes(b"earlier")
+
+        with pytest.raises(HTTPException):
+            asyncio.run(uploads.save_stream(chunks(b"abc", b"def"), str(path), 5))
+
+        assert path.read_bytes() == b"earlier"
+        assert os.listdir(tmp_path) == ["upload.pdf"]
+
+    def test_uploads_stay_in_the_upload_folder(self, tmp_path):
+        path = uploads.upload_path("../../etc/budget.pdf", str(tmp_path))
+
+        assert path == str(tmp_path / "budget.pdf")
@@ -0,0 +1,87 @@
+import numpy as np
+
+from core.graphs import analytics
+from core.graphs.index import GraphIndex
+
+
+def link_graph(entity_links, topic_links=(), documents=4, entities=5, topics=2):
+    entity_links = np.array(entity_links, dtype=np.int64).reshape(-1, 2)
+    topic_links = np.array(topic_links, dtype=np.int64).reshape(-1, 2)
+    return GraphIndex(
+        ids={
+            "document": range(1, documents + 1),
+            "entity": range(1, entities + 1),
+            "topic": range(1, topics + 1),
+        },
+        labels={},
+        links={
+            "document_entity": (entity_links[:, 0], entity_links[:, 1]),
+            "document_topic": (topic_links[:, 0], topic_links[:, 1]),
+        },
+    )
+
+
+def by_name(graph, values):
+    return {graph.node_name(i): value for i, value in enumerate(values.tolist())}
+
+
+class TestGraphAnalytics:
+    def test_pagerank_sums_to_one_and_ranks_hubs_first(self):
+        graph = link_graph([(1, 1), (2, 1), (3, 1), (3, 2)])
+
+        ranks, iterations = analytics.pagerank(graph)
+        ranks_by_node = by_name(graph, ranks)
+
+        assert np.isclose(ranks.sum(), 1.0)
+        assert iterations < analytics.PAGERANK_MAX_ITERATIONS
+        assert max(ranks_by_node, key=ranks_by_node.get) == "entity-1"
+        # Unlinked nodes only keep the teleport share
+        assert ranks_by_node["entity-5"] == min(ranks_by_node.values())
+
+    def test_warm_start_converges_to_the_same_ranks_faster(self):
+        graph = link_graph([(1, 1), (2, 1), (3, 1), (3, 2), (4, 3)], [(4, 1)])
+        ranks, iterations = analytics.pagerank(graph)
+
+        warm_ranks, warm_iterations = analytics.pagerank(graph, initial=ranks)
+
+        assert np.allclose(warm_ranks, ranks)
+        assert warm_iterations < iterations
+
+    def test_components_are_numbered_from_the_largest(self):
+        graph = link_graph([(1, 1), (2, 1), (3, 2)], [(3, 1)])
+
+        components = by_name(graph, analytics.connected_components(graph))
+
+        assert components["document-1"] == components["entity-1"] == 0
+        assert components["document-3"] == components["topic-1"]
+        assert components["document-3"] != components["document-1"]
+        assert len(set(components.values())) == 1 + 2 + 4  # two linked, 4 isolated
+
+    def test_weighted_degree_counts_co_occurrences(self):
+        graph = link_graph([(1, 1), (1, 2), (1, 3), (2, 1), (2, 2)], [(1, 1)])
+
+        weighted = by_name(graph, analytics.weighted_degrees(graph))
+
+        assert weighted["entity-1"] == 2 + 1
+        assert weighted["entity-3"] == 2
+        assert weighted["topic-1"] == 0
+        assert weighted["document-1"] == 4
+
+    def test_cooccurrence_counts(self):
+        documents = np.array([1, 1, 1, 2, 2, 3])
+        entities = np.array([3, 1, 2, 1, 2, 1])
+
+        first, second, counts = analytics.cooccurrence_counts(documents, entities)
+
+        assert list(zip(first, second, counts)) == [(1, 2, 2), (1, 3, 1), (2, 3, 1)]
+
+    def test_new_links_only_add_their_own_pairs(self):
+        documents = np.array([1, 1, 1, 2, 2])
+        entities = np.array([1, 2, 3, 1, 2])
+        is_new = np.array([False, False, True, False, False])
+
+        first, second, counts = analytics.cooccurrence_counts(
+            documents, entities, is_new
+        )
+
+        assert list(zip(first, second, counts)) == [(1, 3, 1), (2, 3, 1)]
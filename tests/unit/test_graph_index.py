@@ -0,0 +1,111 @@
+import numpy as np
+
+from core.graphs.index import GraphIndex, segment_positions
+
+
+def small_graph():
+    # document-1 and document-2 (a new version of 1) mention entities 10 and 11;
+    # document-2 also covers topic 5, which has raw topic 7 extracted from it.
+    return GraphIndex(
+        ids={
+            "document": [2, 1],
+            "entity": [10, 11],
+            "topic": [5],
+            "raw_topic": [7],
+            "stakeholder": [3],
+        },
+        labels={
+            "document": ["b.docx", "a.docx"],
+            "entity": ["Treasury", "Cabinet Office"],
+            "topic": ["Budget"],
+            "raw_topic": ["budget"],
+            "stakeholder": ["Minister"],
+        },
+        links={
+            "document_entity": ([1, 2, 2, 9], [10, 10, 11, 10]),
+            "document_topic": ([2], [5]),
+            "topic_raw_topic": ([5], [7]),
+            "raw_topic_document": ([7], [2]),
+            "previous_version": ([2], [1]),
+        },
+    )
+
+
+def names(page):
+    return [node["id"] for node in page["nodes"]]
+
+
+class TestGraphIndex:
+    def test_segment_positions(self):
+        positions = segment_positions(np.array([4, 0, 9]), np.array([2, 0, 3]))
+
+        assert positions.tolist() == [4, 5, 9, 10, 11]
+
+    def test_links_to_missing_nodes_are_dropped(self):
+        graph = small_graph()
+
+        assert len(graph) == 7
+        assert graph.edge_count == 7
+        assert graph.labels[graph.node_index("document-1")] == "a.docx"
+
+    def test_neighbourhood_follows_all_relations(self):
+        graph = small_graph()
+        raw_topic = graph.node_index("raw_topic-7")
+
+        one_hop = {graph.node_name(i) for i in graph.neighbourhood(raw_topic)}
+        two_hops = {graph.node_name(i) for i in graph.neighbourhood(raw_topic, 2)}
+
+        assert one_hop == {"raw_topic-7", "topic-5", "document-2"}
+        assert two_hops == one_hop | {"document-1", "entity-10", "entity-11"}
+
+    def test_relation_filter_limits_traversal_and_degree(self):
+        graph = small_graph()
+
+        page = graph.query(
+            node="document-2", hops=3, relations=["document_entity"], limit=10
+        )
+
+        assert set(names(page)) == {
+            "document-1",
+            "document-2",
+            "entity-10",
+            "entity-11",
+        }
+        assert {edge["relation"] for edge in page["edges"]} == {"document_entity"}
+        degrees = {node["id"]: node["degree"] for node in page["nodes"]}
+        assert degrees["document-2"] == 2
+
+    def test_pages_are_ranked_by_degree_and_do_not_overlap(self):
+        graph = small_graph()
+
+        first = graph.query(limit=3)
+        second = graph.query(offset=3, limit=3)
+        everything = graph.query(limit=100)
+
+        assert names(first) + names(second) == names(everything)[:6]
+        assert names(first)[0] == "document-2"
+        assert first["total"] == 7
+        # Only edges between nodes on the page are returned
+        on_page = set(names(first))
+        assert all(
+            {edge["source"], edge["target"]} <= on_page for edge in first["edges"]
+        )
+
+    def test_group_and_top_filters(self):
+        graph = small_graph()
+
+        page = graph.query(groups=["entity", "stakeholder"], top=2)
+
+        assert names(page) == ["entity-10", "entity-11"]
+        assert page["total"] == 2
+        assert page["edges"] == []
+
+    def test_unknown_node_raises_key_error(self):
+        graph = small_graph()
+
+        for node in ("document-99", "nonsense", "document-x"):
+            try:
+                graph.query(node=node)
+            except KeyError:
+                continue
+            raise AssertionError(node)
@@ -35,6 +35,13 @@ class FakeDocumentsRepository(repository.AbstractRepository):
     def _list(self):
         return self._documents
 
+    def latest_versions(self, filepaths):
+        latest = {}
+        for document in sorted(self._documents, key=lambda d: d.version):
+            if document.filepath in filepaths:
+                latest[document.filepath] = document
+        return latest
+
     def get_by_comment_id(self, reference):
         return next(
             (d for d in self._documents for c in d.comments if c.id == reference),
@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from core.domain import model
+from core.service_layer import incremental_analysis
+
+
+def raw_entity(name, prevalence=1):
+    now = datetime.now()
+    return model.RawEntity(
+        id=1,
+        document_id=1,
+        entity_name=name,
+        entity_description=f"{name} description",
+        entity_prevalence=prevalence,
+        created_at=now,
+        last_modified_at=now,
+        created_by="test",
+        last_modified_by="test",
+    )
+
+
+class TestDiffParagraphs:
+    def test_only_changed_paragraphs_are_reported(self):
+        previous = "Introduction\n\nTreasury spends 5\n\nConclusion"
+        text = "Introduction\n\nTreasury spends 7\n\nConclusion\n\nAnnex"
+
+        changes = incremental_analysis.diff_paragraphs(previous, text)
+
+        assert changes.removed == ["Treasury spends 5"]
+        assert changes.added == ["Treasury spends 7", "Annex"]
+        assert changes.changed_share == len(
+            "Treasury spends 7AnnexTreasury spends 5"
+        ) / len("IntroductionTreasury spends 7ConclusionAnnex")
+
+    def test_removed_paragraphs_count_as_changes(self):
+        previous = "\n".join(f"Paragraph {n}" for n in range(100))
+
+        changes = incremental_analysis.diff_paragraphs(previous, "Paragraph 0")
+
+        assert changes.added == []
+        assert changes.changed_share > 0.9
+        assert not incremental_analysis.use_incremental(changes)
+
+    def test_identical_text_has_no_changes(self):
+        changes = incremental_analysis.diff_paragraphs("A\nB", "A\nB\n")
+
+        assert (changes.added, changes.removed, changes.changed_share) == ([], [], 0)
+
+
+class TestMergeEntities:
+    def test_drops_entities_only_named_in_removed_paragraphs(self):
+        changes = incremental_analysis.diff_paragraphs(
+            "Treasury\nCabinet Office", "Treasury\nHome Office"
+        )
+        found = [
+            dict(
+                entity_name="Home Office",
+                entity_description="Department",
+                entity_prevalence=2,
+            ),
+            dict(
+                entity_name="treasury",
+                entity_description="Department",
+                entity_prevalence=4,
+            ),
+        ]
+
+        merged = incremental_analysis.merge_entities(
+            [raw_entity("Treasury", 3), raw_entity("Cabinet Office")],
+            found,
+            changes,
+            "Treasury\nHome Office",
+        )
+
+        assert [(e["entity_name"], e["entity_prevalence"]) for e in merged] == [
+            ("Treasury", 4),
+            ("Home Office", 2),
+        ]
+
+    def test_names_are_matched_as_whole_words(self):
+        previous = "AI policy\n\nTaxation budget"
+        text = "The minister said they maintain it"
+        changes = incremental_analysis.diff_paragraphs(previous, text)
+
+        merged = incremental_analysis.merge_entities(
+            [raw_entity("AI"), raw_entity("Tax")], [], changes, text
+        )
+
+        # "AI" is only found inside "said" and "maintain" now, and "Tax" was
+        # only inside "Taxation" in the removed paragraph
+        assert [e["entity_name"] for e in merged] == ["Tax"]
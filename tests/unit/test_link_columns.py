@@ -0,0 +1,39 @@
+from dataclasses import asdict
+
+from core.domain import model
+
+
+class TestLinkDataclasses:
+    def test_links_have_no_instance_dict(self):
+        link = model.DocumentEntity(document_id=1, entity_id=2, link_description="")
+
+        assert not hasattr(link, "__dict__")
+        assert asdict(link) == {
+            "document_id": 1,
+            "entity_id": 2,
+            "link_description": "",
+        }
+        assert link.version == 1
+
+
+class TestLinkColumns:
+    def test_round_trips_links_built_from_rows(self):
+        links = model.LinkColumns.from_rows(
+            model.DocumentEntity, [(1, 10, ""), (2, 10, "cited"), (2, 11, None)]
+        )
+        links.append(
+            model.DocumentEntity(document_id=3, entity_id=11, link_description="")
+        )
+
+        assert len(links) == 4
+        assert links[1] == model.DocumentEntity(2, 10, "cited")
+        assert list(links)[-1] == model.DocumentEntity(3, 11, "")
+        assert list(links.pairs()) == [(1, 10), (2, 10), (2, 11), (3, 11)]
+
+    def test_groups_by_either_side(self):
+        links = model.LinkColumns.from_rows(
+            model.EntityRawEntity, [(1, 5, ""), (1, 6, ""), (2, 7, "")]
+        )
+
+        assert links.grouped() == {1: [5, 6], 2: [7]}
+        assert links.grouped(by_second=True) == {5: [1], 6: [1], 7: [2]}
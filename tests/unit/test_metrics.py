@@ -0,0 +1,79 @@
+from core.domain import commands, events
+from core.service_layer import messagebus
+from core.service_layer.metrics import BusMetrics
+
+
+class NoEventsUnitOfWork:
+    def collect_new_events(self):
+        return []
+
+
+def make_bus(metrics, event_handlers=None, command_handlers=None, tmp_path=None):
+    return messagebus.MessageBus(
+        uow=NoEventsUnitOfWork(),
+        event_handlers=event_handlers or {},
+        command_handlers=command_handlers or {},
+        log_file=str(tmp_path / "bus_log.json"),
+        metrics=metrics,
+    )
+
+
+class TestBusMetrics:
+    def test_counts_and_latency_per_handler(self, tmp_path):
+        metrics = BusMetrics()
+        bus = make_bus(
+            metrics,
+            event_handlers={
+                events.DocumentProcessed: [("log_processed", lambda e: None)]
+            },
+            command_handlers={commands.DeleteTopic: ("delete_topic", lambda c: None)},
+            tmp_path=tmp_path,
+        )
+
+        bus.handle(commands.DeleteTopic(id=1))
+        bus.handle(events.DocumentProcessed(document_id=1))
+
+        snapshot = bus.get_metrics()
+        assert snapshot["processed_messages"] == 2
+        assert snapshot["failed_messages"] == 0
+        by_handler = {h["handler_name"]: h for h in snapshot["handlers"]}
+        assert by_handler["delete_topic"]["processed"] == 1
+        assert by_handler["log_processed"]["in_flight"] == 0
+        assert by_handler["log_processed"]["latency_seconds"]["p99"] >= 0
+
+    def test_retries_counted_before_success(self, tmp_path):
+        metrics = BusMetrics()
+        calls = []
+
+        def flaky(event):
+            calls.append(event)
+            if len(calls) == 1:
+                raise ValueError("first attempt fails")
+
+        bus = make_bus(
+            metrics,
+            event_handlers={events.DocumentProcessed: [("flaky", flaky)]},
+            tmp_path=tmp_path,
+        )
+        bus.handle(events.DocumentProcessed(document_id=1))
+
+        assert metrics.retries[("DocumentProcessed", "flaky")] == 1
+        assert metrics.processed[("DocumentProcessed", "flaky")] == 1
+
+    def test_prometheus_text_format(self):
+        metrics = BusMetrics()
+        with metrics.track("CreateDocument", "add_new_document"):
+            pass
+        metrics.record_success("CreateDocument", "add_new_document")
+
+        text = metrics.render_prometheus()
+
+        assert "# TYPE knowledge_worker_bus_handler_duration_seconds histogram" in text
+        assert (
+            'knowledge_worker_bus_messages_processed_total{message_type="CreateDocument",handler="add_new_document"} 1'
+            in text
+        )
+        assert (
+            'knowledge_worker_bus_handler_duration_seconds_bucket{message_type="CreateDocument",handler="add_new_document",le="+Inf"} 1'
+            in text
+        )
@@ -0,0 +1,85 @@
+from unittest import mock
+
+from core.domain import commands, events
+from core.service_layer import read_cache
+from core.service_layer.read_cache import ReadModelCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+class TestReadModelCache:
+    def test_hits_until_a_relevant_message_is_observed(self):
+        cache = ReadModelCache(max_entries=10, ttl_seconds=60)
+        topics, entities = Loader(), Loader()
+        key = ("get_all_topics", "db", (), ())
+        other = ("get_all_entities", "db", (), ())
+
+        assert cache.get_or_load(key, ("topics",), topics) == 1
+        assert cache.get_or_load(key, ("topics",), topics) == 1
+        cache.get_or_load(other, ("entities",), entities)
+
+        cache.observe(commands.UpdateTopic(id=1, topic_name="", topic_description=""))
+        assert cache.get_or_load(key, ("topics",), topics) == 2
+        assert cache.get_or_load(other, ("entities",), entities) == 1
+
+        stats = cache.stats()
+        assert stats["get_all_topics"]["hits"] == 1
+        assert stats["get_all_topics"]["misses"] == 2
+        assert stats["get_all_topics"]["invalidations"] == 1
+        assert stats["get_all_entities"]["hit_rate"] == 0.5
+
+    def test_unknown_messages_clear_everything_and_embeddings_nothing(self):
+        cache = ReadModelCache(max_entries=10, ttl_seconds=60)
+        key = ("get_all_topics", "db", (), ())
+        cache.get_or_load(key, ("topics",), Loader())
+
+        cache.observe(commands.EmbedDocuments())
+        assert key in cache.entries
+        cache.observe(object())
+        assert not cache.entries
+
+    def test_entries_expire_and_least_recently_used_are_evicted(self):
+        cache = ReadModelCache(max_entries=2, ttl_seconds=5)
+        loader = Loader()
+        keys = [(f"view_{i}", "db", (), ()) for i in range(3)]
+        with mock.patch.object(read_cache.time, "monotonic", return_value=100.0):
+            cache.get_or_load(keys[0], (), loader)
+            cache.get_or_load(keys[1], (), loader)
+            cache.get_or_load(keys[0], (), loader)
+            cache.get_or_load(keys[2], (), loader)
+
+        assert list(cache.entries) == [keys[0], keys[2]]
+        assert cache.stats()["view_1"]["evictions"] == 1
+
+        with mock.patch.object(read_cache.time, "monotonic", return_value=106.0):
+            assert cache.get_or_load(keys[0], (), loader) == 4
+
+    def test_load_overlapping_an_invalidation_is_not_stored(self):
+        cache = ReadModelCache(max_entries=10, ttl_seconds=60)
+        key = ("get_document_by_id", "db", (1,), ())
+
+        def load():
+            cache.observe(events.DocumentProcessed(document_id=1))
+            return "stale"
+
+        assert cache.get_or_load(key, ("documents",), load) == "stale"
+        assert key not in cache.entries
+
+    def test_renders_prometheus_metrics_per_view(self):
+        cache = ReadModelCache(max_entries=10, ttl_seconds=60)
+        key = ("get_all_topics", "db", (), ())
+        cache.get_or_load(key, ("topics",), Loader())
+        cache.get_or_load(key, ("topics",), Loader())
+
+        text = cache.render_prometheus()
+
+        assert "knowledge_worker_read_cache_entries 1" in text
+        assert 'knowledge_worker_read_cache_hits_total{view="get_all_topics"} 1' in text
+        assert 'knowledge_worker_read_cache_hit_rate{view="get_all_topics"} 0.5' in text
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("tiktoken", "requests", "pypdf", "docx2python", "numpy")
+
+
+@pytest.mark.parametrize(
+    "entry_point",
+    ["core.bootstrap", "core.entrypoints.headless_cli", "web.main"],
+)
+def test_entry_points_import_without_heavy_modules_or_engines(entry_point):
+    check = (
+        f"import sys, {entry_point}, core.database\n"
+        f"loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+        "assert core.database.get_engine.cache_info().currsize == 0\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,45 @@
+import datetime
+import json
+
+from web import streaming
+
+
+class TestStreaming:
+    def test_json_array_is_valid_json(self):
+        items = [{"id": 1, "at": datetime.datetime(2025, 1, 2, 3, 4)}, {"id": 2}]
+
+        body = b"".join(streaming.chunked(streaming.json_array_pieces(items)))
+
+        assert json.loads(body) == [{"id": 1, "at": "2025-01-02T03:04:00"}, {"id": 2}]
+        assert (
+            json.loads(b"".join(streaming.chunked(streaming.json_array_pieces([]))))
+            == []
+        )
+
+    def test_ndjson_has_one_document_per_line(self):
+        body = b"".join(
+            streaming.chunked(streaming.ndjson_pieces([{"a": 1}, {"b": 2}]))
+        )
+
+        assert [json.loads(line) for line in body.splitlines()] == [{"a": 1}, {"b": 2}]
+
+    def test_first_piece_is_sent_at_once_and_the_rest_in_chunks(self):
+        pieces = ["[", *("x" * 10 for _ in range(10)), "]"]
+
+        chunks = list(streaming.chunked(pieces, chunk_size=35))
+
+        assert chunks[0] == b"["
+        assert [len(chunk) for chunk in chunks[1:]] == [40, 40, 21]
+
+    def test_items_are_encoded_lazily(self):
+        consumed = []
+
+        def items():
+            for i in range(3):
+                consumed.append(i)
+                yield {"id": i}
+
+        chunks = streaming.chunked(streaming.ndjson_pieces(items()), chunk_size=1)
+        next(chunks)
+
+        assert consumed == [0]
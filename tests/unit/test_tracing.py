@@ -0,0 +1,68 @@
+import pytest
+
+from core import tracing
+from core.domain import events
+from core.service_layer import messagebus
+from core.service_layer.metrics import BusMetrics
+
+
+@pytest.fixture
+def exporter():
+    exporter = tracing.InMemorySpanExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(None)
+
+
+class NoEventsUnitOfWork:
+    def collect_new_events(self):
+        return []
+
+
+class TestTracing:
+    def test_no_spans_without_exporter(self):
+        with tracing.span("ignored") as span:
+            assert span is None
+
+    def test_nested_spans_share_trace(self, exporter):
+        with tracing.span("outer") as outer:
+            with tracing.span("inner") as inner:
+                pass
+
+        assert inner.trace_id == outer.trace_id
+        assert inner.parent_id == outer.span_id
+        assert [s.name for s in exporter.spans] == ["inner", "outer"]
+        assert outer.duration >= inner.duration
+
+    def test_event_handler_threads_join_the_trace(self, exporter, tmp_path):
+        def handler(event):
+            with tracing.span("inside_handler"):
+                pass
+
+        bus = messagebus.MessageBus(
+            uow=NoEventsUnitOfWork(),
+            event_handlers={events.DocumentProcessed: [("handler", handler)]},
+            command_handlers={},
+            log_file=str(tmp_path / "bus_log.json"),
+            metrics=BusMetrics(),
+        )
+        with tracing.span("request") as request:
+            bus.handle(events.DocumentProcessed(document_id=1))
+
+        spans = {s.name: s for s in exporter.spans}
+        assert spans["inside_handler"].trace_id == request.trace_id
+        assert (
+            spans["inside_handler"].parent_id
+            == spans["event:DocumentProcessed"].span_id
+        )
+
+    def test_folded_stacks_use_self_time(self):
+        spans = [
+            {"span_id": "a", "parent_id": None, "name": "root", "duration": 3.0},
+            {"span_id": "b", "parent_id": "a", "name": "child", "duration": 2.0},
+        ]
+
+        assert tracing.folded_stacks(spans) == {
+            "root": 1_000_000,
+            "root;child": 2_000_000,
+        }
@@ -0,0 +1,148 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from core.adapters import llm_connectors
+from core.adapters.vector_store import VectorStore
+
+
+def clustered_vectors(n_clusters=20, per_cluster=100, dimensions=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_clusters, dimensions))
+    points = centres.repeat(per_cluster, axis=0)
+    return points + 0.1 * rng.normal(size=points.shape)
+
+
+def upsert_each(path_prefix, ids):
+    store = VectorStore(path_prefix, dimensions=2)
+    for id_ in ids:
+        store.upsert([id_], [[1, id_]])
+
+
+class TestVectorStore:
+    def test_exact_search_ranks_by_cosine_similarity(self, tmp_path):
+        store = VectorStore(str(tmp_path / "docs"), dimensions=3)
+        store.upsert([10, 20, 30], [[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0]])
+
+        matches = store.search([1, 0, 0], k=2, mode="exact")
+
+        assert [id_ for id_, _ in matches] == [10, 20]
+        assert matches[0][1] == pytest.approx(1.0)
+
+    def test_batched_queries_return_one_result_list_each(self, tmp_path):
+        store = VectorStore(str(tmp_path / "docs"), dimensions=2)
+        store.upsert([1, 2], [[1, 0], [0, 1]])
+
+        results = store.search(np.eye(2), k=1, mode="exact")
+
+        assert [[id_ for id_, _ in r] for r in results] == [[1], [2]]
+
+    def test_upsert_replaces_and_remove_deletes(self, tmp_path):
+        store = VectorStore(str(tmp_path / "docs"), dimensions=2)
+        store.upsert([1, 2], [[1, 0], [0, 1]])
+        store.upsert([1], [[0, 1]])
+        store.remove([2])
+
+        assert store.search([0, 1], k=5, mode="exact") == [(1, pytest.approx(1.0))]
+
+    def test_reopening_reads_persisted_vectors(self, tmp_path):
+        VectorStore(str(tmp_path / "docs"), dimensions=2).upsert([7], [[3, 4]])
+
+        reopened = VectorStore(str(tmp_path / "docs"), dimensions=2)
+
+        assert reopened.get(7) == pytest.approx([0.6, 0.8])
+
+    def test_ivf_search_matches_exact_search_on_clustered_data(self, tmp_path):
+        vectors = clustered_vectors()
+        store = VectorStore(str(tmp_path / "docs"), dimensions=vectors.shape[1])
+        store.upsert(list(range(len(vectors))), vectors)
+        store.build_ann_index(n_lists=20)
+
+        queries = vectors[::97]
+        exact = store.search(queries, k=10, mode="exact")
+        approximate = store.search(queries, k=10, mode="ivf", n_probe=3)
+
+        recall = np.mean(
+            [
+                len({i for i, _ in a} & {i for i, _ in e}) / 10
+                for a, e in zip(approximate, exact)
+            ]
+        )
+        assert recall >= 0.9
+
+    def test_ivf_search_finds_vectors_added_after_the_index(self, tmp_path):
+        vectors = clustered_vectors(n_clusters=5, per_cluster=20)
+        store = VectorStore(str(tmp_path / "docs"), dimensions=vectors.shape[1])
+        store.upsert(list(range(len(vectors))), vectors)
+        store.build_ann_index(n_lists=5)
+        new_vector = np.ones(vectors.shape[1])
+        store.upsert([1000], [new_vector])
+
+        matches = VectorStore(str(tmp_path / "docs"), vectors.shape[1]).search(
+            new_vector, k=1, mode="ivf", n_probe=1
+        )
+
+        assert matches[0][0] == 1000
+
+    def test_repeated_ids_keep_their_last_vector(self, tmp_path):
+        store = VectorStore(str(tmp_path / "docs"), dimensions=2)
+        store.upsert([1, 2, 1], [[1, 0], [0, 1], [0, 1]])
+
+        assert len(store) == 2
+        assert int((store.ids >= 0).sum()) == 2
+        assert store.get(1) == pytest.approx([0, 1])
+
+    @pytest.mark.skipif(
+        "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+    )
+    def test_processes_writing_at_once_keep_every_vector(self, tmp_path):
+        path_prefix = str(tmp_path / "docs")
+        context = multiprocessing.get_context("fork")
+        writers = [
+            context.Process(target=upsert_each, args=(path_prefix, range(n, 400, 4)))
+            for n in range(4)
+        ]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+
+        store = VectorStore(path_prefix, dimensions=2)
+        assert sorted(store.rows) == list(range(400))
+        for id_ in (0, 1, 2, 399):
+            assert store.get(id_) == pytest.approx(
+                np.array([1, id_]) / np.hypot(1, id_)
+            )
+
+
+class TestFakeEmbeddingConnector:
+    def test_texts_sharing_words_are_more_similar(self):
+        connector = llm_connectors.FakeEmbeddingConnector(dimensions=64)
+
+        budget, budget_review, housing = [
+            np.array(v) / np.linalg.norm(v)
+            for v in connector.generate(
+                texts=[
+                    "treasury budget spending",
+                    "treasury budget review",
+                    "social housing",
+                ]
+            )
+        ]
+
+        assert budget @ budget_review > budget @ housing
+
+
+class TestEmbeddingConfiguration:
+    def test_without_an_endpoint_similarity_search_is_unavailable(self, monkeypatch):
+        from fastapi import HTTPException
+
+        from web import dependenicies
+
+        monkeypatch.setattr(llm_connectors.config, "EMBEDDING_ENDPOINT", None)
+
+        assert llm_connectors.get_embedding_connector() is None
+        with pytest.raises(HTTPException) as raised:
+            dependenicies.require_embedding_store()
+        assert raised.value.status_code == 503
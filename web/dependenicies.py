@@ -1,11 +1,33 @@
+from fastapi import HTTPException, status
+
 from core.adapters import llm_connectors
 from core.service_layer import unit_of_work
 from core import bootstrap
 
 
+def get_embedding_store():
+    if not llm_connectors.embeddings_enabled():
+        return None
+    from core.adapters import vector_store  # Loads NumPy, so only on first use
+
+    return vector_store.get_embedding_store()
+
+
+def require_embedding_store():
+    embedding_store = get_embedding_store()
+    if embedding_store is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Similarity search is disabled: EMBEDDING_ENDPOINT is not set.",
+        )
+    return embedding_store
+
+
 def get_bus():
     return bootstrap.bootstrap(
         uow=unit_of_work.SqlAlchemyUnitOfWork(),
         document_analysis_connector=llm_connectors.DocumentAnalysisConnector(),
         canonical_entity_consolidation_connector=llm_connectors.CanonicalEntityConsolidationConnector(),
+        embedding_connector=llm_connectors.get_embedding_connector(),
+        embedding_store=get_embedding_store(),
     )
@@ -1,12 +1,12 @@
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 
-from core import views
-from core.service_layer import messagebus
+from core import views, tracing
+from core.service_layer import messagebus, metrics, read_cache
 
-from .routers import documents, stakeholders, entities, graphs, topics
+from .routers import documents, stakeholders, entities, graphs, topics, search
 from .dependenicies import get_bus
 
 
@@ -19,6 +19,18 @@ app.include_router(stakeholders.router)
 app.include_router(entities.router)
 app.include_router(topics.router)
 app.include_router(graphs.router)
+app.include_router(search.router)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with tracing.span(
+        f"{request.method} {request.url.path}", method=request.method
+    ) as request_span:
+        response = await call_next(request)
+        if request_span is not None:
+            request_span.set_attribute("status_code", response.status_code)
+        return response
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -38,3 +50,12 @@ async def index(request: Request, bus: messagebus.MessageBus = Depends(get_bus))
             "stakeholders": stakeholders,
         },
     )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(
+        content=metrics.BUS_METRICS.render_prometheus()
+        + read_cache.READ_MODEL_CACHE.render_prometheus(),
+        media_type=metrics.PROMETHEUS_CONTENT_TYPE,
+    )
@@ -11,18 +11,20 @@ from fastapi import (
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 
 from core import views
+from core.adapters import extraction
 from core.service_layer import messagebus
 from core.domain import commands
 
 
-from ..dependenicies import get_bus
+from ..dependenicies import get_bus, require_embedding_store
+from ..streaming import stream_json
+from .. import uploads
 
 
-import pypdf as PyPDF2
 import os
-import shutil
 
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
@@ -37,67 +39,85 @@ router = APIRouter(
 )
 
 
-@router.post("/documents", response_class=HTMLResponse, tags=["documents"])
-async def add_document(
+@router.get("/", response_model=None, tags=["documents"])
+async def list_documents(
     request: Request,
-    document: UploadFile = Form(...),
+    include_text: bool = False,
     bus: messagebus.MessageBus = Depends(get_bus),
 ):
-    print(document.filename)
-    # Check for valid PDF upload
-    if document.content_type != "application/pdf":
+    return stream_json(
+        request, views.stream_documents(bus.uow, include_text=include_text)
+    )
+
+
+def require_supported(filename: str):
+    if not extraction.is_supported(filename or ""):
+        supported = ", ".join(sorted(extraction.EXTRACTORS))
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid file type. Please upload a PDF.",
+            detail=f"Invalid file type. Please upload one of: {supported}.",
         )
-    # Handle file upload
-    try:
-        # Create a directory for uploaded files if it doesn't exist
-        upload_dir = "uploaded_documents"
-        os.makedirs(upload_dir, exist_ok=True)
 
-        # Save the uploaded file
-        file_path = os.path.join(upload_dir, document.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(document.file, buffer)
 
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error uploading file: {e}",
-        ) from e
-
-    # Extract text using PyPDF2
+async def create_uploaded_document(file_path: str, bus: messagebus.MessageBus):
+    filename = os.path.basename(file_path)
+    # Extraction blocks, so it waits on a thread rather than the event loop
     try:
-        text = ""
-        with open(file_path, "rb") as pdf_file:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text()
-
+        extracted = await run_in_threadpool(extraction.extract, file_path)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error extracting text: {e}",
         ) from e
 
-    cmd = commands.CreateDocument(
-        filepath=document.filename,
-        filename=document.filename,
-        text=text,
-        created_by="CKEMPLEN",
-        last_modified_by="CKEMPLEN",
-        filetype=document.filename.split(".")[-1],
-    )
+    cmd = extraction.document_command(file_path, extracted, filepath=filename)
 
     bus.handle(cmd)
-    new_document = views.get_document_by_filename(bus.uow, document.filename)
+    new_document = views.get_document_by_filename(bus.uow, filename)
     return templates.TemplateResponse(
         "components/document_row.html", {"document": new_document}
     )
 
 
+@router.post("/documents", response_class=HTMLResponse, tags=["documents"])
+async def add_document(
+    request: Request,
+    document: UploadFile = Form(...),
+    bus: messagebus.MessageBus = Depends(get_bus),
+):
+    print(document.filename)
+    require_supported(document.filename)
+    uploads.check_content_length(request)
+    file_path = uploads.upload_path(document.filename)
+    try:
+        await uploads.save_stream(uploads.upload_file_chunks(document), file_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error uploading file: {e}",
+        ) from e
+
+    return await create_uploaded_document(file_path, bus)
+
+
+@router.put("/documents/{filename}", response_class=HTMLResponse, tags=["documents"])
+async def upload_document(
+    request: Request,
+    filename: str,
+    bus: messagebus.MessageBus = Depends(get_bus),
+):
+    """Takes the file as the raw request body, written to disk as it arrives
+    instead of being buffered as multipart form data first."""
+    require_supported(filename)
+    uploads.check_content_length(request)
+    file_path = uploads.upload_path(filename)
+    await uploads.save_stream(request.stream(), file_path)
+
+    return await create_uploaded_document(file_path, bus)
+
+
 @router.delete("/{document_id}", response_class=HTMLResponse, tags=["documents"])
 async def delete_document(
     request: Request, document_id: int, bus: messagebus.MessageBus = Depends(get_bus)
@@ -144,3 +164,17 @@ async def get_document_row(
         {"request": request, "document": document},
         status_code=200,  # Retrieved successfully
     )
+
+
+@router.get("/{document_id}/similar", tags=["documents"])
+async def get_similar_documents(
+    document_id: int,
+    k: int = 10,
+    bus: messagebus.MessageBus = Depends(get_bus),
+    embedding_store=Depends(require_embedding_store),
+):
+    similar = views.find_similar_documents(bus.uow, embedding_store, document_id, k=k)
+    return [
+        {"id": document.id, "filename": document.filename, "score": score}
+        for document, score in similar
+    ]
@@ -6,8 +6,8 @@ from core import views
 from core.service_layer import messagebus
 from core.domain import commands
 
-from ..dependenicies import get_bus
-
+from ..dependenicies import get_bus, require_embedding_store
+from ..streaming import stream_json
 
 templates = Jinja2Templates(directory="web/templates")
 
@@ -20,6 +20,13 @@ router = APIRouter(
 )
 
 
+@router.get("/", response_model=None)
+async def list_entities(
+    request: Request, bus: messagebus.MessageBus = Depends(get_bus)
+):
+    return stream_json(request, views.stream_entities(bus.uow))
+
+
 @router.get("/{entity_id}/edit", response_class=HTMLResponse)
 async def get_stakeholder_row_edit_form(
     request: Request, entity_id: int, bus: messagebus.MessageBus = Depends(get_bus)
@@ -75,3 +82,17 @@ async def add_entity(request: Request, bus: messagebus.MessageBus = Depends(get_
         {"request": request, "entity": new_entity},
         status_code=201,  # Created successfully
     )
+
+
+@router.get("/{entity_id}/similar")
+async def get_similar_entities(
+    entity_id: int,
+    k: int = 10,
+    bus: messagebus.MessageBus = Depends(get_bus),
+    embedding_store=Depends(require_embedding_store),
+):
+    similar = views.find_similar_entities(bus.uow, embedding_store, entity_id, k=k)
+    return [
+        {"id": entity.id, "entity_name": entity.entity_name, "score": score}
+        for entity, score in similar
+    ]
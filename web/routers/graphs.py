@@ -1,14 +1,15 @@
-from fastapi import Request, Depends, APIRouter
+from typing import List, Optional
+
+from fastapi import Request, Depends, APIRouter, HTTPException, Query, status
+from fastapi.responses import JSONResponse, Response
 from fastapi.templating import Jinja2Templates
 
 from core import views
+from core.domain import commands
 from core.service_layer import messagebus
 
 from ..dependenicies import get_bus
 
-from typing import Dict, List, Any
-
-
 templates = Jinja2Templates(directory="web/templates")
 
 
@@ -20,90 +21,96 @@ router = APIRouter(
 )
 
 
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
 @router.get("/node_edge_graph_data", response_model=None)
 async def get_node_edge_graph_data(
     request: Request, bus: messagebus.MessageBus = Depends(get_bus)
-) -> Dict[str, List[Dict[str, Any]]]:
-    documents = views.get_all_documents(bus.uow)
-    topics = views.get_all_topics(bus.uow)
-    entities = views.get_all_entities(bus.uow)
-    stakeholders = views.get_all_stakeholders(bus.uow)
-
-    nodes = []
-    edges = []
-    node_degrees = {}
-
-    # Add documents as nodes
-    for document in documents:
-        node_id = f"document-{document.id}"
-        nodes.append(
-            {
-                "id": node_id,
-                "name": node_id,
-                "label": document.filename,
-                "group": "document",
-                "degree": 0,
-            }
+) -> Response:
+    snapshot = views.get_graph(bus.uow)
+    # "no-cache" lets browsers keep the graph but revalidate it every time
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=snapshot.body, media_type="application/json", headers=headers
+    )
+
+
+@router.get("/node_edge_graph_data/delta", response_model=None)
+async def get_node_edge_graph_delta(
+    since: Optional[str] = None, bus: messagebus.MessageBus = Depends(get_bus)
+) -> JSONResponse:
+    snapshot = views.get_graph(bus.uow)
+    return JSONResponse(snapshot.delta(since), headers={"ETag": snapshot.etag})
+
+
+@router.get("/subgraph", response_model=None)
+async def get_subgraph(
+    node: Optional[str] = None,
+    hops: int = Query(default=1, ge=1, le=3),
+    group: Optional[List[str]] = Query(default=None),
+    relation: Optional[List[str]] = Query(default=None),
+    top: Optional[int] = Query(default=None, ge=1),
+    limit: int = Query(default=500, ge=1, le=5000),
+    offset: int = Query(default=0, ge=0),
+    bus: messagebus.MessageBus = Depends(get_bus),
+) -> dict:
+    try:
+        return views.get_subgraph(
+            bus.uow,
+            node=node,
+            hops=hops,
+            groups=group,
+            relations=relation,
+            top=top,
+            offset=offset,
+            limit=limit,
         )
-        node_degrees[node_id] = 0
-
-    # Add topics as nodes
-    for topic in topics:
-        node_id = f"topic-{topic.id}"
-        nodes.append(
-            {
-                "id": node_id,
-                "name": node_id,
-                "label": topic.topic_name,
-                "group": "topic",
-                "degree": 0,
-            }
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"No graph node {node}"
         )
-        node_degrees[node_id] = 0
-
-    # Add entities as nodes
-    for entity in entities:
-        node_id = f"entity-{entity.id}"
-        nodes.append(
-            {
-                "id": node_id,
-                "name": node_id,
-                "label": entity.entity_name,
-                "group": "entity",
-                "degree": 0,
-            }
+
+
+@router.get("/analytics/{node_type}", response_model=None)
+async def get_graph_rankings(
+    node_type: str,
+    order_by: str = "pagerank",
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    bus: messagebus.MessageBus = Depends(get_bus),
+) -> List[dict]:
+    if node_type not in views.GRAPH_NODE_LABELS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No analytics for {node_type}",
         )
-        node_degrees[node_id] = 0
-
-    # Add stakeholders as nodes
-    for stakeholder in stakeholders:
-        node_id = f"stakeholder-{stakeholder.id}"
-        nodes.append(
-            {
-                "id": node_id,
-                "name": node_id,
-                "label": stakeholder.stakeholder_name,
-                "group": "stakeholder",
-                "degree": 0,
-            }
+    if order_by not in views.GRAPH_RANKINGS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"order_by must be one of {', '.join(views.GRAPH_RANKINGS)}",
         )
-        node_degrees[node_id] = 0
-
-    # Create edges based on relationships
-    for document in documents:
-        for entity in document.entities:
-            source_id = f"document-{document.id}"
-            target_id = f"entity-{entity.id}"
-            edges.append(
-                {
-                    "source": source_id,
-                    "target": target_id,
-                }
-            )
-            node_degrees[source_id] += 1
-            node_degrees[target_id] += 1
-
-    for node in nodes:
-        node["degree"] = node_degrees[node["id"]]
-
-    return {"nodes": nodes, "edges": edges}
+    return views.get_graph_rankings(
+        bus.uow, node_type, order_by=order_by, limit=limit, offset=offset
+    )
+
+
+@router.get("/analytics/entities/{entity_id}/cooccurrences", response_model=None)
+async def get_entity_cooccurrences(
+    entity_id: int,
+    limit: int = Query(default=20, ge=1, le=500),
+    bus: messagebus.MessageBus = Depends(get_bus),
+) -> List[dict]:
+    return views.get_entity_cooccurrences(bus.uow, entity_id, limit=limit)
+
+
+@router.post("/analytics/refresh", response_model=None)
+async def refresh_graph_analytics(
+    full: bool = False, bus: messagebus.MessageBus = Depends(get_bus)
+) -> dict:
+    bus.handle(commands.RefreshGraphAnalytics(full=full))
+    return {"status": "refreshed", "full": full}
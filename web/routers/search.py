@@ -0,0 +1,43 @@
+from typing import List, Optional
+
+from fastapi import Request, Depends, APIRouter, Query
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+
+from core import views
+from core.service_layer import messagebus
+
+from ..dependenicies import get_bus
+
+templates = Jinja2Templates(directory="web/templates")
+
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+    dependencies=[],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/", response_class=HTMLResponse)
+async def search(
+    request: Request,
+    q: str = "",
+    kind: Optional[List[str]] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    bus: messagebus.MessageBus = Depends(get_bus),
+):
+    results = views.search(bus.uow, q, kinds=kind, limit=limit, offset=offset)
+    return templates.TemplateResponse(
+        "components/search_results.html",
+        {
+            "request": request,
+            "query": q,
+            "results": results,
+            "limit": limit,
+            "offset": offset,
+        },
+        status_code=200,
+    )
@@ -7,6 +7,7 @@ from core.service_layer import messagebus
 from core.domain import commands
 
 from ..dependenicies import get_bus
+from ..streaming import stream_json
 
 
 templates = Jinja2Templates(directory="web/templates")
@@ -20,6 +21,13 @@ router = APIRouter(
 )
 
 
+@router.get("/", response_model=None)
+async def list_stakeholders(
+    request: Request, bus: messagebus.MessageBus = Depends(get_bus)
+):
+    return stream_json(request, views.stream_stakeholders(bus.uow))
+
+
 @router.post("/", response_class=HTMLResponse)
 async def add_stakeholder(
     request: Request, bus: messagebus.MessageBus = Depends(get_bus)
@@ -7,6 +7,7 @@ from core import views
 from core.service_layer import messagebus
 
 from ..dependenicies import get_bus
+from ..streaming import stream_json
 
 
 templates = Jinja2Templates(directory="web/templates")
@@ -20,6 +21,13 @@ router = APIRouter(
 )
 
 
+@router.get("/", response_model=None)
+async def list_topics(
+    request: Request, bus: messagebus.MessageBus = Depends(get_bus)
+):
+    return stream_json(request, views.stream_topics(bus.uow))
+
+
 @router.get("/{topic_id}", response_class=HTMLResponse)
 async def get_topic_row(
     request: Request, topic_id: int, bus: messagebus.MessageBus = Depends(get_bus)
@@ -0,0 +1,74 @@
+"""Streaming JSON responses for endpoints that can return many rows.
+
+Items are encoded one at a time as the client reads, either as a JSON array or,
+when the client asks for ``application/x-ndjson`` (or ``?format=ndjson``), as
+one JSON document per line. Encoded items are sent in chunks of about
+``CHUNK_SIZE`` bytes; the first chunk goes out as soon as it is ready.
+"""
+
+import datetime
+import json
+from typing import Any, Iterable, Iterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CHUNK_SIZE = 64 * 1024
+
+
+def json_default(value: Any):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def encode(item: Any) -> str:
+    return json.dumps(item, default=json_default, separators=(",", ":"))
+
+
+def ndjson_pieces(items: Iterable) -> Iterator[str]:
+    for item in items:
+        yield encode(item) + "\n"
+
+
+def json_array_pieces(items: Iterable) -> Iterator[str]:
+    yield "["
+    separator = ""
+    for item in items:
+        yield separator + encode(item)
+        separator = ","
+    yield "]"
+
+
+def chunked(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    buffer, size, first = [], 0, True
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if first or size >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer, size, first = [], 0, False
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def wants_ndjson(request: Request) -> bool:
+    return request.query_params.get(
+        "format"
+    ) == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def stream_json(request: Request, items: Iterable) -> StreamingResponse:
+    """Streams ``items``, typically a generator that holds its unit of work open
+    until the last row has been sent."""
+    if wants_ndjson(request):
+        return StreamingResponse(
+            chunked(ndjson_pieces(items)), media_type=NDJSON_MEDIA_TYPE
+        )
+    return StreamingResponse(
+        chunked(json_array_pieces(items)), media_type="application/json"
+    )
@@ -0,0 +1,72 @@
+"""Uploads written to disk as they arrive, refused once over the size limit."""
+
+import os
+import tempfile
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request, UploadFile, status
+
+import core.config as config
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def upload_path(filename: str, upload_dir: str = None) -> str:
+    # Only the name is kept, so an upload cannot be written outside the folder
+    name = os.path.basename(filename or "")
+    if name in ("", ".", ".."):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Missing file name."
+        )
+    upload_dir = upload_dir or config.UPLOAD_DIR
+    os.makedirs(upload_dir, exist_ok=True)
+    return os.path.join(upload_dir, name)
+
+
+def too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Uploads are limited to {max_bytes} bytes.",
+    )
+
+
+def check_content_length(request: Request, max_bytes: int = None):
+    """Refuses an upload whose declared size is over the limit before reading it."""
+    max_bytes = max_bytes or config.MAX_UPLOAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large(max_bytes)
+
+
+async def upload_file_chunks(upload: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await upload.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def save_stream(
+    chunks: AsyncIterator[bytes], path: str, max_bytes: int = None
+) -> int:
+    """Writes ``chunks`` to ``path`` and returns the size. Over ``max_bytes``
+    a 413 is raised.
+
+    The chunks go to a temporary file beside ``path``, which replaces it only
+    once complete, so a failed upload leaves an earlier file of that name as it
+    was, and concurrent uploads of one name never mix their contents."""
+    max_bytes = max_bytes or config.MAX_UPLOAD_BYTES
+    size = 0
+    file = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(path) or ".", prefix=".upload-", delete=False
+    )
+    try:
+        with file:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise too_large(max_bytes)
+                file.write(chunk)
+        os.replace(file.name, path)
+    except BaseException:
+        if os.path.exists(file.name):
+            os.remove(file.name)
+        raise
+    return size